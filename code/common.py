@@ -0,0 +1,32 @@
+# Definitions shared by the simulation package (pyosmodel) and the analysis toolbox (toolbox), so that the processing of the weather
+# and measurement data does not depend on the simulation package
+import os
+import hashlib
+
+# Calendar year of the simulations (run period of the IDF files and calendar year of the OpenStudio models)
+# The time keys of the results and weather data (see toolbox.timekeys) count from January 1st of this year
+SIMULATION_YEAR = 2023
+
+# Hashes of the files already read, keyed by (path, size, modification time)
+file_hashes = {}
+
+
+# Definition of the function to hash the content of a file
+'''
+Description: This function returns the sha256 digest of the content of a file. The digest is kept in memory as long as the size
+             and modification time of the file do not change, so a file (e.g. an epw file of a campaign) is only read once per process.
+Inputs:
+    - path: path to the file
+Outputs:
+    - file_hash: sha256 hexadecimal digest of the content of the file
+'''
+def hash_file(path):
+    stat = os.stat(path)
+    signature = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if signature not in file_hashes:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        file_hashes[signature] = digest.hexdigest()
+    return file_hashes[signature]
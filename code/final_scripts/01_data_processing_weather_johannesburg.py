@@ -8,61 +8,20 @@
 import numpy as np
 import pandas as pd
 import os
-from toolbox.utils import import_saws_data
+from toolbox.weather import load_saws_weather, clean_saws_weather
 import warnings
 warnings.filterwarnings('ignore')
 
 
 path = 'database/johannesburg/weather/'
-files = os.listdir(path)
-
-temp = pd.DataFrame()
-hum = pd.DataFrame()
-pres = pd.DataFrame()
-windspeed = pd.DataFrame()
-rain = pd.DataFrame()
-winddir = pd.DataFrame()
-
-for file in files:
-    if file.endswith('_temp.csv'):
-        temp = pd.concat([temp, import_saws_data(path + file)])
-    elif file.endswith('_humidity.csv'):
-        hum = pd.concat([hum, import_saws_data(path + file)])
-    elif file.endswith('_pressure.csv'):
-        pres = pd.concat([pres, import_saws_data(path + file)])
-    elif file.endswith('_windspeed.csv'):
-        windspeed = pd.concat([windspeed, import_saws_data(path + file)])
-    elif file.endswith('_rain.csv'):
-        rain = pd.concat([rain, import_saws_data(path + file)])
-    elif file.endswith('_winddir.csv'):
-        winddir = pd.concat([winddir, import_saws_data(path + file)])
-    elif file.endswith('.csv'):
-        print('{} is not a valid file'.format(file))
-
-# Concatenate all dataframes
-df = pd.concat([temp, hum, pres, rain, winddir, windspeed], axis=1)
-df.columns = ['Outdoor Dry Bulb Temperature', 'Outdoor Relative Humidity', 'Atmospheric Station Pressure', 'Precipitable Water', 'Wind Direction', 'Wind Speed']
-
-
-# Clean Data
-
-df = df.loc['2014-01-15 00:00:00':'2014-07-24 23:00:00']
-
-df['Precipitable Water'] = df['Precipitable Water'].fillna(0)
-df['Precipitable Water'] = df['Precipitable Water'].replace('      ', 0)
-df['Precipitable Water'] = df['Precipitable Water'].astype(float)
-
-df['Wind Speed'] = df['Wind Speed'].fillna(0)
-
-df['Atmospheric Station Pressure'] = df['Atmospheric Station Pressure'].fillna(method='ffill')
-
-df['Wind Speed'] = df['Wind Speed'].replace('     -', np.nan)
-df['Wind Speed'] = df['Wind Speed'].fillna(method='ffill')
-df['Wind Speed'] = df['Wind Speed'].astype(float)
-
-df['Wind Direction'] = df['Wind Direction'].replace(np.nan, 0)
-df['Wind Direction'] = df['Wind Direction'].replace('     -', 0)
-df['Wind Direction'] = df['Wind Direction'].astype(int)
+
+# Load all the weather files of the station (parsed in parallel, one column per variable, see toolbox.weather)
+df = load_saws_weather(path)
+
+
+# Clean Data (same rules for all the stations, see toolbox.weather.clean_saws_weather)
+
+df = clean_saws_weather(df, '2014-01-15 00:00:00', '2014-07-24 23:00:00')
 
 df['Datetime'] = df.index
 df['Datetime'] = pd.to_datetime(df['Datetime'])
@@ -8,73 +8,23 @@
 import numpy as np
 import pandas as pd
 import os
-from toolbox.utils import import_saws_data
+from toolbox.weather import load_saws_weather, clean_saws_weather
 import warnings
 warnings.filterwarnings('ignore')
 
 
 path = 'database/giyani/weather/'
-files = os.listdir(path)
-
-temp = pd.DataFrame()
-hum = pd.DataFrame()
-pres = pd.DataFrame()
-windspeed = pd.DataFrame()
-rain = pd.DataFrame()
-winddir = pd.DataFrame()
-
-for file in files:
-    if file.endswith('_temp.csv'):
-        temp = pd.concat([temp, import_saws_data(path + file)])
-    elif file.endswith('_hum.csv'):
-        hum = pd.concat([hum, import_saws_data(path + file)])
-    elif file.endswith('_pressure.csv'):
-        pres = pd.concat([pres, import_saws_data(path + file)])
-    elif file.endswith('_windspeed.csv'):
-        windspeed = pd.concat([windspeed, import_saws_data(path + file)])
-    elif file.endswith('_rain.csv'):
-        rain = pd.concat([rain, import_saws_data(path + file)])
-    elif file.endswith('_winddir.csv'):
-        winddir = pd.concat([winddir, import_saws_data(path + file)])
-    elif file.endswith('.csv'):
-        print('{} is not a valid file'.format(file))
-
-# Concatenate all dataframes
-df = pd.concat([temp, hum, pres, rain, winddir, windspeed], axis=1)
-df.columns = ['Outdoor Dry Bulb Temperature', 'Outdoor Relative Humidity', 'Atmospheric Station Pressure', 'Precipitable Water', 'Wind Direction', 'Wind Speed']
-
-
-# Clean Data
-
-df = df.loc['2016-09-04 00:00:00':'2017-09-14 23:00:00']
-
-df = df.replace('     -', np.nan)
-df = df.replace('      -', np.nan)
-
-df['Outdoor Dry Bulb Temperature'] = df['Outdoor Dry Bulb Temperature'].astype(float)
-df['Outdoor Relative Humidity'] = df['Outdoor Relative Humidity'].astype(float)
-
-df['Precipitable Water'] = df['Precipitable Water'].fillna(0)
-df['Precipitable Water'] = df['Precipitable Water'].replace('      ', 0)
-df['Precipitable Water'] = df['Precipitable Water'].astype(float)
-
-df['Wind Speed'] = df['Wind Speed'].fillna(0)
-print(df.isnull().sum())
-df['Atmospheric Station Pressure'] = df['Atmospheric Station Pressure'].fillna(method='ffill')
-df['Atmospheric Station Pressure'] = df['Atmospheric Station Pressure'].astype(float)
-
-df['Wind Speed'] = df['Wind Speed'].replace('     -', np.nan)
-df['Wind Speed'] = df['Wind Speed'].fillna(method='ffill')
-df['Wind Speed'] = df['Wind Speed'].astype(float)
-
-df['Wind Direction'] = df['Wind Direction'].replace(np.nan, 0)
-df['Wind Direction'] = df['Wind Direction'].replace('     -', 0)
-df['Wind Direction'] = df['Wind Direction'].astype(int)
+
+# Load all the weather files of the station (parsed in parallel, one column per variable, see toolbox.weather)
+df = load_saws_weather(path)
+
+
+# Clean Data (same rules for all the stations, see toolbox.weather.clean_saws_weather)
+
+df = clean_saws_weather(df, '2016-09-04 00:00:00', '2017-09-14 23:00:00')
 
 df['Datetime'] = df.index
 df['Datetime'] = pd.to_datetime(df['Datetime'])
-print(df.isnull().sum())
-df.dropna(inplace=True)
 
 
 # Check data for missing values and types
@@ -21,11 +21,13 @@ epw_files = [
     'ZAF_GT_Johannesburg.Botanical.Gardens.683610_TMYx.2004-2018_2080.epw',
     ]
 
-simulation_data = {}
 for i, scenario in enumerate(scenarios):
     weather = import_epw(r'database/climate/' + epw_files[i])
     directory = r'simulations/' + scenario + '/outputs/'
-    output_path = r'results/simulations/' + scenario + '_simulation_data.csv'
-    simulation_data[scenario] = import_simulation_data(directory, weather, output_path)
+    # The buildings are streamed to the results store (partitioned by scenario and month, see toolbox.results) chunk by chunk
+    # (at most max_memory MB buffered), without keeping the whole scenario in memory
+    # Only the new or changed output folders are ingested, the buildings already in the store are kept
+    # The dense results cube (buildings x hours x variables, see toolbox.cube) used by the clustering is updated too
+    import_simulation_data(directory, weather, None, max_memory=1024, return_data=False, store_path=r'results/simulations/store', incremental=True, cube=True)
 
 
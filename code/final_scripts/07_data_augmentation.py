@@ -29,32 +29,18 @@ periods = [['2023-01-01 00:00:00', '2023-01-31 00:00:00'], ['2023-12-01 00:00:00
 n_clusters = 2
 
 
-directory = 'results/simulations/'
-files = os.listdir(directory)
-# Keep only the files containing simulation_data
-files = [file for file in files if 'simulation_data' in file]
-# Select the files starting with present-day
-files = [file for file in files if 'present-day' in file]
-
-# Import the simulation data
-simulation_data = {}
+# Results store written by 06_data_processing_simulation_results.py (see toolbox.results)
+store_path = 'results/simulations/store'
+scenarios = ['present-day']
+
+# Cluster the simulation data
 cluster_labels_dict = {}
 pca_data = {}
 centroids = {}
 
-for key in files:
-    scenario = key.split('_')[0]
-    simulation_data[scenario] = pd.read_csv(directory + key, index_col=0)
-    simulation_data[scenario]['Datetime'] = pd.to_datetime(simulation_data[scenario]['Datetime'])
-    filtered_data = pd.DataFrame()
-    for period in periods: # Assuming periods is your list of periods
-        start_date = pd.to_datetime(period[0])
-        end_date = pd.to_datetime(period[1])
-        period_data = simulation_data[scenario][(simulation_data[scenario]['Datetime'] >= start_date) & (simulation_data[scenario]['Datetime'] <= end_date)]
-        filtered_data = pd.concat([filtered_data, period_data])
-    simulation_data[scenario] = filtered_data
-    
-    cluster_labels_dict[scenario], pca_data[scenario], centroids[scenario] = ts_clustering(simulation_data[scenario], n_clusters=n_clusters, plot=True, scenario=scenario, method='kmeans')
+for scenario in scenarios:
+    # The time series of the periods are read from the results cube of the store (see toolbox.cube)
+    cluster_labels_dict[scenario], pca_data[scenario], centroids[scenario] = ts_clustering(data_path=store_path, periods=periods, n_clusters=n_clusters, plot=True, scenario=scenario, method='kmeans')
 
 
 
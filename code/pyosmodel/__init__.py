@@ -14,4 +14,9 @@ __all__ = [
     'cost',
     'predifinedmodel',
     'model',
+    'simulation',
+    'campaign',
+    'manifest',
+    'cache',
+    'idf',
 ]
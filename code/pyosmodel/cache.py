@@ -0,0 +1,126 @@
+import os
+import shutil
+import time
+
+# Name of the file marking a complete cache entry, its modification time is the last use of the entry
+MARKER_FILE = '.complete'
+
+
+# Definition of the function to link or copy a file
+'''
+Description: This function hard links a file to a new path, or copies it when hard links are not supported (e.g. across drives).
+Inputs:
+    - src: path to the source file
+    - dst: path to the destination file
+Outputs:
+    - dst: path to the destination file
+'''
+def link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+# Definition of the function to get the cache entry of a simulation
+'''
+Description: This function returns the path to the complete cache entry of a simulation.
+Inputs:
+    - cache_dir: path to the cache directory
+    - input_hash: hash of the inputs of the simulation (see pyosmodel.manifest.hash_inputs)
+Outputs:
+    - entry_path: path to the cache entry, None if the simulation is not cached
+'''
+def get_cache_entry(cache_dir, input_hash):
+    entry_path = os.path.join(cache_dir, input_hash)
+    if os.path.exists(os.path.join(entry_path, MARKER_FILE)):
+        return entry_path
+    return None
+
+# Definition of the function to restore the outputs of a simulation from the cache
+'''
+Description: This function restores the outputs of a cached simulation in an output directory and marks the entry as recently used.
+Inputs:
+    - cache_dir: path to the cache directory
+    - input_hash: hash of the inputs of the simulation
+    - output_directory: path to the output directory of the simulation
+Outputs:
+    - restored: True if the outputs were restored, False if the simulation is not cached
+'''
+def restore_from_cache(cache_dir, input_hash, output_directory):
+    entry_path = get_cache_entry(cache_dir, input_hash)
+    if entry_path is None:
+        return False
+    if os.path.exists(output_directory):
+        shutil.rmtree(output_directory)
+    shutil.copytree(entry_path, output_directory, copy_function=link_or_copy, ignore=shutil.ignore_patterns(MARKER_FILE))
+    os.utime(os.path.join(entry_path, MARKER_FILE))
+    return True
+
+# Definition of the function to store the outputs of a simulation in the cache
+'''
+Description: This function stores the outputs of a completed simulation in the cache. The entry is written to a temporary
+             directory which is renamed once complete, so a crash never leaves a partial entry behind.
+Inputs:
+    - cache_dir: path to the cache directory
+    - input_hash: hash of the inputs of the simulation
+    - output_directory: path to the output directory of the simulation
+Outputs:
+    - entry_path: path to the cache entry
+'''
+def store_in_cache(cache_dir, input_hash, output_directory):
+    entry_path = os.path.join(cache_dir, input_hash)
+    if get_cache_entry(cache_dir, input_hash) is not None:
+        return entry_path
+    temporary_path = entry_path + '.tmp' + str(os.getpid())
+    if os.path.exists(temporary_path):
+        shutil.rmtree(temporary_path)
+    shutil.copytree(output_directory, temporary_path, copy_function=link_or_copy)
+    open(os.path.join(temporary_path, MARKER_FILE), 'w').close()
+    if os.path.exists(entry_path):
+        shutil.rmtree(entry_path)
+    os.rename(temporary_path, entry_path)
+    return entry_path
+
+# Definition of the function to get the size of a directory
+'''
+Description: This function returns the total size of the files of a directory.
+Inputs:
+    - directory_path: path to the directory
+Outputs:
+    - size: size in bytes
+'''
+def get_directory_size(directory_path):
+    size = 0
+    for root, dirs, files in os.walk(directory_path):
+        for file in files:
+            size += os.path.getsize(os.path.join(root, file))
+    return size
+
+# Definition of the function to evict the least recently used entries of the cache
+'''
+Description: This function removes the least recently used entries of the cache until its size is below a given limit.
+Inputs:
+    - cache_dir: path to the cache directory
+    - max_size: maximum size of the cache in bytes
+Outputs:
+    - evicted: number of evicted entries
+'''
+def evict_cache(cache_dir, max_size):
+    if not os.path.exists(cache_dir):
+        return 0
+    entries = []
+    for name in os.listdir(cache_dir):
+        marker_path = os.path.join(cache_dir, name, MARKER_FILE)
+        if os.path.exists(marker_path):
+            entries.append((os.path.getmtime(marker_path), get_directory_size(os.path.join(cache_dir, name)), name))
+    total_size = sum(entry[1] for entry in entries)
+
+    evicted = 0
+    for last_used, size, name in sorted(entries):
+        if total_size <= max_size:
+            break
+        shutil.rmtree(os.path.join(cache_dir, name))
+        total_size -= size
+        evicted += 1
+    return evicted
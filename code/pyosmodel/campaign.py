@@ -0,0 +1,359 @@
+import os
+import shutil
+import time
+import traceback
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+from pyosmodel.idf import save_idf, create_base_idf
+from pyosmodel.simulation import run_simulation
+from pyosmodel.manifest import hash_inputs, load_manifest, save_manifest, append_to_manifest, is_completed
+from pyosmodel.cache import restore_from_cache, store_in_cache, evict_cache
+
+
+# Definition of the function to get the scenario name of an output directory
+'''
+Description: This function returns the name of the scenario from the path of its output directory (e.g. 'simulations/present-day/' -> 'present-day').
+Inputs:
+    - output_directory_path: path to the output directory of the scenario
+Outputs:
+    - scenario: name of the scenario
+'''
+def get_scenario_name(output_directory_path):
+    return os.path.basename(os.path.normpath(output_directory_path))
+
+# Definition of the function to build the model of one building of a campaign
+'''
+Description: This function builds the weather-agnostic model of one building and saves it to IDF format.
+             The same IDF file is then simulated with the epw file of every scenario.
+             The model is built with the OpenStudio SDK (engine 'openstudio') or rendered directly as text (engine 'idf', see pyosmodel.idf).
+             It is executed in a worker process of the campaign and never raises: errors are returned in the result.
+Inputs:
+    - key: index of the building in the inputs DataFrame
+    - item_inputs: pd.Series with the inputs of the building (see pyosmodel.model.simulate_model)
+    - output_data: output profile name or list of output variables (see pyosmodel.output.get_output_variables)
+    - idf_path: path to the idf file
+    - step: number of timesteps per hour
+    - seed: seed of the random draws of the model (e.g. the door wall)
+    - engine: 'openstudio' or 'idf'
+    - base_idf: base IDF of the campaign completed with the objects of the building (engine 'idf' only, see pyosmodel.idf.create_base_idf)
+    - output_format: 'csv' or 'sqlite' (engine 'openstudio' only, the base IDF holds the Output:SQLite object of the engine 'idf')
+Outputs:
+    - result: dictionary with the key, status, duration and error of the build
+'''
+def build_building(key, item_inputs, output_data, idf_path, step, seed=None, engine='openstudio', base_idf=None, output_format='csv'):
+    start = time.time()
+    result = {'key': key, 'status': 'completed', 'duration': 0, 'error': ''}
+    try:
+        # The door wall is drawn randomly, seed it so the building does not depend on the worker building it
+        np.random.seed(seed)
+
+        if engine == 'idf':
+            # Render the idf file without the OpenStudio SDK
+            save_idf(item_inputs, output_data, idf_path, step, base_idf=base_idf)
+        else:
+            # The OpenStudio SDK is only imported by this engine, the engine 'idf' runs without it
+            from pyosmodel import utils
+            from pyosmodel.model import simulate_model
+            from pyosmodel.params import change_timestep
+            from pyosmodel.output import set_output_sqlite
+
+            # Define the model
+            model = simulate_model(item_inputs, output_data)
+            change_timestep(model, step)
+            if output_format == 'sqlite':
+                set_output_sqlite(model)
+
+            # Save the model in an idf file
+            utils.save_model_to_idf(model, idf_path)
+    except Exception:
+        result['status'] = 'failed'
+        result['error'] = traceback.format_exc()
+    result['duration'] = time.time() - start
+    return result
+
+# Definition of the function to simulate one building of a campaign
+'''
+Description: This function runs EnergyPlus on the IDF file of one building with the epw file of one scenario.
+             It is executed in a worker process of the campaign and never raises: errors are returned in the result.
+Inputs:
+    - key: index of the building in the inputs DataFrame
+    - idf_path: path to the idf file
+    - epw_path: path to the epw file
+    - output_directory: path to the output directory of the simulation
+    - energyplus_install_dir: path to the EnergyPlus installation directory
+    - timeout: maximum duration of the EnergyPlus run in seconds
+    - readvars: if True, convert the outputs to eplusout.csv with ReadVarsESO
+Outputs:
+    - result: dictionary with the key, status, duration, return code and error of the simulation
+'''
+def simulate_building(key, idf_path, epw_path, output_directory, energyplus_install_dir, timeout=None, readvars=True):
+    start = time.time()
+    result = {'key': key, 'status': 'completed', 'duration': 0, 'returncode': None, 'error': ''}
+    try:
+        run = run_simulation(idf_path, epw_path, output_directory, energyplus_install_dir, timeout=timeout, check=False, readvars=readvars)
+        result['returncode'] = run['returncode']
+        if run['timed_out']:
+            result['status'] = 'failed'
+            result['error'] = 'EnergyPlus timed out after {} seconds'.format(timeout)
+        elif not run['success']:
+            result['status'] = 'failed'
+            result['error'] = run['err'] or run['stderr']
+    except Exception:
+        result['status'] = 'failed'
+        result['error'] = traceback.format_exc()
+    result['duration'] = time.time() - start
+    return result
+
+# Definition of the function to run a parametric campaign of simulations
+'''
+Description: This function runs the simulation of every building of the inputs DataFrame for every weather scenario.
+             Each building is translated once into a weather-agnostic IDF file, then the (IDF x epw) simulations of all the
+             scenarios are run with EnergyPlus. The two stages are pipelined: the models are built by a pool of worker processes
+             and wait in a bounded queue for the pool of EnergyPlus workers, so translation overlaps the EnergyPlus runs and the
+             slowest stage is kept busy. When a build worker process dies (e.g. crash of the OpenStudio SDK), the pool of build
+             workers is recreated and the models that were being built are built again one at a time, so only the model that
+             kills its worker fails. The queue depth and the utilisation of each stage (share of the time its workers are busy)
+             are printed with the progress and returned in the summary. The failed simulations are gathered per scenario
+             in failed_simulations.csv (one column of inputs per failed building).
+             Every simulation is recorded in the journal of the campaign manifest as soon as it finishes, and the manifest
+             is saved with the journal merged at the end of the campaign (see pyosmodel.manifest). When the campaign is run again,
+             the simulations recorded as completed with the same inputs are skipped and their outputs are left untouched,
+             so an interrupted or partially failed campaign only runs what is missing or failed.
+             With a cache directory, the outputs of the completed simulations are also stored by hash of their inputs
+             (inputs row, output variables, timestep and epw content) and reused instead of building and running the model.
+Inputs:
+    - inputs: pd.DataFrame with one row of inputs per building (see pyosmodel.predefinedmodel)
+    - epw_paths: list of paths to the epw files, one per scenario
+    - output_directory_paths: list of paths to the output directories, one per scenario
+    - output_data: output profile name or list of output variables (see pyosmodel.output.get_output_variables)
+    - energyplus_install_dir: path to the EnergyPlus installation directory
+    - step: number of timesteps per hour
+    - workers: number of workers running EnergyPlus (default: number of cores)
+    - build_workers: number of worker processes building the models (default: a quarter of the EnergyPlus workers, at least 1)
+    - queue_size: maximum number of simulations whose model is built or being built and which wait for an EnergyPlus worker
+                  (default: twice the number of EnergyPlus workers, at least the number of scenarios)
+    - timeout: maximum duration of one EnergyPlus run in seconds (default: None, no limit)
+    - manifest_path: path to the manifest csv file (default: manifest.csv next to the output directories)
+    - cache_dir: path to the cache directory (default: None, no cache)
+    - cache_max_size: maximum size of the cache in bytes, the least recently used entries are evicted every 10 simulations
+                      and at the end of the campaign (default: None, no limit)
+    - models_directory: path to the directory of the IDF files shared by the scenarios (default: models/ next to the output directories)
+    - engine: 'openstudio' to build the models with the OpenStudio SDK, 'idf' to render the IDF files directly (see pyosmodel.idf).
+              With 'idf', the objects shared by all the buildings are rendered once in models/base.idf and only the objects
+              of each building are rendered per model
+    - output_format: 'csv' to convert the outputs to eplusout.csv with ReadVarsESO, 'sqlite' to write them to eplusout.sql only
+                     (no ReadVarsESO run, read with toolbox.eplusout.read_simulation_sql)
+Outputs:
+    - results: pd.DataFrame with the scenario, key, status, duration, return code and error of each simulation run
+    - summary: dictionary with the number of models built, simulations run, completed, failed, skipped and cached simulations, the total duration,
+               the mean and maximum queue depth and the utilisation of the build and run stages
+'''
+def run_campaign(inputs, epw_paths, output_directory_paths, output_data, energyplus_install_dir, step=4, workers=None, build_workers=None, queue_size=None, timeout=None, manifest_path=None, cache_dir=None, cache_max_size=None, models_directory=None, engine='openstudio', output_format='csv'):
+    if len(epw_paths) != len(output_directory_paths):
+        raise ValueError("One output directory is needed per epw file. Number of epw files = " + str(len(epw_paths)) + ". Number of output directories = " + str(len(output_directory_paths)))
+    if engine not in ['openstudio', 'idf']:
+        raise ValueError("The engine must be 'openstudio' or 'idf'. Engine = " + str(engine))
+    if output_format not in ['csv', 'sqlite']:
+        raise ValueError("The output format must be 'csv' or 'sqlite'. Output format = " + str(output_format))
+    if workers is None:
+        workers = os.cpu_count()
+    run_workers = workers
+    if build_workers is None:
+        build_workers = max(1, run_workers // 4)
+    if queue_size is None:
+        queue_size = 2 * run_workers
+    # A built model releases the simulations of all its scenarios at once
+    queue_size = max(queue_size, len(epw_paths))
+    campaign_directory = os.path.dirname(os.path.normpath(output_directory_paths[0]))
+    if manifest_path is None:
+        manifest_path = os.path.join(campaign_directory, 'manifest.csv')
+    if models_directory is None:
+        models_directory = os.path.join(campaign_directory, 'models')
+    # Merge the journal of an interrupted campaign, so that its truncated last row is dropped before the journal is appended to
+    manifest = load_manifest(manifest_path)
+    save_manifest(manifest, manifest_path)
+
+    # Set up the output directories
+    os.makedirs(models_directory, exist_ok=True)
+    base_idf = None
+    if engine == 'idf':
+        base_idf = create_base_idf(output_data, step, output_format == 'sqlite')
+        with open(os.path.join(models_directory, 'base.idf'), 'w') as file:
+            file.write(base_idf)
+    for output_directory_path in output_directory_paths:
+        os.makedirs(output_directory_path + 'outputs', exist_ok=True)
+        inputs.to_csv(output_directory_path + 'inputs.csv')
+
+    # List the simulations to run for each building
+    skipped = 0
+    cache_hits = 0
+    pending = {}
+    for key, item_inputs in inputs.iterrows():
+        for output_directory_path, epw_path in zip(output_directory_paths, epw_paths):
+            scenario = get_scenario_name(output_directory_path)
+            input_hash = hash_inputs(item_inputs, output_data, step, epw_path, engine, output_format)
+            if is_completed(manifest, scenario, key, input_hash):
+                skipped += 1
+                continue
+            output_directory = output_directory_path + 'outputs/' + str(key) + '/'
+            if cache_dir is not None and restore_from_cache(cache_dir, input_hash, output_directory):
+                cache_hits += 1
+                append_to_manifest(manifest_path, scenario, key, input_hash, 'completed', 0.0, output_directory)
+                continue
+            # Remove the outputs of a failed or interrupted run of this building only
+            if os.path.exists(output_directory):
+                shutil.rmtree(output_directory)
+            pending.setdefault(key, []).append((scenario, epw_path, input_hash, output_directory))
+    number_simulations = sum(len(jobs) for jobs in pending.values())
+    print('{} Simulations already completed, {} restored from the cache, {} simulations to run'.format(skipped, cache_hits, number_simulations))
+
+    print('Starting simulation')
+    start = time.time()
+    results = []
+    # Build stage: models translated to IDF in worker processes (CPU bound)
+    # Run stage: EnergyPlus processes watched by threads (the threads only wait for EnergyPlus)
+    # The built models wait in a bounded queue so the build stage never runs far ahead of EnergyPlus
+    keys = deque(pending.keys())
+    queue = deque()
+    futures = {}
+    builds_running = 0
+    # The models being built when the build pool broke are built again alone, to find the one killing its worker
+    isolated_keys = set()
+    isolated_running = False
+    build_pool = 0
+    runs_running = 0
+    queued_by_builds = 0
+    busy_time = {'build': 0, 'run': 0}
+    queue_depth_time = 0
+    queue_depth_max = 0
+    # The build pool is recreated when a worker process dies
+    build_executor = ProcessPoolExecutor(max_workers=build_workers)
+    with ThreadPoolExecutor(max_workers=run_workers) as run_executor:
+        while keys or queue or futures:
+            # Feed the idle EnergyPlus workers from the queue
+            while queue and runs_running < run_workers:
+                key, idf_path, scenario, epw_path, input_hash, output_directory = queue.popleft()
+                future = run_executor.submit(simulate_building, key, idf_path, epw_path, output_directory, energyplus_install_dir, timeout, output_format == 'csv')
+                futures[future] = ('run', key, scenario, input_hash, output_directory)
+                runs_running += 1
+
+            # Build the next models while the queue (including the simulations of the models being built) has room
+            while keys and builds_running < build_workers and len(queue) + queued_by_builds + len(pending[keys[0]]) <= queue_size:
+                # A model built again after a broken pool runs alone in the build pool
+                if builds_running > 0 and (isolated_running or keys[0] in isolated_keys):
+                    break
+                key = keys.popleft()
+                item_inputs = inputs.loc[key]
+                idf_path = os.path.join(models_directory, str(key) + '.idf')
+                # The random draws only depend on the inputs, so that the cached outputs match their hash
+                seed = int(hash_inputs(item_inputs, output_data, step, None)[:8], 16)
+                try:
+                    future = build_executor.submit(build_building, key, item_inputs, output_data, idf_path, step, seed, engine, base_idf, output_format)
+                except BrokenProcessPool:
+                    # A worker died while idle: the models in flight are handled when their futures fail
+                    keys.appendleft(key)
+                    build_executor.shutdown(wait=False)
+                    build_executor = ProcessPoolExecutor(max_workers=build_workers)
+                    build_pool += 1
+                    continue
+                futures[future] = ('build', key, idf_path, build_pool)
+                builds_running += 1
+                queued_by_builds += len(pending[key])
+                isolated_running = key in isolated_keys
+
+            queue_depth = len(queue)
+            queue_depth_max = max(queue_depth_max, queue_depth)
+            wait_start = time.time()
+            done, not_done = wait(futures, return_when=FIRST_COMPLETED)
+            queue_depth_time += queue_depth * (time.time() - wait_start)
+
+            for future in done:
+                job = futures.pop(future)
+                key = job[1]
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    # A build worker process died (e.g. crash of the OpenStudio SDK) and broke the pool with every model being built
+                    if job[3] == build_pool:
+                        build_executor.shutdown(wait=False)
+                        build_executor = ProcessPoolExecutor(max_workers=build_workers)
+                        build_pool += 1
+                    if key not in isolated_keys:
+                        # The model cannot be told apart from the others being built: build it again alone
+                        builds_running -= 1
+                        queued_by_builds -= len(pending[key])
+                        isolated_keys.add(key)
+                        keys.appendleft(key)
+                        continue
+                    result = {'key': key, 'status': 'failed', 'duration': 0, 'returncode': None, 'error': 'The build worker process died\n' + traceback.format_exc()}
+                except Exception:
+                    # The EnergyPlus watcher thread raised
+                    result = {'key': key, 'status': 'failed', 'duration': 0, 'returncode': None, 'error': traceback.format_exc()}
+                busy_time[job[0]] += result['duration']
+
+                if job[0] == 'build':
+                    builds_running -= 1
+                    isolated_running = False
+                    queued_by_builds -= len(pending[key])
+                    if result['status'] == 'completed':
+                        for scenario, epw_path, input_hash, output_directory in pending[key]:
+                            queue.append((key, job[2], scenario, epw_path, input_hash, output_directory))
+                        continue
+                    # The model could not be built: every simulation of the building failed
+                    finished = [dict(result, scenario=scenario, returncode=None, input_hash=input_hash, output_directory=output_directory) for scenario, epw_path, input_hash, output_directory in pending[key]]
+                else:
+                    runs_running -= 1
+                    finished = [dict(result, scenario=job[2], input_hash=job[3], output_directory=job[4])]
+
+                for result in finished:
+                    results.append(result)
+                    if cache_dir is not None and result['status'] == 'completed':
+                        store_in_cache(cache_dir, result['input_hash'], result['output_directory'])
+                    append_to_manifest(manifest_path, result['scenario'], key, result['input_hash'], result['status'], result['duration'], result['output_directory'])
+
+                    # For every 10 simulations, print the progress and the load of the stages, and keep the cache below its maximum size
+                    i = len(results)
+                    if i % 10 == 0:
+                        if cache_dir is not None and cache_max_size is not None:
+                            evict_cache(cache_dir, cache_max_size)
+                        duration = time.time() - start
+                        estimated_time_left = duration/i*(number_simulations-i)/60
+                        print('Progression ' + str(i) + '/' + str(number_simulations) + ' Estimated time left:' + str(estimated_time_left) + ' Queue depth: ' + str(len(queue)) + ' Build stage utilisation: ' + str(round(busy_time['build'] / (duration * build_workers), 2)) + ' Run stage utilisation: ' + str(round(busy_time['run'] / (duration * run_workers), 2)))
+    build_executor.shutdown()
+    # Merge the journal of the finished simulations into the manifest
+    manifest = load_manifest(manifest_path)
+    save_manifest(manifest, manifest_path)
+
+    results = pd.DataFrame(results, columns=['scenario', 'key', 'status', 'duration', 'returncode', 'error'])
+    if cache_dir is not None and cache_max_size is not None:
+        evict_cache(cache_dir, cache_max_size)
+
+    # Save the failed simulations of the whole campaign (including previous runs) in a csv file for exploration
+    for output_directory_path in output_directory_paths:
+        scenario = get_scenario_name(output_directory_path)
+        failed_keys = [key for key in inputs.index if (scenario, str(key)) in manifest.index and manifest.loc[(scenario, str(key)), 'status'] == 'failed']
+        inputs.loc[failed_keys].T.to_csv(output_directory_path + 'failed_simulations.csv')
+
+    duration = max(time.time() - start, 1e-9)
+    summary = {
+        'models': len(pending),
+        'simulations': len(results),
+        'completed': int((results['status'] == 'completed').sum()),
+        'failed': int((results['status'] == 'failed').sum()),
+        'skipped': skipped,
+        'cache_hits': cache_hits,
+        'duration': duration,
+        'queue_depth_mean': queue_depth_time / duration,
+        'queue_depth_max': queue_depth_max,
+        'build_utilisation': busy_time['build'] / (duration * build_workers),
+        'run_utilisation': busy_time['run'] / (duration * run_workers),
+    }
+    print('Total time: ' + str(summary['duration']))
+    print('{} Simulations failed'.format(summary['failed']))
+    print('{} Simulations restored from the cache'.format(summary['cache_hits']))
+    print('Build stage utilisation: {:.2f}, run stage utilisation: {:.2f}, mean queue depth: {:.1f}'.format(summary['build_utilisation'], summary['run_utilisation'], summary['queue_depth_mean']))
+    return results, summary
@@ -0,0 +1,366 @@
+import numpy as np
+
+from common import SIMULATION_YEAR
+from pyosmodel.output import get_output_variables
+
+# Version of EnergyPlus targeted by the IDF files (EnergyPlus 23.1, shipped with OpenStudio 3.6.1)
+ENERGYPLUS_VERSION = '23.1'
+
+# Names of the walls of the box, in the order of pyosmodel.geometry.create_geometry_box
+WALL_NAMES = ['Wall 1', 'Wall 2', 'Wall 3', 'Wall 4']
+
+# Inset of the windows from the edges of the wall and height of the sill, as in OpenStudio Surface.setWindowToWallRatio
+WINDOW_EDGE_OFFSET = 0.0254
+WINDOW_SILL_HEIGHT = 0.762
+
+# Door properties, as in pyosmodel.model.simulate_model
+DOOR_U_FACTOR = 0.6
+DOOR_THICKNESS = 0.05
+DOOR_HEIGHT_ABOVE_GROUND = 0.01
+
+
+# Definition of the function to format a field of an IDF object
+'''
+Description: This function formats a field of an IDF object. Floats are written with their full precision.
+Inputs:
+    - value: value of the field (string, number or None for an empty field)
+Outputs:
+    - field: formatted field
+'''
+def format_field(value):
+    if value is None:
+        return ''
+    if isinstance(value, (bool, np.bool_)):
+        return 'Yes' if value else 'No'
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        return repr(float(value))
+    return str(value)
+
+# Definition of the function to format an IDF object
+'''
+Description: This function formats an IDF object from its type and the list of its fields. Trailing empty fields are left out.
+Inputs:
+    - object_type: type of the object (e.g. 'Material')
+    - fields: list of fields
+Outputs:
+    - idf_object: formatted object
+'''
+def format_object(object_type, fields):
+    while fields and fields[-1] is None:
+        fields = fields[:-1]
+    return object_type + ',\n  ' + ',\n  '.join(format_field(field) for field in fields) + ';\n'
+
+# Definition of the function to format a list of vertices
+'''
+Description: This function flattens a list of (x, y, z) vertices into the fields of a surface.
+Inputs:
+    - vertices: list of (x, y, z) tuples
+Outputs:
+    - fields: list with the number of vertices followed by their coordinates
+'''
+def format_vertices(vertices):
+    fields = [len(vertices)]
+    for vertex in vertices:
+        fields.extend(vertex)
+    return fields
+
+# Definition of the function to get the frames of the walls of a box
+'''
+Description: This function returns the frame of each wall of a box as seen from the outside: the lower left corner,
+             the horizontal direction from left to right and the width of the wall. The walls match pyosmodel.geometry.create_geometry_box:
+             Wall 1 faces -X, Wall 2 faces +X, Wall 3 faces -Y and Wall 4 faces +Y.
+Inputs:
+    - length: length of the box along X in m
+    - width: width of the box along Y in m
+Outputs:
+    - frames: dictionary {wall name: (lower left corner (x, y), direction (dx, dy), wall width)}
+'''
+def get_wall_frames(length, width):
+    return {
+        'Wall 1': ((0.0, width), (0.0, -1.0), width),
+        'Wall 2': ((length, 0.0), (0.0, 1.0), width),
+        'Wall 3': ((0.0, 0.0), (1.0, 0.0), length),
+        'Wall 4': ((length, width), (-1.0, 0.0), length),
+    }
+
+# Definition of the function to calculate the vertices of a rectangle drawn on a wall
+'''
+Description: This function calculates the vertices of a rectangle drawn on a wall from its coordinates in the frame of the wall.
+             The vertices start at the upper left corner and are counterclockwise seen from the outside.
+Inputs:
+    - frame: frame of the wall (see get_wall_frames)
+    - left: horizontal position of the left edge from the lower left corner of the wall in m
+    - right: horizontal position of the right edge in m
+    - bottom: height of the bottom edge in m
+    - top: height of the top edge in m
+Outputs:
+    - vertices: list of (x, y, z) tuples
+'''
+def calculate_wall_rectangle_vertices(frame, left, right, bottom, top):
+    (x, y), (dx, dy), wall_width = frame
+    x_left, y_left = x + left * dx, y + left * dy
+    x_right, y_right = x + right * dx, y + right * dy
+    return [(x_left, y_left, top), (x_left, y_left, bottom), (x_right, y_right, bottom), (x_right, y_right, top)]
+
+# Definition of the function to calculate the position of the window of a wall
+'''
+Description: This function calculates the position of the window of a wall with a given window to wall ratio, following
+             OpenStudio Surface.setWindowToWallRatio: the window spans the width of the wall minus one inch on each side and its
+             sill is 0.762 m above the floor, lowered if the window would reach the top of the wall.
+Inputs:
+    - wall_width: width of the wall in m
+    - wall_height: height of the wall in m
+    - window_to_wall_ratio: float between 0 and 1
+Outputs:
+    - position: (left, right, bottom, top) in the frame of the wall, None if no window can be placed
+'''
+def calculate_window_position(wall_width, wall_height, window_to_wall_ratio):
+    if window_to_wall_ratio <= 0 or window_to_wall_ratio >= 1:
+        return None
+    window_width = wall_width - 2 * WINDOW_EDGE_OFFSET
+    window_height = window_to_wall_ratio * wall_width * wall_height / window_width
+    if window_height > wall_height - 2 * WINDOW_EDGE_OFFSET:
+        return None
+    bottom = WINDOW_SILL_HEIGHT
+    if bottom + window_height > wall_height - WINDOW_EDGE_OFFSET:
+        bottom = wall_height - WINDOW_EDGE_OFFSET - window_height
+    return WINDOW_EDGE_OFFSET, wall_width - WINDOW_EDGE_OFFSET, bottom, bottom + window_height
+
+# Definition of the function to get unique names for the materials of a model
+'''
+Description: This function renames a material whose name is already used, the same way OpenStudio does (e.g. 'Concrete 1').
+Inputs:
+    - name: name of the material
+    - used_names: set of the names already used, updated in place
+Outputs:
+    - name: unique name
+'''
+def get_unique_name(name, used_names):
+    unique_name = name
+    index = 1
+    while unique_name in used_names:
+        unique_name = name + ' ' + str(index)
+        index += 1
+    used_names.add(unique_name)
+    return unique_name
+
+# Definition of the function to render the materials and the construction of a construction list
+'''
+Description: This function renders the materials of a construction list (see pyosmodel.construction.create_material_list)
+             and the construction made of these layers.
+Inputs:
+    - name: name of the construction
+    - material_database: list of [name, thickness, conductivity, density, specific heat, thermal absorptance, solar absorptance]
+    - used_names: set of the material names already used
+Outputs:
+    - idf_objects: list of formatted objects
+'''
+def render_construction(name, material_database, used_names):
+    idf_objects = []
+    layers = []
+    for material in material_database:
+        material_name = get_unique_name(material[0], used_names)
+        idf_objects.append(format_object('Material', [material_name, 'Smooth', material[1], material[2], material[3], material[4], material[5], material[6], None]))
+        layers.append(material_name)
+    idf_objects.append(format_object('Construction', [name] + layers))
+    return idf_objects
+
+# Definition of the function to render a compact schedule
+'''
+Description: This function renders a schedule repeated every day of the year.
+Inputs:
+    - name: name of the schedule
+    - schedule_type_limits: name of the schedule type limits (None for no limits)
+    - days: list of (day types, [(until time 'HH:MM', value), ...]), e.g. [('Weekends', [('24:00', 1)]), ('AllOtherDays', ...)]
+Outputs:
+    - idf_object: formatted object
+'''
+def render_schedule(name, schedule_type_limits, days):
+    fields = [name, schedule_type_limits, 'Through: 12/31']
+    for day_types, values in days:
+        fields.append('For: ' + day_types)
+        for until, value in values:
+            fields.append('Until: ' + until)
+            fields.append(value)
+    return format_object('Schedule:Compact', fields)
+
+# Definition of the function to render the base IDF of a campaign
+'''
+Description: This function renders the objects of the IDF which are the same for every building of a campaign:
+             simulation control, run period, timestep, geometry rules, fixed schedules and output variables.
+             The base IDF is rendered once per campaign and completed for each building with create_building_idf.
+Inputs:
+    - output_data: output profile name or list of output variables (see pyosmodel.output.get_output_variables)
+    - step: number of timesteps per hour
+    - sqlite: if True, write the output variables to eplusout.sql (Output:SQLite)
+Outputs:
+    - base_idf: content of the base IDF
+'''
+def create_base_idf(output_data, step=4, sqlite=False):
+    idf_objects = [
+        format_object('Version', [ENERGYPLUS_VERSION]),
+        format_object('SimulationControl', ['No', 'No', 'No', 'No', 'Yes', 'No', 1]),
+        format_object('Timestep', [step]),
+        format_object('RunPeriod', ['Run Period 1', 1, 1, SIMULATION_YEAR, 12, 31, SIMULATION_YEAR, None, 'Yes', 'Yes', 'No', 'Yes', 'Yes', 'No']),
+        format_object('GlobalGeometryRules', ['UpperLeftCorner', 'Counterclockwise', 'Relative', 'Relative', 'Relative']),
+        format_object('Zone', ['Thermal Zone', 0, 0, 0, 0, 1, 1, None, None, None, None, None, 'Yes']),
+    ]
+
+    ## SCHEDULES ##
+    idf_objects += [
+        format_object('ScheduleTypeLimits', ['Occupancy Fraction Schedule Type Limits', 0, 1, 'Discrete', 'Dimensionless']),
+        render_schedule('Occupancy Fraction Schedule', 'Occupancy Fraction Schedule Type Limits', [('Weekends', [('24:00', 1)]), ('AllOtherDays', [('06:00', 1), ('18:00', 0), ('24:00', 1)])]),
+        format_object('ScheduleTypeLimits', ['Always On/Off Schedule Type Limits', 0, 1, 'Discrete', 'Dimensionless']),
+        render_schedule('Always On Schedule', 'Always On/Off Schedule Type Limits', [('AllDays', [('24:00', 1)])]),
+        format_object('ScheduleTypeLimits', ['Lighting Fraction Schedule Type Limits', 0, 1, 'Discrete', 'Dimensionless']),
+        render_schedule('Lighting Fraction Schedule', 'Lighting Fraction Schedule Type Limits', [('AllDays', [('04:00', 0), ('06:00', 1), ('18:00', 0), ('22:00', 1), ('24:00', 0)])]),
+        # Equipment used every day from 18:00 during 30 minutes
+        format_object('ScheduleTypeLimits', ['Equipment Schedule Type Limits', 0, 1, 'Discrete', 'Dimensionless']),
+        render_schedule('Equipment Schedule', 'Equipment Schedule Type Limits', [('AllDays', [('18:00', 0), ('18:30', 1), ('24:00', 0)])]),
+        format_object('ScheduleTypeLimits', ['Heating Set Point Schedule Type Limits', 0, 100, 'Continuous', 'Temperature']),
+    ]
+
+    ## OUTPUTS ##
+    for output_variable in get_output_variables(output_data):
+        idf_objects.append(format_object('Output:Variable', [output_variable['keyValue'], output_variable['variableName'], output_variable['reportingFrequency']]))
+    if sqlite:
+        idf_objects.append(format_object('Output:SQLite', ['Simple']))
+
+    return '\n'.join(idf_objects)
+
+# Definition of the function to render the objects of a building
+'''
+Description: This function renders the objects of the IDF which depend on the inputs of a building: orientation, geometry,
+             constructions, building-specific schedules, internal loads and infiltration. Appended to the base IDF of the campaign
+             (see create_base_idf), they make the IDF of the building.
+Inputs:
+    - input_data: pd.Series or dictionary with the inputs of the building (see pyosmodel.model.simulate_model)
+    - door_wall: name of the wall with the door (default: None, random wall)
+Outputs:
+    - building_idf: content of the objects of the building
+'''
+def create_building_idf(input_data, door_wall=None):
+    building_length = float(input_data['building_length'])
+    building_width = float(input_data['building_width'])
+    building_height = float(input_data['building_height'])
+    floor_area = float(input_data['floor_area'])
+    window_to_wall_ratio = float(input_data['window_to_wall_ratio'])
+    door_width = float(input_data['door_width'])
+    door_height = float(input_data['door_height_fraction_building_height']) * building_height
+    elec_gas = input_data['elec_gas']
+    if door_wall is None:
+        door_wall = np.random.choice(WALL_NAMES)
+    if door_wall not in WALL_NAMES:
+        raise ValueError("The door wall must be one of " + str(WALL_NAMES) + ". Door wall = " + str(door_wall))
+
+    # Orientation converted twice to radians, as in simulate_model (setNorthAxis expects degrees)
+    north_axis = float(input_data['orientation']) * np.pi / 180 * np.pi / 180
+    idf_objects = [format_object('Building', ['Building', north_axis, 'Suburbs', 0.04, 0.4, 'FullExterior', 25, 6])]
+
+    ## CONSTRUCTIONS ##
+    used_names = set()
+    idf_objects += render_construction('Wall Construction', input_data['wall_construction_list'], used_names)
+    idf_objects += render_construction('Roof Construction', input_data['roof_construction_list'], used_names)
+    idf_objects += render_construction('Floor Construction', input_data['floor_construction_list'], used_names)
+    idf_objects += render_construction('Ground Construction', input_data['ground_construction_list'], used_names)
+    idf_objects += [
+        format_object('Material', ['Door Material', 'Smooth', DOOR_THICKNESS, 1 / DOOR_U_FACTOR, 0.1, 1400, None, None, None]),
+        format_object('Construction', ['Door Construction', 'Door Material']),
+        format_object('WindowMaterial:SimpleGlazingSystem', ['Window Material', float(input_data['u_factor']), float(input_data['shgc']), None]),
+        format_object('Construction', ['Window Construction', 'Window Material']),
+    ]
+
+    ## GEOMETRY ##
+    frames = get_wall_frames(building_length, building_width)
+    for wall_name in WALL_NAMES:
+        frame = frames[wall_name]
+        wall_vertices = calculate_wall_rectangle_vertices(frame, 0.0, frame[2], 0.0, building_height)
+        idf_objects.append(format_object('BuildingSurface:Detailed', [wall_name, 'Wall', 'Wall Construction', 'Thermal Zone', None, 'Outdoors', None, 'SunExposed', 'WindExposed', None] + format_vertices(wall_vertices)))
+        if wall_name == door_wall:
+            # Door centered on the wall, 0.01 m above the ground
+            door_vertices = calculate_wall_rectangle_vertices(frame, frame[2] / 2 - door_width / 2, frame[2] / 2 + door_width / 2, DOOR_HEIGHT_ABOVE_GROUND, DOOR_HEIGHT_ABOVE_GROUND + door_height)
+            idf_objects.append(format_object('FenestrationSurface:Detailed', [wall_name + ' Door', 'Door', 'Door Construction', wall_name, None, None, None, 1] + format_vertices(door_vertices)))
+            continue
+        # OpenStudio does not add a window to a wall with a door
+        position = calculate_window_position(frame[2], building_height, window_to_wall_ratio)
+        if position is not None:
+            window_vertices = calculate_wall_rectangle_vertices(frame, *position)
+            idf_objects.append(format_object('FenestrationSurface:Detailed', [wall_name + ' Window', 'Window', 'Window Construction', wall_name, None, None, None, 1] + format_vertices(window_vertices)))
+    roof_vertices = [(building_length, 0.0, building_height), (building_length, building_width, building_height), (0.0, building_width, building_height), (0.0, 0.0, building_height)]
+    floor_vertices = [(0.0, 0.0, 0.0), (0.0, building_width, 0.0), (building_length, building_width, 0.0), (building_length, 0.0, 0.0)]
+    idf_objects += [
+        format_object('BuildingSurface:Detailed', ['Roof', 'Roof', 'Roof Construction', 'Thermal Zone', None, 'Outdoors', None, 'SunExposed', 'WindExposed', None] + format_vertices(roof_vertices)),
+        format_object('BuildingSurface:Detailed', ['Floor', 'Floor', 'Floor Construction', 'Thermal Zone', None, 'Ground', None, 'NoSun', 'NoWind', None] + format_vertices(floor_vertices)),
+    ]
+
+    ## SCHEDULES ##
+    idf_objects += [
+        render_schedule('Activity Level Schedule', None, [('AllDays', [('24:00', float(input_data['activity_level']))])]),
+        render_schedule('Heating Set Point Schedule', 'Heating Set Point Schedule Type Limits', [('AllDays', [('24:00', float(input_data['heating_setpoint']))])]),
+    ]
+
+    ## INTERNAL LOADS ##
+    people_per_area = float(input_data['number_people']) / floor_area
+    lighting_per_area = float(input_data['lighting_bulbs']) * 100 / floor_area
+    P_equip_per_area = float(input_data['P_equip']) / floor_area
+    design_flow_rate = float(input_data['infiltration_rate']) * building_length * building_width * building_height / 3600
+    idf_objects += [
+        format_object('People', ['People', 'Thermal Zone', 'Occupancy Fraction Schedule', 'Area/Person', None, None, 1 / people_per_area, 0.5, 0.5, 'Activity Level Schedule', 0.0117, 'No', 'ZoneAveraged']),
+        format_object('ZoneInfiltration:DesignFlowRate', ['Infiltration', 'Thermal Zone', 'Always On Schedule', 'Flow/Zone', design_flow_rate, None, None, None, 1, 0, 0, 0]),
+        format_object('Lights', ['Lights', 'Thermal Zone', 'Lighting Fraction Schedule', 'Watts/Area', None, lighting_per_area, None, 0, 0.1, 0.9, 1]),
+    ]
+    if elec_gas == 'Gas':
+        idf_objects.append(format_object('GasEquipment', ['Gas Equipment', 'Thermal Zone', 'Equipment Schedule', 'Watts/Area', None, P_equip_per_area, None, 0.3, 0.5, 0.2]))
+    elif elec_gas == 'Electric':
+        idf_objects.append(format_object('ElectricEquipment', ['Electric Equipment', 'Thermal Zone', 'Equipment Schedule', 'Watts/Area', None, P_equip_per_area, None, 0.4, 0.5, 0.1]))
+
+    return '\n'.join(idf_objects)
+
+# Definition of the function to render the IDF of a building
+'''
+Description: This function renders the IDF of a building directly from its inputs, without the OpenStudio SDK.
+             It writes the same model as pyosmodel.model.simulate_model followed by the OpenStudio ForwardTranslator:
+             one thermal zone in a box with four walls, a roof and a floor, a door on one wall and a central window on the other walls,
+             the same materials, schedules, internal loads, infiltration and output variables.
+             Differences with the OpenStudio path:
+                - objects are named explicitly instead of 'Construction 1', 'Schedule Rule 1', ...
+                - the ruleset schedules are written as Schedule:Compact objects with the same values
+                - the OpenStudio default objects left to their EnergyPlus default values are not written
+                - the door wall is drawn with numpy among the four walls, not among the OpenStudio surfaces (whose order is not stable)
+             The electric heating coil of simulate_model is not connected to any air loop, so the ForwardTranslator does not export it;
+             it is not written here either. The north axis reproduces simulate_model, where the orientation is converted to radians twice.
+             The model is weather-agnostic: EnergyPlus takes the weather and the location from the epw file given at run time.
+Inputs:
+    - input_data: pd.Series or dictionary with the inputs of the building (see pyosmodel.model.simulate_model)
+    - output_data: output profile name or list of output variables (see pyosmodel.output.get_output_variables)
+    - step: number of timesteps per hour
+    - door_wall: name of the wall with the door (default: None, random wall)
+    - base_idf: base IDF of the campaign (default: None, rendered from output_data and step, see create_base_idf)
+Outputs:
+    - idf: content of the IDF file
+'''
+def create_idf(input_data, output_data, step=4, door_wall=None, base_idf=None):
+    if base_idf is None:
+        base_idf = create_base_idf(output_data, step)
+    return base_idf + '\n' + create_building_idf(input_data, door_wall)
+
+# Definition of the function to save the IDF of a building
+'''
+Description: This function renders the IDF of a building (see create_idf) and saves it to a file.
+Inputs:
+    - input_data: pd.Series or dictionary with the inputs of the building
+    - output_data: output profile name or list of output variables (see pyosmodel.output.get_output_variables)
+    - idf_path: path to the idf file
+    - step: number of timesteps per hour
+    - door_wall: name of the wall with the door (default: None, random wall)
+    - base_idf: base IDF of the campaign (default: None, rendered from output_data and step)
+Outputs:
+    - idf_path: path to the idf file
+'''
+def save_idf(input_data, output_data, idf_path, step=4, door_wall=None, base_idf=None):
+    idf = create_idf(input_data, output_data, step, door_wall, base_idf)
+    with open(idf_path, 'w') as file:
+        file.write(idf)
+    return idf_path
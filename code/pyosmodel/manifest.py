@@ -0,0 +1,139 @@
+import os
+import csv
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+from common import hash_file
+from pyosmodel.output import get_output_variables
+
+MANIFEST_COLUMNS = ['scenario', 'key', 'input_hash', 'status', 'duration', 'output_path']
+# The simulations finished since the last save of the manifest are appended to the journal (manifest path + JOURNAL_SUFFIX)
+JOURNAL_SUFFIX = '.journal'
+
+
+# Definition of the function to convert inputs to plain python objects
+'''
+Description: This function converts a value of an inputs row (numpy scalars, arrays, nested lists) to plain python objects
+             so that it can be serialised to JSON in a canonical way.
+Inputs:
+    - value: value to convert
+Outputs:
+    - value: converted value
+'''
+def canonicalise_value(value):
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [canonicalise_value(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+# Definition of the function to hash the inputs of a simulation
+'''
+Description: This function hashes the inputs of one simulation. Two simulations with the same hash produce the same results.
+Inputs:
+    - item_inputs: pd.Series or dictionary with the inputs of the building
+    - output_data: list of output variables, or output profile name (the variables of the profile are hashed)
+    - step: number of timesteps per hour
+    - epw_path: path to the epw file (its content is hashed, not its path), None for the weather-agnostic model
+    - engine: engine building the model (see pyosmodel.campaign.run_campaign), only hashed when it is not the default 'openstudio'
+              so that the hashes of the existing campaigns do not change
+    - output_format: format of the outputs ('csv' or 'sqlite'), only hashed when it is not the default 'csv'
+Outputs:
+    - input_hash: sha256 hexadecimal digest of the canonicalised inputs
+'''
+def hash_inputs(item_inputs, output_data, step, epw_path, engine='openstudio', output_format='csv'):
+    canonical_inputs = {
+        'inputs': {str(name): canonicalise_value(value) for name, value in dict(item_inputs).items()},
+        'output_data': canonicalise_value(get_output_variables(output_data) if isinstance(output_data, str) else output_data),
+        'step': int(step),
+        'epw': hash_file(epw_path) if epw_path is not None else None,
+    }
+    if engine != 'openstudio':
+        canonical_inputs['engine'] = engine
+    if output_format != 'csv':
+        canonical_inputs['output_format'] = output_format
+    canonical_inputs = json.dumps(canonical_inputs, sort_keys=True)
+    return hashlib.sha256(canonical_inputs.encode('utf-8')).hexdigest()
+
+# Definition of the function to load the manifest of a campaign
+'''
+Description: This function loads the manifest of a campaign (one row per scenario and key). An empty manifest is returned if the file does not exist.
+             The rows of the journal (simulations finished since the last save, see append_to_manifest) replace the rows of the manifest.
+             A row truncated by an interrupted campaign at the end of the journal is ignored.
+Inputs:
+    - manifest_path: path to the manifest csv file
+Outputs:
+    - manifest: pd.DataFrame indexed by (scenario, key)
+'''
+def load_manifest(manifest_path):
+    dtype = {'scenario': str, 'key': str, 'input_hash': str, 'status': str, 'duration': float, 'output_path': str}
+    if os.path.exists(manifest_path):
+        manifest = pd.read_csv(manifest_path, dtype=dtype)
+    else:
+        manifest = pd.DataFrame(columns=MANIFEST_COLUMNS).astype({'duration': float})
+    journal_path = manifest_path + JOURNAL_SUFFIX
+    if os.path.exists(journal_path) and os.path.getsize(journal_path) > 0:
+        journal = pd.read_csv(journal_path, header=None, names=MANIFEST_COLUMNS, dtype=str, on_bad_lines='skip')
+        with open(journal_path, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            if file.read() != b'\n':
+                journal = journal.iloc[:-1]
+        journal = journal[journal['status'].isin(['completed', 'failed'])]
+        journal['duration'] = pd.to_numeric(journal['duration'], errors='coerce')
+        manifest = pd.concat([manifest, journal], ignore_index=True).drop_duplicates(['scenario', 'key'], keep='last')
+    return manifest.set_index(['scenario', 'key'])
+
+# Definition of the function to save the manifest of a campaign
+'''
+Description: This function saves the manifest atomically: it is written to a temporary file which then replaces the manifest,
+             so an interrupted campaign never leaves a truncated manifest behind. The journal, whose rows are now in the manifest, is removed.
+Inputs:
+    - manifest: pd.DataFrame indexed by (scenario, key)
+    - manifest_path: path to the manifest csv file
+Outputs:
+    - None
+'''
+def save_manifest(manifest, manifest_path):
+    temporary_path = manifest_path + '.tmp'
+    manifest.reset_index()[MANIFEST_COLUMNS].to_csv(temporary_path, index=False)
+    os.replace(temporary_path, manifest_path)
+    if os.path.exists(manifest_path + JOURNAL_SUFFIX):
+        os.remove(manifest_path + JOURNAL_SUFFIX)
+
+# Definition of the function to record a simulation in the manifest
+'''
+Description: This function appends the row of a finished simulation to the journal of the manifest, so that recording a simulation
+             does not depend on the size of the campaign. The journal is merged by load_manifest and cleared by save_manifest.
+Inputs:
+    - manifest_path: path to the manifest csv file
+    - scenario: name of the scenario
+    - key: key of the building
+    - input_hash: hash of the inputs of the simulation
+    - status: status of the simulation ('completed' or 'failed')
+    - duration: duration of the simulation in seconds
+    - output_path: path to the output directory of the simulation
+Outputs:
+    - None
+'''
+def append_to_manifest(manifest_path, scenario, key, input_hash, status, duration, output_path):
+    with open(manifest_path + JOURNAL_SUFFIX, 'a', newline='') as file:
+        csv.writer(file).writerow([scenario, str(key), input_hash, status, float(duration), output_path])
+
+# Definition of the function to check if a simulation is already completed
+'''
+Description: This function checks if a simulation is recorded as completed in the manifest with the same inputs and if its outputs still exist.
+Inputs:
+    - manifest: pd.DataFrame indexed by (scenario, key)
+    - scenario: name of the scenario
+    - key: key of the building
+    - input_hash: hash of the inputs of the simulation
+Outputs:
+    - completed: True if the simulation does not need to be run again
+'''
+def is_completed(manifest, scenario, key, input_hash):
+    if (scenario, str(key)) not in manifest.index:
+        return False
+    row = manifest.loc[(scenario, str(key))]
+    return row['status'] == 'completed' and row['input_hash'] == input_hash and os.path.exists(row['output_path'])
@@ -10,6 +10,7 @@ from pyosmodel.hvac import add_coil_heater, add_infiltration
 from pyosmodel.output import set_output_variables
 from pyosmodel.params import setup_simulation_control
 from pyosmodel.subsurface import create_door
+from common import SIMULATION_YEAR
 
 import openstudio as op
 
@@ -38,14 +39,13 @@ Inputs:
         - P_hvac: float in W
         - heating_setpoint: float in degrees Celsius
         - door_width: float in m
-    - output_data: dictionary with the following keys:
-        - output_variables: list of strings
-    - sunhours_path: string
+    - output_data: output profile name or list of output variables (see pyosmodel.output.get_output_variables)
+    - epw_path: string (default: None, weather-agnostic model)
 
 Outputs:
     - model: op.model.Model
 '''
-def simulate_model(input_data, output_data, epw_path):
+def simulate_model(input_data, output_data, epw_path=None):
     # Input data
     building_length = input_data['building_length']
     building_width = input_data['building_width']
@@ -160,8 +160,8 @@ def simulate_model(input_data, output_data, epw_path):
     model = set_output_variables(model, output_data)
 
     # Set up the simulation control
-    simulation_start = datetime(2023, 1, 1)
-    simulation_end = datetime(2023, 12, 31)
+    simulation_start = datetime(SIMULATION_YEAR, 1, 1)
+    simulation_end = datetime(SIMULATION_YEAR, 12, 31)
     simulation_control, run_period = setup_simulation_control(model, simulation_start, simulation_end)
 
     return model
@@ -4,28 +4,30 @@ import os
 from openstudio import openstudioutilities as osu
 from epw import epw
 from datetime import datetime
+from common import SIMULATION_YEAR
 
 # Definition to set up the models and units of the model
 '''
 Description: This function sets up the models and units of the model. The function returns a model, which can be used to create a building.
-Input: None
+             Without epw file the model is weather-agnostic: EnergyPlus takes the weather and the location from the epw file given at run time.
+Input: epw_path: path to the epw file (default: None, no weather file)
 Output: op.model.Model
 '''
-def setup_model(epw_path):
+def setup_model(epw_path=None):
     # Create a model
     model = op.model.Model()
 
-    epw_file = op.path(epw_path)
-    epw_file = osu.openstudioutilitiesfiletypes.EpwFile(epw_file)
-
     # Define the units
     op.UnitSystem("SI")
     model.setDayofWeekforStartDay("Monday")
-    model.setCalendarYear(2023)
+    model.setCalendarYear(SIMULATION_YEAR)
 
     # Define the weather file
-    weather_file = model.getWeatherFile()
-    weather_file.setWeatherFile(model, epw_file)
+    if epw_path is not None:
+        epw_file = op.path(epw_path)
+        epw_file = osu.openstudioutilitiesfiletypes.EpwFile(epw_file)
+        weather_file = model.getWeatherFile()
+        weather_file.setWeatherFile(model, epw_file)
 
     return model
 
@@ -91,7 +93,7 @@ def import_epw(model, epw_path):
     weather['Year'] = model_year
     weather['Hour'] = weather['Hour'].replace(24, 0)
     weather['Minute'] = weather['Minute'].replace(60, 0)
-    weather['Datetime'] = weather.apply(lambda row: datetime(int(row['Year']), int(row['Month']), int(row['Day']), int(row['Hour']), int(row['Minute']), 0), axis=1)
+    weather['Datetime'] = pd.to_datetime(weather[['Year', 'Month', 'Day', 'Hour', 'Minute']].astype(int).rename(columns=str.lower))
 
     # Set the weather date as the index
     weather = weather.set_index('Datetime')
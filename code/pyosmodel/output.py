@@ -1,36 +1,106 @@
-import openstudio as op
+# Output profiles: output variables written by EnergyPlus, with their key value and reporting frequency
+#   - minimal: the indoor air temperature and relative humidity read by toolbox.utils.import_simulation_data, hourly
+#   - ml: the minimal profile plus the indoor variables useful as features of the machine learning models, hourly
+#   - diagnostic: every variable of the simulation script for all the keys at each timestep, to investigate a model
+OUTPUT_PROFILES = {
+    'minimal': [
+        {'variableName': 'Zone Mean Air Temperature', 'keyValue': 'THERMAL ZONE', 'reportingFrequency': 'Hourly'},
+        {'variableName': 'Zone Air Relative Humidity', 'keyValue': 'THERMAL ZONE', 'reportingFrequency': 'Hourly'},
+    ],
+    'ml': [
+        {'variableName': 'Zone Mean Air Temperature', 'keyValue': 'THERMAL ZONE', 'reportingFrequency': 'Hourly'},
+        {'variableName': 'Zone Air Relative Humidity', 'keyValue': 'THERMAL ZONE', 'reportingFrequency': 'Hourly'},
+        {'variableName': 'Zone Mean Radiant Temperature', 'keyValue': 'THERMAL ZONE', 'reportingFrequency': 'Hourly'},
+        {'variableName': 'Zone Infiltration Air Change Rate', 'keyValue': 'THERMAL ZONE', 'reportingFrequency': 'Hourly'},
+        {'variableName': 'People Occupant Count', 'keyValue': '*', 'reportingFrequency': 'Hourly'},
+    ],
+    'diagnostic': [
+        {'variableName': variable_name, 'keyValue': '*', 'reportingFrequency': 'Timestep'} for variable_name in [
+            'Zone Air Relative Humidity',
+            'Zone Mean Air Temperature',
+            'Zone Mean Radiant Temperature',
+            'People Occupant Count',
+            'Lights Total Heating Rate',
+            'Electric Equipment Total Heating Rate',
+            'Zone Windows Total Heat Loss Rate',
+            'Zone Windows Total Heat Gain Rate',
+            'Infiltration Air Change Rate',
+            'Zone Infiltration Air Change Rate',
+            'Zone Thermostat Heating Setpoint Temperature']
+    ],
+}
+
+# Definition of the function to get the output variables of the output data
+'''
+Description: This function returns the list of output variables described by the output data.
+Input:
+- output_data: one of the following:
+    - name of an output profile (see OUTPUT_PROFILES)
+    - list of variable names, written for all the keys at each timestep
+    - list of dictionaries with the keys variableName, keyValue (default: '*') and reportingFrequency (default: 'Timestep')
+Output: output_variables: list of dictionaries with the keys variableName, keyValue and reportingFrequency
+'''
+def get_output_variables(output_data):
+    if isinstance(output_data, str):
+        if output_data not in OUTPUT_PROFILES:
+            raise ValueError("Unknown output profile. Output profile = " + output_data + ". Available profiles = " + str(list(OUTPUT_PROFILES.keys())))
+        return [dict(output_variable) for output_variable in OUTPUT_PROFILES[output_data]]
+
+    output_variables = []
+    for item in output_data:
+        if isinstance(item, dict):
+            output_variable = {
+                'variableName': item['variableName'],
+                'keyValue': item.get('keyValue', '*'),
+                'reportingFrequency': item.get('reportingFrequency', 'Timestep'),
+            }
+        else:
+            output_variable = {
+                'variableName': item,
+                'keyValue': '*',
+                'reportingFrequency': 'Timestep',
+            }
+        output_variables.append(output_variable)
+    return output_variables
 
 # Set up the output variables
 '''
 Description: This function sets up the output variables. The function returns a model with the output variables.
-Output variables : output_data
+Output variables : output_data (output profile name, list of variable names or list of dictionaries, see get_output_variables)
 Input:
 - model: op.model.Model
 Output: model
 '''
 def set_output_variables(model, output_data):
-    # Create an OutputVariable object for each desired variable listed in output_data
+    # Imported here so that the output profiles can be used without the OpenStudio SDK (see pyosmodel.idf)
+    import openstudio as op
 
-    output_variables = []
-    for item in output_data:
-        output_variable = {
-            'variableName': item,
-            'keyValue': '*',
-            'reportingFrequency': 'Timestep',
-            'exportToBCVTB': False
-        }
-        output_variables.append(output_variable)
+    # Create an OutputVariable object for each desired variable listed in output_data
+    output_variables = get_output_variables(output_data)
 
     # Add the output variables to the model
     for output_variable in output_variables:
         variable_name = output_variable['variableName']
         key_value = output_variable['keyValue']
         reporting_frequency = output_variable['reportingFrequency']
-        export_to_bcvtb = output_variable['exportToBCVTB']
 
         output_variable_object = op.model.OutputVariable(variable_name, model)
         output_variable_object.setKeyValue(key_value)
         output_variable_object.setReportingFrequency(reporting_frequency)
-        output_variable_object.setExportToBCVTB(export_to_bcvtb)
+        output_variable_object.setExportToBCVTB(False)
+
+    return model
+
+# Set up the SQLite output
+'''
+Description: This function adds the Output:SQLite object to the model, so that EnergyPlus writes the output variables to eplusout.sql.
+             The results are then read with toolbox.eplusout.read_simulation_sql and EnergyPlus can be run without ReadVarsESO.
+Input:
+- model: op.model.Model
+Output: model
+'''
+def set_output_sqlite(model):
+    output_sqlite = model.getOutputSQLite()
+    output_sqlite.setOptionType('Simple')
 
-    return model
\ No newline at end of file
+    return model
@@ -1,33 +1,108 @@
 import os
+import signal
 import subprocess
+import time
+
+
+# Definition of the function to get the path to the EnergyPlus executable
+'''
+Description: This function returns the path to the EnergyPlus executable of an installation directory.
+Inputs:
+    - energyplus_install_dir: path to the EnergyPlus installation directory
+Outputs:
+    - executable: path to the EnergyPlus executable
+'''
+def get_energyplus_executable(energyplus_install_dir):
+    executable = os.path.join(energyplus_install_dir, 'energyplus')
+    if os.name == 'nt':
+        executable += '.exe'
+    return executable
+
+# Definition of the function to read the EnergyPlus error file
+'''
+Description: This function reads the eplusout.err file of an output directory.
+Inputs:
+    - output_relative_directory: relative path to the output directory
+Outputs:
+    - err: content of eplusout.err ('' if the file does not exist)
+'''
+def read_err_file(output_relative_directory):
+    err_path = os.path.join(output_relative_directory, 'eplusout.err')
+    if not os.path.exists(err_path):
+        return ''
+    with open(err_path, 'r', errors='replace') as file:
+        return file.read()
+
 # Definition of the function to run the simulation on idf files
 '''
-Description: This function runs the simulation and returns the results.
+Description: This function runs EnergyPlus once on an idf file and returns the result of the run.
+             A run exceeding the timeout is killed with its whole process tree (ExpandObjects and ReadVarsESO children, taskkill /T on Windows,
+             the process group on POSIX) and reported as timed out.
+             Without readvars, ReadVarsESO is not run and no eplusout.csv is written: the results are read from eplusout.sql
+             (see toolbox.eplusout.read_simulation_sql), which requires the Output:SQLite object in the idf file.
 Inputs:
     - idf_relative_filepath: relative path to the idf file
     - epw_relative_filepath: relative path to the epw file
     - output_relative_directory: relative path to the output directory
     - energyplus_install_dir: relative path to the EnergyPlus installation directory
+    - timeout: maximum duration of the run in seconds (default: None, no limit)
+    - check: if True, raise a RuntimeError when the run fails
+    - readvars: if True, run ReadVarsESO to convert the outputs to eplusout.csv
 Outputs:
-    - None
+    - result: dictionary with the following keys:
+        - command: argv list of the run
+        - returncode: return code of EnergyPlus (None if the run timed out)
+        - stdout: standard output of EnergyPlus
+        - stderr: standard error of EnergyPlus
+        - err: content of eplusout.err
+        - timed_out: True if the run was killed by the timeout
+        - duration: duration of the run in seconds
+        - success: True if EnergyPlus completed with return code 0
 '''
-
-def run_simulation(idf_relative_filepath, epw_relative_filepath, output_relative_directory, energyplus_install_dir): 
+def run_simulation(idf_relative_filepath, epw_relative_filepath, output_relative_directory, energyplus_install_dir, timeout=None, check=True, readvars=True):
     # Create a folder for the outputs
-    if not os.path.exists(output_relative_directory):
-        os.mkdir(output_relative_directory)
-
-    cl_st=(f'"{energyplus_install_dir}\\EnergyPlus" '
-    + '--readvars '  # included to create a .csv file of the results
-    + f'--output-directory "{output_relative_directory}" '
-    + f'--weather "{epw_relative_filepath}" '
-    + f'"{idf_relative_filepath}"'
-    )
- 
-    result=subprocess.run(cl_st)
+    os.makedirs(output_relative_directory, exist_ok=True)
+
+    command = [get_energyplus_executable(energyplus_install_dir)]
+    if readvars:
+        command.append('--readvars')  # included to create a .csv file of the results
+    command += ['--output-directory', output_relative_directory,
+                '--weather', epw_relative_filepath,
+                idf_relative_filepath]
 
+    start = time.time()
+    # Run EnergyPlus in its own process group (its own session on POSIX) so the watchdog can also kill ExpandObjects and ReadVarsESO
+    if os.name == 'nt':
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+    else:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, start_new_session=True)
+    timed_out = False
     try:
-        subprocess.check_call(cl_st)
-    except subprocess.CalledProcessError as e:
-         raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode, e.output))
-    return None
\ No newline at end of file
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        if os.name == 'nt':
+            # process.kill() only kills energyplus.exe: taskkill /T also kills its ExpandObjects and ReadVarsESO children
+            subprocess.run(['taskkill', '/T', '/F', '/PID', str(process.pid)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            # In case taskkill failed, at least energyplus.exe is killed (no-op if it is already dead)
+            process.kill()
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+        stdout, stderr = process.communicate()
+
+    result = {
+        'command': command,
+        'returncode': None if timed_out else process.returncode,
+        'stdout': stdout,
+        'stderr': stderr,
+        'err': read_err_file(output_relative_directory),
+        'timed_out': timed_out,
+        'duration': time.time() - start,
+        'success': not timed_out and process.returncode == 0,
+    }
+
+    if check and not result['success']:
+        if timed_out:
+            raise RuntimeError("command '{}' timed out after {} seconds".format(' '.join(command), timeout))
+        raise RuntimeError("command '{}' return with error (code {}): {}".format(' '.join(command), result['returncode'], result['err'][-2000:] or stderr))
+    return result
@@ -1,5 +1,4 @@
 import numpy as np
-import openstudio as op
 from datetime import datetime, timedelta
 import os
 import shutil
@@ -15,6 +14,9 @@ Outputs:
     - unit_vector: unit vector of the surface
 '''
 def get_surface_normal_vector(surface):
+    # Imported here so that the random value generators can be used without the OpenStudio SDK (see pyosmodel.predefinedmodel)
+    import openstudio as op
+
     # Get the outward normal vector of the surface
     normal_vector = surface.outwardNormal()
 
@@ -38,6 +40,7 @@ Outputs:
     center_point: op.Point3d
 '''
 def calculate_center_point(surface):
+    import openstudio as op
     # Get the vertices of the surface
     surface_vertices = surface.vertices()
 
@@ -72,6 +75,7 @@ Outputs:
     - model: OpenStudio model object with rotated objects
 '''
 def rotate_model(model, rotation_angle):
+    import openstudio as op
     # Get the building rotation angle (angle to rotate the north axis)
     rotation_angle_rad = op.degToRad(rotation_angle)
 
@@ -99,6 +103,7 @@ Outputs:
     - model: OpenStudio model object with fixed schedule type limits
 '''
 def fix_schedule(model):
+    import openstudio as op
     
     # Create a schedule type limits object
     schedule_type_limits = op.model.ScheduleTypeLimits(model)
@@ -198,6 +203,7 @@ Outputs:
 '''
 
 def get_op_time(time):
+    import openstudio as op
     return op.Time(0, time.hour, time.minute, time.second)
 
 # Definition of a function to return a start and end time from a start time and duration
@@ -268,6 +274,7 @@ Input:
 - idf_path: str
 '''
 def save_model_to_idf(model, idf_path):
+    import openstudio as op
     # Save the model to IDF format
     ft = op.energyplus.ForwardTranslator()
     w = ft.translateModel(model)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The tests import the toolbox and pyosmodel packages as the scripts do, from the code directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
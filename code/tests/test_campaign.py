@@ -0,0 +1,240 @@
+# Campaign runner (pyosmodel.campaign.run_campaign) against a stub EnergyPlus executable (tests/stub_energyplus/energyplus),
+# with the engine 'idf' so that neither EnergyPlus nor the OpenStudio SDK is needed
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+
+from pyosmodel import campaign
+from pyosmodel.campaign import run_campaign, build_building
+from pyosmodel.manifest import load_manifest, append_to_manifest, JOURNAL_SUFFIX
+from pyosmodel.cache import evict_cache, get_directory_size, MARKER_FILE
+from pyosmodel.predefinedmodel import define_RDP_inputs
+from toolbox.eplusout import read_simulation_output
+
+STUB_ENERGYPLUS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stub_energyplus')
+
+# The stub is a python script run as 'energyplus', the Windows runner expects 'energyplus.exe'
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason='the stub EnergyPlus executable is a POSIX script')
+
+
+# Definition of the function to set up the scenarios of a test campaign
+'''
+Description: This function writes one (dummy) epw file per scenario in the campaign directory (created if needed) and returns the paths of the epw files and output directories.
+             The stub EnergyPlus hangs on a weather file named 'hang*.epw' and fails on 'fail*.epw'.
+Inputs:
+    - campaign_directory: path to the directory of the campaign
+    - scenarios: list of scenario names
+Outputs:
+    - epw_paths: list of paths to the epw files
+    - output_directory_paths: list of paths to the output directories
+'''
+def setup_scenarios(campaign_directory, scenarios):
+    os.makedirs(str(campaign_directory), exist_ok=True)
+    epw_paths = []
+    for scenario in scenarios:
+        epw_path = os.path.join(str(campaign_directory), scenario + '.epw')
+        with open(epw_path, 'w') as file:
+            file.write('LOCATION,' + scenario + '\n')
+        epw_paths.append(epw_path)
+    output_directory_paths = [os.path.join(str(campaign_directory), scenario) + '/' for scenario in scenarios]
+    return epw_paths, output_directory_paths
+
+# Key of the building whose build worker process dies (see build_building_or_die)
+DYING_KEY = 1
+
+# Definition of the function to build a model in a build worker process that dies on one building
+'''
+Description: This function builds the model of a building as pyosmodel.campaign.build_building, except for the building DYING_KEY
+             whose worker process exits abruptly (as on a crash of the OpenStudio SDK), which breaks the pool of build workers.
+Inputs:
+    - key: index of the building in the inputs DataFrame
+    - args: other arguments of pyosmodel.campaign.build_building
+Outputs:
+    - result: dictionary with the key, status, duration and error of the build
+'''
+def build_building_or_die(key, *args):
+    if key == DYING_KEY:
+        os._exit(1)
+    return build_building(key, *args)
+
+@pytest.fixture
+def inputs():
+    np.random.seed(0)
+    return define_RDP_inputs(3)
+
+def test_campaign_completes_and_skips_on_rerun(inputs, tmp_path):
+    epw_paths, output_directory_paths = setup_scenarios(tmp_path, ['present-day', '2050'])
+
+    results, summary = run_campaign(inputs, epw_paths, output_directory_paths, 'minimal', STUB_ENERGYPLUS_DIRECTORY, workers=2, build_workers=1, engine='idf')
+    assert summary['models'] == 3
+    assert summary['simulations'] == summary['completed'] == 6
+    assert summary['failed'] == summary['skipped'] == 0
+    assert (results['status'] == 'completed').all()
+    for output_directory_path in output_directory_paths:
+        assert os.path.exists(os.path.join(output_directory_path, '..', 'models', 'base.idf'))
+        for key in inputs.index:
+            data = read_simulation_output(output_directory_path + 'outputs/' + str(key) + '/', ['Zone Mean Air Temperature'], 'THERMAL ZONE')
+            assert len(data) == 8760
+        assert pd.read_csv(output_directory_path + 'failed_simulations.csv', index_col=0).shape[1] == 0
+
+    # Everything is recorded as completed in the manifest: nothing is built or run again
+    results, summary = run_campaign(inputs, epw_paths, output_directory_paths, 'minimal', STUB_ENERGYPLUS_DIRECTORY, workers=2, build_workers=1, engine='idf')
+    assert summary['models'] == summary['simulations'] == 0
+    assert summary['skipped'] == 6
+    manifest = pd.read_csv(os.path.join(str(tmp_path), 'manifest.csv'))
+    assert len(manifest) == 6 and (manifest['status'] == 'completed').all()
+    assert not os.path.exists(os.path.join(str(tmp_path), 'manifest.csv' + JOURNAL_SUFFIX))
+
+def test_campaign_resumes_from_the_manifest_journal(inputs, tmp_path):
+    epw_paths, output_directory_paths = setup_scenarios(tmp_path, ['present-day'])
+    manifest_path = os.path.join(str(tmp_path), 'manifest.csv')
+    run_campaign(inputs, epw_paths, output_directory_paths, 'minimal', STUB_ENERGYPLUS_DIRECTORY, workers=1, build_workers=1, engine='idf')
+
+    # Interrupted campaign: the manifest was not saved, the finished simulations are only in the journal, the last row is truncated
+    manifest = pd.read_csv(manifest_path, dtype=str)
+    os.remove(manifest_path)
+    for row in manifest.itertuples():
+        append_to_manifest(manifest_path, row.scenario, row.key, row.input_hash, row.status, row.duration, row.output_path)
+    with open(manifest_path + JOURNAL_SUFFIX, 'r+') as file:
+        file.truncate(os.path.getsize(manifest_path + JOURNAL_SUFFIX) - 10)
+
+    results, summary = run_campaign(inputs, epw_paths, output_directory_paths, 'minimal', STUB_ENERGYPLUS_DIRECTORY, workers=1, build_workers=1, engine='idf')
+    assert summary['skipped'] == 2 and summary['simulations'] == summary['completed'] == 1
+    assert list(results['key'].astype(str)) == [manifest['key'].iloc[-1]]
+    assert len(load_manifest(manifest_path)) == 3
+    assert not os.path.exists(manifest_path + JOURNAL_SUFFIX)
+
+def test_campaign_reports_timeouts_and_failures(inputs, tmp_path):
+    epw_paths, output_directory_paths = setup_scenarios(tmp_path, ['present-day', 'hang', 'fail'])
+
+    results, summary = run_campaign(inputs, epw_paths, output_directory_paths, 'minimal', STUB_ENERGYPLUS_DIRECTORY, workers=3, build_workers=1, timeout=1, engine='idf')
+    assert summary['simulations'] == 9
+    assert summary['completed'] == 3 and summary['failed'] == 6
+    results = results.set_index('scenario')
+    assert (results.loc['present-day', 'status'] == 'completed').all()
+    assert (results.loc['hang', 'status'] == 'failed').all()
+    assert results.loc['hang', 'error'].str.contains('timed out after 1 seconds').all()
+    assert results.loc['hang', 'returncode'].isnull().all()
+    assert (results.loc['fail', 'status'] == 'failed').all()
+    assert results.loc['fail', 'error'].str.contains('Stub EnergyPlus failure').all()
+    assert (results.loc['fail', 'returncode'] == 1).all()
+
+    # One column of inputs per failed building, in the directory of its scenario
+    failed = {scenario: pd.read_csv(output_directory_path + 'failed_simulations.csv', index_col=0) for scenario, output_directory_path in zip(['present-day', 'hang', 'fail'], output_directory_paths)}
+    assert failed['present-day'].shape[1] == 0
+    assert list(failed['hang'].columns) == list(failed['fail'].columns) == [str(key) for key in inputs.index]
+    assert list(failed['hang'].index) == list(inputs.columns)
+
+    # The rerun only runs the failed simulations, the failures are kept in failed_simulations.csv
+    results, summary = run_campaign(inputs, epw_paths, output_directory_paths, 'minimal', STUB_ENERGYPLUS_DIRECTORY, workers=3, build_workers=1, timeout=1, engine='idf')
+    assert summary['skipped'] == 3
+    assert summary['simulations'] == summary['failed'] == 6
+    assert pd.read_csv(output_directory_paths[1] + 'failed_simulations.csv', index_col=0).shape[1] == 3
+
+def test_campaign_recovers_from_a_dying_build_worker(inputs, tmp_path, monkeypatch):
+    monkeypatch.setattr(campaign, 'build_building', build_building_or_die)
+    epw_paths, output_directory_paths = setup_scenarios(tmp_path, ['present-day', '2050'])
+
+    # The other models built with the dying one are built again in a new pool, only the dying one fails
+    results, summary = run_campaign(inputs, epw_paths, output_directory_paths, 'minimal', STUB_ENERGYPLUS_DIRECTORY, workers=2, build_workers=2, engine='idf')
+    assert summary['simulations'] == 6
+    assert summary['completed'] == 4 and summary['failed'] == 2
+    results = results.set_index('key')
+    assert (results.loc[DYING_KEY, 'status'] == 'failed').all()
+    assert results.loc[DYING_KEY, 'error'].str.contains('The build worker process died').all()
+    assert (results.drop(DYING_KEY)['status'] == 'completed').all()
+    assert pd.read_csv(output_directory_paths[0] + 'failed_simulations.csv', index_col=0).columns.tolist() == [str(DYING_KEY)]
+
+    # The rerun only builds the dying model again
+    results, summary = run_campaign(inputs, epw_paths, output_directory_paths, 'minimal', STUB_ENERGYPLUS_DIRECTORY, workers=2, build_workers=2, engine='idf')
+    assert summary['models'] == 1 and summary['skipped'] == 4 and summary['failed'] == 2
+
+# Definition of the function to list the complete entries of a cache
+'''
+Description: This function returns the names (input hashes) of the complete entries of a cache directory.
+Inputs:
+    - cache_dir: path to the cache directory
+Outputs:
+    - entries: sorted list of the names of the complete entries
+'''
+def get_cache_entries(cache_dir):
+    if not os.path.exists(cache_dir):
+        return []
+    return sorted(name for name in os.listdir(cache_dir) if os.path.exists(os.path.join(cache_dir, name, MARKER_FILE)))
+
+def test_campaign_cache_hit_miss_and_epw_invalidation(inputs, tmp_path):
+    cache_dir = os.path.join(str(tmp_path), 'cache')
+    epw_paths, output_directory_paths = setup_scenarios(tmp_path / 'first', ['present-day', '2050'])
+    results, summary = run_campaign(inputs, epw_paths, output_directory_paths, 'minimal', STUB_ENERGYPLUS_DIRECTORY, workers=2, build_workers=1, cache_dir=cache_dir, engine='idf')
+    assert summary['cache_hits'] == 0 and summary['completed'] == 6
+    assert len(get_cache_entries(cache_dir)) == 6
+
+    # Another campaign with the same inputs and the same epw contents is restored from the cache, hard linked to the entries
+    epw_paths, output_directory_paths = setup_scenarios(tmp_path / 'second', ['present-day', '2050'])
+    results, summary = run_campaign(inputs, epw_paths, output_directory_paths, 'minimal', STUB_ENERGYPLUS_DIRECTORY, workers=2, build_workers=1, cache_dir=cache_dir, engine='idf')
+    assert summary['cache_hits'] == 6 and summary['models'] == summary['simulations'] == 0
+    for output_directory_path in output_directory_paths:
+        for key in inputs.index:
+            output_path = output_directory_path + 'outputs/' + str(key) + '/eplusout.csv'
+            assert os.stat(output_path).st_nlink > 1
+            assert len(read_simulation_output(os.path.dirname(output_path) + '/', ['Zone Mean Air Temperature'], 'THERMAL ZONE')) == 8760
+    manifest = load_manifest(os.path.join(str(tmp_path / 'second'), 'manifest.csv'))
+    assert len(manifest) == 6 and (manifest['status'] == 'completed').all()
+
+    # The cache is keyed by the content of the epw file, not by its path: a changed epw file misses the cache
+    with open(epw_paths[1], 'a') as file:
+        file.write('DESIGN CONDITIONS,0\n')
+    results, summary = run_campaign(inputs, epw_paths, output_directory_paths, 'minimal', STUB_ENERGYPLUS_DIRECTORY, workers=2, build_workers=1, cache_dir=cache_dir, engine='idf')
+    assert summary['skipped'] == 3 and summary['cache_hits'] == 0
+    assert summary['simulations'] == summary['completed'] == 3
+    assert (results['scenario'] == '2050').all()
+    assert len(get_cache_entries(cache_dir)) == 9
+
+def test_campaign_cache_copies_without_hard_links(inputs, tmp_path, monkeypatch):
+    # Hard links are not supported across drives: the outputs are copied to and from the cache
+    def link(src, dst):
+        raise OSError('Invalid cross-device link')
+    monkeypatch.setattr(os, 'link', link)
+    cache_dir = os.path.join(str(tmp_path), 'cache')
+    for campaign_name in ['first', 'second']:
+        epw_paths, output_directory_paths = setup_scenarios(tmp_path / campaign_name, ['present-day'])
+        results, summary = run_campaign(inputs, epw_paths, output_directory_paths, 'minimal', STUB_ENERGYPLUS_DIRECTORY, workers=1, build_workers=1, cache_dir=cache_dir, engine='idf')
+    assert summary['cache_hits'] == 3 and summary['simulations'] == 0
+    for key in inputs.index:
+        output_path = output_directory_paths[0] + 'outputs/' + str(key) + '/eplusout.csv'
+        assert os.stat(output_path).st_nlink == 1
+        with open(output_path) as file, open(output_path.replace('second', 'first')) as expected_file:
+            assert file.read() == expected_file.read()
+
+def test_campaign_cache_evicts_the_least_recently_used_entries(tmp_path, monkeypatch):
+    np.random.seed(0)
+    inputs = define_RDP_inputs(6)
+    cache_dir = os.path.join(str(tmp_path), 'cache')
+    epw_paths, output_directory_paths = setup_scenarios(tmp_path / 'first', ['present-day', '2050'])
+    run_campaign(inputs, epw_paths, output_directory_paths, 'minimal', STUB_ENERGYPLUS_DIRECTORY, workers=2, build_workers=1, cache_dir=cache_dir, engine='idf')
+    entries = get_cache_entries(cache_dir)
+    entry_size = get_directory_size(os.path.join(cache_dir, entries[0]))
+    assert len(entries) == 12
+
+    # The least recently used entries are evicted first
+    for last_used, name in enumerate(entries):
+        os.utime(os.path.join(cache_dir, name, MARKER_FILE), (last_used, last_used))
+    assert evict_cache(cache_dir, 10 * entry_size) == 2
+    assert get_cache_entries(cache_dir) == entries[2:]
+
+    # The cache is kept below its maximum size during the campaign, not only at its end
+    cache_sizes = []
+    def evict_and_measure(cache_dir, max_size):
+        evicted = evict_cache(cache_dir, max_size)
+        cache_sizes.append(get_directory_size(cache_dir))
+        return evicted
+    monkeypatch.setattr(campaign, 'evict_cache', evict_and_measure)
+    shutil.rmtree(cache_dir)
+    epw_paths, output_directory_paths = setup_scenarios(tmp_path / 'second', ['present-day', '2050'])
+    results, summary = run_campaign(inputs, epw_paths, output_directory_paths, 'minimal', STUB_ENERGYPLUS_DIRECTORY, workers=2, build_workers=1, cache_dir=cache_dir, cache_max_size=3 * entry_size, engine='idf')
+    assert summary['completed'] == 12
+    assert len(cache_sizes) == 2
+    assert all(cache_size <= 3 * entry_size for cache_size in cache_sizes)
+    assert len(get_cache_entries(cache_dir)) == 3
@@ -0,0 +1,241 @@
+# Consistency of the vectorised hourly means of the simulation results (toolbox.eplusout.get_hourly_means on read_simulation_output)
+# with the original ingest of eplusout.csv (Date/Time strings parsed, 24:00 rolled over row by row, resampled per hour),
+# on synthetic eplusout.csv files, and reading of eplusout.sql against a hand-built fixture (tests/data/eplusout).
+# Run as a script, this file benchmarks both paths ('fixture' as argument: writes the fixture again).
+import os
+import sys
+import time
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from toolbox.eplusout import read_simulation_output, read_simulation_csv, read_simulation_sql, get_hourly_means
+from toolbox.timekeys import SIMULATION_YEAR, get_datetime
+
+VARIABLES = ['Zone Mean Air Temperature', 'Zone Air Relative Humidity']
+# Columns of a synthetic eplusout.csv: the two variables read by the ingest and other variables of the diagnostic profile
+SYNTHETIC_COLUMNS = [
+    'THERMAL ZONE:Zone Mean Air Temperature [C](TimeStep)',
+    'THERMAL ZONE:Zone Air Relative Humidity [%](TimeStep)',
+    'Environment:Site Outdoor Air Drybulb Temperature [C](TimeStep)',
+    'THERMAL ZONE:Zone Mean Radiant Temperature [C](TimeStep)',
+    'THERMAL ZONE:Zone Infiltration Air Change Rate [ach](TimeStep)',
+    'PEOPLE:People Occupant Count [](TimeStep)',
+]
+FIXTURE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'eplusout')
+# Variables of the fixture: (key, name, units), in the order of the report data dictionary (not the order of VARIABLES)
+FIXTURE_VARIABLES = [
+    ('Environment', 'Site Outdoor Air Drybulb Temperature', 'C'),
+    ('THERMAL ZONE', 'Zone Air Relative Humidity', '%'),
+    ('THERMAL ZONE', 'Zone Mean Air Temperature', 'C'),
+    ('OTHER ZONE', 'Zone Mean Air Temperature', 'C'),
+]
+# Time steps per hour and days of the weather file run period of the fixture
+FIXTURE_STEP = 4
+FIXTURE_DAYS = 2
+
+
+# Definition of the function to write a synthetic eplusout.csv file
+'''
+Description: This function writes an eplusout.csv file as ReadVarsESO does for a one-year run period: Date/Time strings ' MM/DD  HH:MM:SS'
+             stamped at the end of each time step (the last one of a day at 24:00:00) and random values of the synthetic columns.
+Inputs:
+    - output_directory: path to the output directory
+    - step: number of timesteps per hour
+    - seed: seed of the random values
+Outputs:
+    - csv_path: path to the eplusout.csv file
+'''
+def write_synthetic_eplusout(output_directory, step=4, seed=0):
+    os.makedirs(output_directory, exist_ok=True)
+    ends = pd.date_range(str(SIMULATION_YEAR) + '-01-01', periods=8760 * step + 1, freq=str(60 // step) + 'min')[1:]
+    # The end of a day is written 24:00:00 of the day
+    midnight = (ends.hour == 0) & (ends.minute == 0)
+    days = np.where(midnight, ends - pd.Timedelta(days=1), ends)
+    date_time = [' {:02d}/{:02d}  {:02d}:{:02d}:00'.format(day.month, day.day, 24 if is_midnight else end.hour, end.minute) for day, end, is_midnight in zip(pd.DatetimeIndex(days), ends, midnight)]
+
+    random = np.random.RandomState(seed)
+    data = pd.DataFrame({'Date/Time': date_time})
+    for i, column in enumerate(SYNTHETIC_COLUMNS):
+        data[column] = np.round(20 + 10 * np.sin(np.arange(len(ends)) / (24 * step) * 2 * np.pi + i) + random.normal(0, 1, len(ends)), 6)
+    csv_path = os.path.join(output_directory, 'eplusout.csv')
+    data.to_csv(csv_path, index=False)
+    return csv_path
+
+# Definition of the original hourly means of an eplusout.csv file
+'''
+Description: This function is the original ingest of import_simulation_data, kept as the reference of the vectorised path: the whole file
+             is read, the Date/Time strings are parsed with the year, the 24:00:00 time steps are moved to the next day row by row
+             and the time steps are resampled per hour.
+Inputs:
+    - csv_path: path to the eplusout.csv file
+Outputs:
+    - data: pd.DataFrame of the hourly means of the variables, indexed by datetime
+'''
+def get_hourly_means_resample(csv_path):
+    data = pd.read_csv(csv_path)
+    date_time = data['Date/Time'].astype(str)
+    date_time = str(SIMULATION_YEAR) + '/' + date_time
+    date_time = date_time.str.replace(str(SIMULATION_YEAR) + '/ ', str(SIMULATION_YEAR) + '/')
+    date_time = date_time.str.replace('24:00:00', '00:00:00')
+    date_time = pd.to_datetime(date_time, format='%Y/%m/%d  %H:%M:%S')
+    date_time = list(date_time)
+    for i in range(len(date_time)):
+        if date_time[i].hour == 0 and date_time[i].minute == 0 and date_time[i].second == 0:
+            date_time[i] = date_time[i] + pd.Timedelta(days=1)
+    data['Date/Time'] = date_time
+    data = data.set_index('Date/Time').resample('60min').mean()
+    return data[['THERMAL ZONE:Zone Mean Air Temperature [C](TimeStep)', 'THERMAL ZONE:Zone Air Relative Humidity [%](TimeStep)']]
+
+# Definition of the vectorised hourly means of an eplusout.csv file
+'''
+Description: This function computes the hourly means of the variables of an output directory as import_simulation_data does
+             (see toolbox.utils.process_simulation_folder), indexed by datetime.
+Inputs:
+    - output_directory: path to the output directory
+Outputs:
+    - data: pd.DataFrame of the float32 hourly means of the variables, indexed by datetime
+'''
+def get_hourly_means_vectorised(output_directory):
+    data = get_hourly_means(read_simulation_output(output_directory, VARIABLES, 'THERMAL ZONE'))
+    data.index = get_datetime(data.index.values)
+    return data
+
+# Definition of the function to get the value of a variable of the fixture
+'''
+Description: This function returns the value of a variable of the fixture at a time step, exact in float32 and in the csv file.
+             The design days and the warmup days get values out of the range of the run period.
+Inputs:
+    - variable: position of the variable in FIXTURE_VARIABLES
+    - time_step: position of the time step in its environment
+    - environment: 'design day', 'warmup' or 'run period'
+Outputs:
+    - value: float
+'''
+def get_fixture_value(variable, time_step, environment):
+    if environment != 'run period':
+        return -999.0 if environment == 'warmup' else 999.0
+    return 10 * (variable + 1) + (time_step % (24 * FIXTURE_STEP)) / 8 + (time_step // (24 * FIXTURE_STEP)) / 4
+
+# Definition of the function to write the eplusout fixture
+'''
+Description: This function writes the hand-built eplusout.sql of the fixture, with the tables and columns of the EnergyPlus SQLite output
+             read by toolbox.eplusout.read_simulation_sql: a summer design day, a warmup day and FIXTURE_DAYS days of the weather
+             file run period from January 1st, at FIXTURE_STEP time steps per hour. As in EnergyPlus, a time step is stamped with its end:
+             the Hour is the hour started (0 to 23) and the Minute the end minute in it, except the end of an hour (Minute 0, Hour 1 to 24).
+             The eplusout.csv that ReadVarsESO writes for the run period is written next to it.
+Inputs:
+    - output_directory: path to the directory of the fixture
+Outputs:
+    - sql_path: path to the eplusout.sql file
+'''
+def write_eplusout_fixture(output_directory):
+    os.makedirs(output_directory, exist_ok=True)
+    sql_path = os.path.join(output_directory, 'eplusout.sql')
+    if os.path.exists(sql_path):
+        os.remove(sql_path)
+    connection = sqlite3.connect(sql_path)
+    connection.executescript('''
+        CREATE TABLE EnvironmentPeriods (EnvironmentPeriodIndex INTEGER PRIMARY KEY, SimulationIndex INTEGER, EnvironmentName TEXT, EnvironmentType INTEGER);
+        CREATE TABLE Time (TimeIndex INTEGER PRIMARY KEY, Year INTEGER, Month INTEGER, Day INTEGER, Hour INTEGER, Minute INTEGER, Dst INTEGER,
+                           Interval INTEGER, IntervalType INTEGER, SimulationDays INTEGER, DayType TEXT, EnvironmentPeriodIndex INTEGER, WarmupFlag INTEGER);
+        CREATE TABLE ReportDataDictionary (ReportDataDictionaryIndex INTEGER PRIMARY KEY, IsMeter INTEGER, Type TEXT, IndexGroup TEXT, TimestepType TEXT,
+                                           KeyValue TEXT, Name TEXT, ReportingFrequency TEXT, ScheduleName TEXT, Units TEXT);
+        CREATE TABLE ReportData (ReportDataIndex INTEGER PRIMARY KEY, TimeIndex INTEGER, ReportDataDictionaryIndex INTEGER, Value REAL);
+    ''')
+    connection.executemany('INSERT INTO EnvironmentPeriods VALUES (?, 1, ?, ?)', [(1, 'SUMMER DESIGN DAY', 1), (2, 'RUN PERIOD 1', 3)])
+    connection.executemany('INSERT INTO ReportDataDictionary VALUES (?, 0, \'Avg\', \'Zone\', \'Zone\', ?, ?, \'Zone Timestep\', \'\', ?)',
+                           [(index + 1, key, name, units) for index, (key, name, units) in enumerate(FIXTURE_VARIABLES)])
+
+    csv_rows = []
+    time_index = 0
+    for environment, environment_index, month, first_day, days, warmup in [('design day', 1, 7, 21, 1, 0), ('warmup', 2, 1, 1, 1, 1), ('run period', 2, 1, 1, FIXTURE_DAYS, 0)]:
+        time_step = 0
+        for day in range(first_day, first_day + days):
+            for end in range(60 // FIXTURE_STEP, 1441, 60 // FIXTURE_STEP):
+                hour, minute = (end // 60, 0) if end % 60 == 0 else (end // 60, end % 60)
+                time_index += 1
+                connection.execute('INSERT INTO Time VALUES (?, ?, ?, ?, ?, ?, 0, ?, -1, ?, \'Sunday\', ?, ?)',
+                                   (time_index, SIMULATION_YEAR, month, day, hour, minute, 60 // FIXTURE_STEP, day, environment_index, warmup))
+                values = [get_fixture_value(variable, time_step, environment) for variable in range(len(FIXTURE_VARIABLES))]
+                connection.executemany('INSERT INTO ReportData (TimeIndex, ReportDataDictionaryIndex, Value) VALUES (?, ?, ?)',
+                                       [(time_index, variable + 1, value) for variable, value in enumerate(values)])
+                if environment == 'run period':
+                    csv_rows.append([' {:02d}/{:02d}  {:02d}:{:02d}:00'.format(month, day, hour, minute)] + values)
+                time_step += 1
+    connection.commit()
+    connection.close()
+
+    columns = ['Date/Time'] + ['{}:{} [{}](TimeStep)'.format(key.upper(), name, units) for key, name, units in FIXTURE_VARIABLES]
+    pd.DataFrame(csv_rows, columns=columns).to_csv(os.path.join(output_directory, 'eplusout.csv'), index=False)
+    return sql_path
+
+def test_read_simulation_sql_of_fixture():
+    sql_path = os.path.join(FIXTURE_DIRECTORY, 'eplusout.sql')
+    data = read_simulation_sql(sql_path, VARIABLES, 'thermal zone')
+
+    # Columns in the order of the variables, named as in eplusout.csv, whatever the order of the report data dictionary
+    assert list(data.columns) == ['THERMAL ZONE:Zone Mean Air Temperature [C](TimeStep)', 'THERMAL ZONE:Zone Air Relative Humidity [%](TimeStep)']
+    assert (data.dtypes == np.float32).all() and data.index.dtype == np.int32
+
+    # Only the run period: no design day nor warmup rows, the 24:00 time steps rolled over to 00:00 of the next day
+    number_steps = FIXTURE_DAYS * 24 * FIXTURE_STEP
+    assert len(data) == number_steps
+    assert list(data.index) == list(range(60 // FIXTURE_STEP, FIXTURE_DAYS * 1440 + 1, 60 // FIXTURE_STEP))
+    assert data.index[24 * FIXTURE_STEP - 1] == 1440
+    for i, column in enumerate(data.columns):
+        variable = [key.upper() + ':' + name for key, name, units in FIXTURE_VARIABLES].index(column.split(' [')[0])
+        assert list(data[column]) == [get_fixture_value(variable, time_step, 'run period') for time_step in range(number_steps)]
+
+    # Key filter: the temperature of the other zone is only read without key, after the one of the thermal zone
+    data = read_simulation_sql(sql_path, VARIABLES, None)
+    assert list(data.columns) == ['OTHER ZONE:Zone Mean Air Temperature [C](TimeStep)', 'THERMAL ZONE:Zone Mean Air Temperature [C](TimeStep)', 'THERMAL ZONE:Zone Air Relative Humidity [%](TimeStep)']
+    with pytest.raises(ValueError):
+        read_simulation_sql(sql_path, VARIABLES, 'NO ZONE')
+
+def test_sql_and_csv_hourly_means_match():
+    sql_data = read_simulation_sql(os.path.join(FIXTURE_DIRECTORY, 'eplusout.sql'), VARIABLES, 'THERMAL ZONE')
+    csv_data = read_simulation_csv(os.path.join(FIXTURE_DIRECTORY, 'eplusout.csv'), VARIABLES, 'THERMAL ZONE')
+    pd.testing.assert_frame_equal(sql_data, csv_data)
+    hourly_data = get_hourly_means(sql_data)
+    pd.testing.assert_frame_equal(hourly_data, get_hourly_means(csv_data))
+    assert len(hourly_data) == FIXTURE_DAYS * 24 + 1
+
+@pytest.mark.parametrize('step', [1, 4, 6])
+def test_hourly_means_match_resample(step, tmp_path):
+    csv_path = write_synthetic_eplusout(str(tmp_path), step, seed=step)
+    expected = get_hourly_means_resample(csv_path)
+    data = get_hourly_means_vectorised(str(tmp_path))
+
+    assert len(data) == len(expected) == (8761 if step > 1 else 8760)
+    assert (data.index == expected.index).all()
+    assert list(data.columns) == list(expected.columns)
+    assert (data.dtypes == np.float32).all()
+    # Float32 reading of the values
+    assert np.allclose(data.values, expected.values, rtol=0, atol=1e-4)
+
+
+if __name__ == '__main__' and sys.argv[1:] == ['fixture']:
+    print('Fixture written in ' + write_eplusout_fixture(FIXTURE_DIRECTORY))
+elif __name__ == '__main__':
+    # Benchmark of the two paths on synthetic 15-minute eplusout.csv files (the csv files are written once in a temporary directory)
+    import tempfile
+    number_files = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as directory_path:
+        output_directories = [os.path.join(directory_path, str(key)) for key in range(number_files)]
+        for key, output_directory in enumerate(output_directories):
+            write_synthetic_eplusout(output_directory, 4, seed=key)
+
+        start = time.time()
+        expected = [get_hourly_means_resample(os.path.join(output_directory, 'eplusout.csv')) for output_directory in output_directories]
+        duration_resample = time.time() - start
+        start = time.time()
+        data = [get_hourly_means_vectorised(output_directory) for output_directory in output_directories]
+        duration_vectorised = time.time() - start
+
+    max_difference = max(float(np.nanmax(np.abs(d.values - e.values))) for d, e in zip(data, expected))
+    print('{} synthetic eplusout.csv files (35040 time steps, {} columns)'.format(number_files, len(SYNTHETIC_COLUMNS)))
+    print('Resample path: {:.2f} s, vectorised path: {:.2f} s, speedup: {:.1f}x'.format(duration_resample, duration_vectorised, duration_resample / duration_vectorised))
+    print('Maximum difference of the hourly means: {:.2e}'.format(max_difference))
@@ -0,0 +1,33 @@
+# Parsing of the epw files (toolbox.epw) with irregular header lines
+import os
+import glob
+import pandas as pd
+import pytest
+
+from toolbox.epw import read_epw_headers, parse_epw, read_epw
+
+CLIMATE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'database', 'climate')
+EPW_PATHS = sorted(glob.glob(os.path.join(CLIMATE_DIRECTORY, '*.epw')))
+
+pytestmark = pytest.mark.skipif(not EPW_PATHS, reason='the epw files are not in the database directory')
+
+
+def test_repeated_header_lines_are_skipped(tmp_path):
+    with open(EPW_PATHS[0], newline='') as file:
+        lines = file.readlines()
+    headers, number_lines = read_epw_headers(EPW_PATHS[0])
+    assert number_lines == len(headers) == 8
+    comments = [i for i, line in enumerate(lines) if line.startswith('COMMENTS 1')][0]
+    # A repeated COMMENTS 1 line and a blank line in the headers
+    irregular_path = str(tmp_path / 'irregular.epw')
+    with open(irregular_path, 'w', newline='') as file:
+        file.writelines(lines[:comments + 1] + [lines[comments], '\r\n'] + lines[comments + 1:])
+
+    irregular_headers, irregular_number_lines = read_epw_headers(irregular_path)
+    assert irregular_number_lines == number_lines + 2
+    assert irregular_headers == headers
+    data, _ = parse_epw(EPW_PATHS[0])
+    irregular_data, _ = parse_epw(irregular_path)
+    pd.testing.assert_frame_equal(irregular_data, data)
+    cached_data, _ = read_epw(irregular_path, cache_dir=str(tmp_path / 'cache'))
+    assert len(cached_data) == 8760 and (cached_data.dtypes != object).all()
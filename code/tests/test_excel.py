@@ -0,0 +1,61 @@
+# Cache of the Excel workbooks (toolbox.excel): the cached sheets are the same as pd.read_excel, values and python types
+import os
+import datetime
+import openpyxl
+import pandas as pd
+import pytest
+
+from toolbox.excel import read_workbook, get_sheet_names
+
+SAWS_WORKBOOK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'database', 'saws', 'JHB 2014 hourly data.xlsx')
+
+
+# Definition of the function to check that two sheets are the same
+'''
+Description: This function checks that a cached sheet is the same as the sheet read by pd.read_excel: same dtypes and values,
+             and the same python type for each cell of the object columns.
+Inputs:
+    - data: pd.DataFrame read from the cache
+    - expected: pd.DataFrame read by pd.read_excel
+Outputs:
+    - None
+'''
+def assert_sheet_equal(data, expected):
+    pd.testing.assert_frame_equal(data, expected)
+    assert data.equals(expected)
+    for i in range(expected.shape[1]):
+        if expected.iloc[:, i].dtype == object:
+            for value, expected_value in zip(data.iloc[:, i].values, expected.iloc[:, i].values):
+                assert type(value) is type(expected_value), (expected.columns[i], value, expected_value)
+
+def test_read_workbook_of_indoor_readings(tmp_path):
+    # Indoor readings as exported by the loggers: dates, times, readings mixing numbers and strings, empty cells
+    path = str(tmp_path / 'indoor.xlsx')
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for sheet, offset in [('1010043533', 0), ('1010043534', 5)]:
+        worksheet = workbook.create_sheet(sheet)
+        worksheet.append(['Date', 'Time', 'Readings (°C)', 'Readings (%RH)', 'Flag'])
+        for i, value in enumerate(pd.date_range('2016-06-01', periods=48, freq='30min')):
+            reading = '> 85.0  ' if i == 3 else None if i == 7 else round(10 + i / 2 + offset, 1)
+            worksheet.append([value.to_pydatetime(), value.time(), reading, i + offset, ['', 'a', 1, True][i % 4]])
+    workbook.save(path)
+    cache_dir = str(tmp_path / 'cache')
+
+    expected = pd.read_excel(path, sheet_name=None)
+    assert isinstance(expected['1010043533']['Time'].values[0], datetime.time)
+    assert get_sheet_names(path, workers=1, cache_dir=cache_dir) == list(expected.keys())
+    # First read (conversion) and second read (cache)
+    for data in [read_workbook(path, workers=1, cache_dir=cache_dir), read_workbook(path, cache_dir=cache_dir)]:
+        assert list(data.keys()) == list(expected.keys())
+        for sheet in expected:
+            assert_sheet_equal(data[sheet], expected[sheet])
+    # Only parquet files and the index, no pickle
+    for workbook_cache in os.listdir(cache_dir):
+        assert all(file.endswith(('.parquet', '.json')) for file in os.listdir(os.path.join(cache_dir, workbook_cache)))
+
+@pytest.mark.skipif(not os.path.exists(SAWS_WORKBOOK_PATH), reason='the SAWS workbook is not in the database directory')
+def test_read_workbook_of_saws_data(tmp_path):
+    expected = pd.read_excel(SAWS_WORKBOOK_PATH, sheet_name='Temperature')
+    read_workbook(SAWS_WORKBOOK_PATH, workers=1, cache_dir=str(tmp_path))
+    assert_sheet_equal(read_workbook(SAWS_WORKBOOK_PATH, sheet_name='Temperature', cache_dir=str(tmp_path)), expected)
@@ -0,0 +1,223 @@
+# Equivalence of the IDF rendered without the OpenStudio SDK (pyosmodel.idf) and the IDF of the OpenStudio path
+# (pyosmodel.model.simulate_model followed by the ForwardTranslator), on a few reference rows of inputs,
+# and regression of the rendered IDF against a golden file (tests/data/rendered_building.idf), which needs no OpenStudio SDK
+# Run as a script to write the golden file again after an intended change of the rendered IDF
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyosmodel.idf import create_idf, WALL_NAMES
+from pyosmodel.predefinedmodel import define_RDP_inputs, define_shack_inputs
+
+STEP = 4
+GOLDEN_IDF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'rendered_building.idf')
+# Row of the reference inputs and wall with the door of the golden file
+GOLDEN_KEY = 3
+GOLDEN_DOOR_WALL = 'Wall 2'
+
+
+# Definition of the function to parse an IDF file
+'''
+Description: This function parses the content of an IDF file into its objects (comments removed).
+Inputs:
+    - idf: content of the IDF file
+Outputs:
+    - objects: list of (object type in lower case, list of fields)
+'''
+def parse_idf(idf):
+    lines = [line.split('!')[0] for line in idf.splitlines()]
+    objects = []
+    for idf_object in ' '.join(lines).split(';'):
+        fields = [field.strip() for field in idf_object.split(',')]
+        if fields[0]:
+            objects.append((fields[0].lower(), fields[1:]))
+    return objects
+
+# Definition of the function to get the objects of a type
+'''
+Description: This function returns the fields of the objects of a type of a parsed IDF file.
+Inputs:
+    - objects: parsed IDF file (see parse_idf)
+    - object_type: type of the objects
+Outputs:
+    - fields: list of the fields of each object
+'''
+def get_objects(objects, object_type):
+    return [fields for name, fields in objects if name == object_type.lower()]
+
+# Definition of the function to get the constructions of a parsed IDF file
+'''
+Description: This function returns the constructions as the properties of their layers, independently of the names of the
+             materials and constructions (the OpenStudio path names some of them 'Construction 1', ...).
+Inputs:
+    - objects: parsed IDF file (see parse_idf)
+Outputs:
+    - constructions: sorted list of tuples of layers, each layer a tuple of floats
+                     (thickness, conductivity, density, specific heat of a material, U-factor and SHGC of a simple glazing)
+'''
+def get_constructions(objects):
+    layers = {fields[0]: tuple(float(value) for value in fields[2:6]) for fields in get_objects(objects, 'Material')}
+    layers.update({fields[0]: tuple(float(value) for value in fields[1:3]) for fields in get_objects(objects, 'WindowMaterial:SimpleGlazingSystem')})
+    return sorted(tuple(layers[layer] for layer in fields[1:]) for fields in get_objects(objects, 'Construction'))
+
+# Definition of the function to get the density of an internal load
+'''
+Description: This function returns the density of a People, Lights or equipment object, whatever its calculation method.
+Inputs:
+    - fields: fields of the object
+    - per_area_method: name of the per floor area method ('People/Area' or 'Watts/Area')
+    - area_per_method: name of the floor area per unit method ('Area/Person', None if the object has none)
+Outputs:
+    - density: density of the load per floor area (people/m2 or W/m2)
+'''
+def get_load_density(fields, per_area_method, area_per_method=None):
+    if fields[3].lower() == per_area_method.lower():
+        return float(fields[5])
+    if area_per_method is not None and fields[3].lower() == area_per_method.lower():
+        return 1 / float(fields[6])
+    raise ValueError("Unexpected calculation method. Method = " + fields[3])
+
+# Definition of the function to calculate the area of a polygon
+'''
+Description: This function calculates the area of a planar polygon in 3D (Newell's method).
+Inputs:
+    - coordinates: list of the coordinates of the vertices (x1, y1, z1, x2, y2, z2, ...)
+Outputs:
+    - area: area of the polygon in m2
+'''
+def calculate_polygon_area(coordinates):
+    vertices = np.array([float(value) for value in coordinates]).reshape(-1, 3)
+    return 0.5 * np.linalg.norm(np.cross(vertices, np.roll(vertices, -1, axis=0)).sum(axis=0))
+
+# Definition of the function to get the geometry of a parsed IDF file
+'''
+Description: This function returns the geometry of the walls, windows and door of a parsed IDF file, by wall name
+             (the OpenStudio path names the sub surfaces differently, they are matched by their base surface).
+Inputs:
+    - objects: parsed IDF file (see parse_idf)
+Outputs:
+    - geometry: dictionary with the gross area of each wall, the window area and sill height of each wall with a window,
+                the wall with the door and the door area
+'''
+def get_geometry(objects):
+    # The vertices follow the number of vertices field (index 10 of a surface, 8 of a sub surface)
+    walls = {fields[0]: fields[11:] for fields in get_objects(objects, 'BuildingSurface:Detailed') if fields[1].lower() == 'wall'}
+    sub_surfaces = get_objects(objects, 'FenestrationSurface:Detailed')
+    windows = {fields[3]: fields[9:] for fields in sub_surfaces if fields[1].lower() in ['window', 'fixedwindow']}
+    doors = {fields[3]: fields[9:] for fields in sub_surfaces if fields[1].lower() == 'door'}
+    assert len(doors) == 1 and len(windows) + len(doors) == len(sub_surfaces)
+    door_wall, door_coordinates = list(doors.items())[0]
+    return {
+        'wall_areas': {name: calculate_polygon_area(coordinates) for name, coordinates in walls.items()},
+        'window_areas': {name: calculate_polygon_area(coordinates) for name, coordinates in windows.items()},
+        'sill_heights': {name: min(float(value) for value in coordinates[2::3]) for name, coordinates in windows.items()},
+        'door_wall': door_wall,
+        'door_area': calculate_polygon_area(door_coordinates),
+    }
+
+# Definition of the function to get the key objects of a parsed IDF file
+'''
+Description: This function returns the objects of the IDF files compared between the two engines, as numbers.
+Inputs:
+    - objects: parsed IDF file (see parse_idf)
+Outputs:
+    - key_objects: dictionary {object: value}
+'''
+def get_key_objects(objects):
+    people = get_objects(objects, 'People')
+    lights = get_objects(objects, 'Lights')
+    equipment = get_objects(objects, 'ElectricEquipment') + get_objects(objects, 'GasEquipment')
+    infiltration = get_objects(objects, 'ZoneInfiltration:DesignFlowRate')
+    run_period = get_objects(objects, 'RunPeriod')
+    timestep = get_objects(objects, 'Timestep')
+    assert len(people) == len(lights) == len(equipment) == len(infiltration) == len(run_period) == len(timestep) == 1
+    assert infiltration[0][3].lower() == 'flow/zone'
+    building = get_objects(objects, 'Building')
+    assert len(building) == 1
+    return {
+        'north_axis': float(building[0][1]),
+        'geometry': get_geometry(objects),
+        'heating_coils': len(get_objects(objects, 'Coil:Heating:Electric')),
+        'constructions': get_constructions(objects),
+        'people': get_load_density(people[0], 'People/Area', 'Area/Person'),
+        'lights': get_load_density(lights[0], 'Watts/Area'),
+        'equipment': get_load_density(equipment[0], 'Watts/Area'),
+        'infiltration': float(infiltration[0][4]),
+        'run_period': [int(value) for value in run_period[0][1:7]],
+        'timestep': int(timestep[0][0]),
+    }
+
+# Definition of the fixture of the reference rows of inputs
+'''
+Description: This fixture returns a few reference rows of inputs, of both predefined dwellings (gas and electric equipment).
+Inputs:
+    - None
+Outputs:
+    - inputs: pd.DataFrame of inputs
+'''
+@pytest.fixture(scope='module')
+def reference_inputs():
+    np.random.seed(0)
+    return pd.concat([define_RDP_inputs(3), define_shack_inputs(3)], ignore_index=True)
+
+def test_idf_engine_matches_openstudio_engine(reference_inputs, tmp_path):
+    pytest.importorskip('openstudio')
+    from pyosmodel import utils
+    from pyosmodel.model import simulate_model
+    from pyosmodel.params import change_timestep
+
+    for key, item_inputs in reference_inputs.iterrows():
+        model = simulate_model(item_inputs, 'minimal')
+        change_timestep(model, STEP)
+        idf_path = str(tmp_path / '{}.idf'.format(key))
+        utils.save_model_to_idf(model, idf_path)
+        with open(idf_path) as file:
+            expected = get_key_objects(parse_idf(file.read()))
+        # The door wall is drawn among the OpenStudio surfaces, render the door on the same wall
+        rendered = get_key_objects(parse_idf(create_idf(item_inputs, 'minimal', STEP, expected['geometry']['door_wall'])))
+
+        assert len(rendered['constructions']) == len(expected['constructions'])
+        for rendered_construction, expected_construction in zip(rendered['constructions'], expected['constructions']):
+            assert len(rendered_construction) == len(expected_construction)
+            for rendered_layer, expected_layer in zip(rendered_construction, expected_construction):
+                assert rendered_layer == pytest.approx(expected_layer, rel=1e-6)
+        for load in ['people', 'lights', 'equipment', 'infiltration']:
+            assert rendered[load] == pytest.approx(expected[load], rel=1e-6), load
+        assert rendered['run_period'] == expected['run_period']
+        assert rendered['timestep'] == expected['timestep'] == STEP
+        assert rendered['north_axis'] == pytest.approx(expected['north_axis'], rel=1e-6, abs=1e-9)
+
+        # Same walls, a window on every wall but the door wall, at the same sill height, and the same door
+        rendered_geometry, expected_geometry = rendered['geometry'], expected['geometry']
+        assert sorted(rendered_geometry['wall_areas']) == sorted(expected_geometry['wall_areas']) == WALL_NAMES
+        for geometry in ['wall_areas', 'window_areas', 'sill_heights']:
+            assert sorted(rendered_geometry[geometry]) == sorted(expected_geometry[geometry]), geometry
+            for name in expected_geometry[geometry]:
+                assert rendered_geometry[geometry][name] == pytest.approx(expected_geometry[geometry][name], rel=1e-6), (geometry, name)
+        assert rendered_geometry['door_wall'] == expected_geometry['door_wall']
+        assert rendered_geometry['door_area'] == pytest.approx(expected_geometry['door_area'], rel=1e-6)
+
+        # The heating coil of simulate_model is not connected to an air loop: the ForwardTranslator does not export it
+        assert rendered['heating_coils'] == expected['heating_coils'] == 0
+
+def test_rendered_idf_matches_golden_file(reference_inputs):
+    with open(GOLDEN_IDF_PATH) as file:
+        golden_idf = file.read()
+    assert create_idf(reference_inputs.loc[GOLDEN_KEY], 'minimal', STEP, GOLDEN_DOOR_WALL) == golden_idf
+
+    # The golden building itself: a door on its wall, a window on the three other walls, no heating coil
+    key_objects = get_key_objects(parse_idf(golden_idf))
+    assert key_objects['geometry']['door_wall'] == GOLDEN_DOOR_WALL
+    assert sorted(key_objects['geometry']['window_areas']) == [name for name in WALL_NAMES if name != GOLDEN_DOOR_WALL]
+    assert key_objects['heating_coils'] == 0
+
+if __name__ == '__main__':
+    np.random.seed(0)
+    inputs = pd.concat([define_RDP_inputs(3), define_shack_inputs(3)], ignore_index=True)
+    with open(GOLDEN_IDF_PATH, 'w') as file:
+        file.write(create_idf(inputs.loc[GOLDEN_KEY], 'minimal', STEP, GOLDEN_DOOR_WALL))
+    print('Golden IDF written in ' + GOLDEN_IDF_PATH)
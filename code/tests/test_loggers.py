@@ -0,0 +1,99 @@
+# Logger files ingest (toolbox.loggers): schema detection on a sample file of each logger type of database/giyani, the vectorised
+# parse against a row-by-row parse of the same file, and the 12-hour times of the EasyLog exports
+import os
+import shutil
+import pandas as pd
+import pytest
+
+from toolbox.loggers import detect_logger_schema, get_logger_schema, read_logger_file, load_loggers
+
+DATABASE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'database')
+# Sample file of each schema and separator, relative to the database directory
+SAMPLE_FILES = [
+    ('giyani/others/1010060385_Started_9-7-2016,_Finished_3-23-2017.csv', 'easylog', ','),
+    ('giyani/others/1010060660 Started 9-8-2016, Finished 3-28-2017.txtm', 'easylog', '\t'),
+    ('giyani/others/1010060657 Started 9-8-2016, Finished 3-28-2017.txt', 'easylog-utf8', '\t'),
+    ('giyani/others/1010060475.csv', 'easylog-short', ','),
+    ('giyani/winter/0000000050847241.csv', 'ibutton', ','),
+]
+
+pytestmark = pytest.mark.skipif(not all(os.path.exists(os.path.join(DATABASE_DIRECTORY, file)) for file, schema, separator in SAMPLE_FILES),
+                                reason='the sample logger files are not in the database directory')
+
+
+# Definition of the row-by-row parser of a logger file
+'''
+Description: This function parses a logger file as the original scripts did, as the reference of read_logger_file: the date and the time
+             of each row are joined and parsed together, and the readings are converted with pd.to_numeric.
+Inputs:
+    - file_path: path to the logger file
+    - schema: schema of the file (see toolbox.loggers.LOGGER_SCHEMAS)
+    - separator: separator of the columns of the file
+Outputs:
+    - data: pd.DataFrame with the columns Datetime, Indoor Mean Air Temperature, Indoor Air Relative Humidity and key
+'''
+def read_logger_file_row_by_row(file_path, schema, separator):
+    data = pd.read_csv(file_path, sep=separator, header=0 if schema['header'] is not None else None, dtype=str,
+                       encoding=schema['encoding'], skipinitialspace=True)
+    datetimes = data[schema['datetime'][0]].str.strip()
+    for column in schema['datetime'][1:]:
+        datetimes = datetimes + ' ' + data[column].str.strip()
+    data = pd.DataFrame({'Datetime': pd.to_datetime(datetimes, format=' '.join(schema['format']), errors='coerce'),
+                         'Indoor Mean Air Temperature': pd.to_numeric(data[schema['temperature']], errors='coerce'),
+                         'Indoor Air Relative Humidity': pd.to_numeric(data[schema['humidity']], errors='coerce')})
+    data = data.loc[(data['Indoor Air Relative Humidity'] >= 0) & (data['Indoor Air Relative Humidity'] <= 100)].dropna()
+    data['key'] = os.path.basename(file_path)[:10] if schema['header'] is not None else os.path.splitext(os.path.basename(file_path))[0]
+    return data
+
+@pytest.mark.parametrize('file, schema, separator', SAMPLE_FILES)
+def test_detect_logger_schema_of_sample_files(file, schema, separator):
+    assert detect_logger_schema(os.path.join(DATABASE_DIRECTORY, file)) == (schema, separator)
+
+@pytest.mark.parametrize('file, schema, separator', SAMPLE_FILES)
+def test_read_logger_file_matches_row_by_row_parse(file, schema, separator):
+    file_path = os.path.join(DATABASE_DIRECTORY, file)
+    data, sentinels = read_logger_file(file_path, get_logger_schema(schema), separator)
+    expected = read_logger_file_row_by_row(file_path, get_logger_schema(schema), separator)
+    assert len(data) > 500
+    pd.testing.assert_frame_equal(data.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False)
+    if file.startswith('giyani/others/1010060385'):
+        assert sentinels == ['> 85.0 ']
+
+def test_twelve_hour_times(tmp_path):
+    # Readings of an EasyLog export around midnight and noon, and one sentinel reading
+    file_path = str(tmp_path / '1010069999.csv')
+    with open(file_path, 'w', encoding='latin1') as file:
+        file.write('Index,Date,Time,RH,Temp,Number\n')
+        rows = [('9/8/2016', '11:45:00 PM', '40.5', '20.5'), ('9/9/2016', '12:30:00 AM', '41', '20'), ('9/9/2016', '1:15:00 AM', '42', '19.5'),
+                ('9/9/2016', '11:59:59 AM', '35', '25'), ('9/9/2016', '12:00:00 PM', '34', '26'), ('9/9/2016', '1:15:00 PM', '33', '> 85.0 '),
+                ('9/9/2016', '12:10:00 PM', '101', '27')]
+        for i, row in enumerate(rows):
+            file.write(','.join([str(i + 1)] + list(row) + ['1010069999']) + '\n')
+
+    assert detect_logger_schema(file_path) == ('easylog-short', ',')
+    data, sentinels = read_logger_file(file_path, get_logger_schema('easylog-short'))
+    # 12 AM is midnight and 12 PM is noon; the sentinel reading and the humidity above 100 % are removed
+    assert data['Datetime'].tolist() == [pd.Timestamp('2016-09-08 23:45:00'), pd.Timestamp('2016-09-09 00:30:00'), pd.Timestamp('2016-09-09 01:15:00'),
+                                         pd.Timestamp('2016-09-09 11:59:59'), pd.Timestamp('2016-09-09 12:00:00')]
+    assert data['Indoor Mean Air Temperature'].tolist() == [20.5, 20, 19.5, 25, 26]
+    assert sentinels == ['> 85.0 ']
+    assert (data['key'] == '1010069999').all()
+
+def test_load_loggers_skips_small_and_unknown_files(tmp_path, capsys):
+    for file, schema, separator in SAMPLE_FILES[2:]:
+        shutil.copy(os.path.join(DATABASE_DIRECTORY, file), str(tmp_path))
+    with open(str(tmp_path / 'empty.csv'), 'w') as file:
+        file.write('\n\n')
+    with open(str(tmp_path / 'notes.csv'), 'w') as file:
+        file.write('Logger,Location\n' + '1010060475,Kitchen\n' * 500)
+
+    data = load_loggers(str(tmp_path), workers=1)
+    output = capsys.readouterr().out
+    assert '1 files smaller than 5000 bytes skipped' in output and 'notes.csv has no known schema, skipped' in output
+    assert data['key'].unique().tolist() == ['0000000050847241', '1010060475', '1010060657']
+    assert not data.duplicated(['key', 'Datetime']).any()
+    assert (data.groupby('key')['Datetime'].is_monotonic_increasing).all()
+
+    # The second load only reads the cached index of the directory
+    assert os.path.exists(str(tmp_path / '.logger_index.json'))
+    pd.testing.assert_frame_equal(load_loggers(str(tmp_path), workers=1), data)
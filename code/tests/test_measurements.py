@@ -0,0 +1,144 @@
+# Processing of the measurements of all the loggers at once (toolbox.measurements) against the per-logger loops of the original
+# scripts 03 and 04, on synthetic readings with irregular times and gaps
+import itertools
+import numpy as np
+import pandas as pd
+
+from toolbox.measurements import MEASUREMENT_VARIABLES, get_common_period, resample_loggers, analyse_coverage, interpolate_loggers, process_measurements, join_weather
+
+KEYS = ['1010060321', '1010060322', '1010060323', '1010060324', '1010060325']
+
+
+# Definition of the function to generate synthetic logger readings
+'''
+Description: This function generates readings of loggers every 20 minutes with a jitter of a few seconds, starting and ending on different days,
+             with gaps of a few hours to a few days and missing readings of one variable.
+Inputs:
+    - keys: list of the keys of the loggers
+    - seed: seed of the random generator (default: 0)
+Outputs:
+    - data: pd.DataFrame with the columns Datetime, the variables and key, in random order
+'''
+def make_readings(keys, seed=0):
+    rng = np.random.default_rng(seed)
+    readings = []
+    for i, key in enumerate(keys):
+        start = pd.Timestamp('2016-09-06 09:00:00') + pd.Timedelta(hours=int(rng.integers(0, 48)), minutes=int(rng.integers(0, 60)))
+        number_readings = 3 * 24 * 20 - int(rng.integers(0, 200))
+        datetimes = start + pd.to_timedelta(np.arange(number_readings) * 1200 + rng.integers(-30, 30, number_readings), unit='s')
+        kept = np.ones(number_readings, dtype=bool)
+        for gap_start in rng.integers(0, number_readings, 1 + i):
+            kept[gap_start:gap_start + int(rng.integers(6, 3 * 72))] = False
+        data = pd.DataFrame({'Datetime': datetimes[kept],
+                             MEASUREMENT_VARIABLES[0]: 20 + 5 * np.sin(np.arange(number_readings)[kept] / 72 * 2 * np.pi) + rng.normal(0, 0.5, kept.sum()),
+                             MEASUREMENT_VARIABLES[1]: 50 + 20 * np.cos(np.arange(number_readings)[kept] / 72 * 2 * np.pi) + rng.normal(0, 2, kept.sum()),
+                             'key': key})
+        data.loc[rng.random(len(data)) < 0.02, MEASUREMENT_VARIABLES[1]] = np.nan
+        readings.append(data)
+    return pd.concat(readings, ignore_index=True).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+def test_resample_loggers_matches_resample_per_logger():
+    data = make_readings(KEYS)
+    values, keys, datetimes = resample_loggers(data, '2h')
+    assert keys == KEYS
+    for i, key in enumerate(keys):
+        expected = data[data['key'] == key].sort_values('Datetime').resample('2h', on='Datetime')[MEASUREMENT_VARIABLES].mean()
+        resampled = pd.DataFrame(values[i], index=datetimes, columns=MEASUREMENT_VARIABLES).reindex(expected.index)
+        pd.testing.assert_frame_equal(resampled, expected, check_freq=False, check_names=False)
+        assert np.isnan(values[i][~datetimes.isin(expected.index)]).all()
+
+def test_interpolate_loggers_matches_pandas_interpolate():
+    values, keys, datetimes = resample_loggers(make_readings(KEYS), '1h')
+    # Irregular time steps (the 'time' method weights by the durations, not by the positions), and a logger without any humidity
+    steps = np.sort(np.random.default_rng(1).choice(len(datetimes), len(datetimes) // 2, replace=False))
+    values, datetimes = values[:, steps], datetimes[steps]
+    values[2, :, 1] = np.nan
+    assert np.isnan(values[:, 0]).any() and np.isnan(values[:, -1]).any()
+
+    interpolated = interpolate_loggers(values, datetimes)
+    for i in range(len(keys)):
+        for j in range(len(MEASUREMENT_VARIABLES)):
+            expected = pd.Series(values[i, :, j], index=datetimes).interpolate(method='time', limit_direction='both')
+            assert np.allclose(interpolated[i, :, j], expected.values, rtol=0, atol=1e-9, equal_nan=True), (keys[i], MEASUREMENT_VARIABLES[j])
+    assert np.isnan(interpolated[2, :, 1]).all() and not np.isnan(np.delete(interpolated, 2, axis=0)).any()
+
+def test_process_measurements_matches_per_logger_loop():
+    data = make_readings(KEYS)
+    measurements, report = process_measurements(data, freq='1h', coverage=0)
+    assert not report['Ejected'].any()
+
+    # Loop of the original scripts: common period, resample of each logger, pivot table and interpolation of each variable
+    common_period = data.groupby('key')['Datetime'].agg(['min', 'max'])
+    filtered = data[(data['Datetime'] >= common_period['min'].max()) & (data['Datetime'] <= common_period['max'].min())]
+    resampled = {}
+    for key, data_key in filtered.groupby('key'):
+        resampled[key] = data_key.sort_values(by=['Datetime']).resample('1h', on='Datetime')[MEASUREMENT_VARIABLES].mean()
+        resampled[key]['Datetime'] = resampled[key].index
+        resampled[key]['key'] = key
+    resampled = pd.concat(resampled, ignore_index=True)
+    for variable in MEASUREMENT_VARIABLES:
+        expected = resampled.pivot_table(values=variable, index='Datetime', columns='key').interpolate(method='time', limit_direction='both')
+        values = measurements.pivot(index='Datetime', columns='key', values=variable)
+        pd.testing.assert_frame_equal(values, expected, check_names=False, check_freq=False, rtol=0, atol=1e-9)
+
+def test_analyse_coverage_matches_per_logger_counts():
+    data = make_readings(KEYS)
+    start, end = get_common_period(data)
+    values, keys, datetimes = resample_loggers(data, '1h')
+    # Implausible temperatures of two loggers, in 3 % and 10 % of their time steps with readings
+    rng = np.random.default_rng(2)
+    for i, fraction in [(1, 0.03), (3, 0.1)]:
+        steps = np.flatnonzero(~np.isnan(values[i]).all(axis=1))
+        values[i, rng.choice(steps, int(fraction * len(steps)), replace=False), 0] = 99
+    cleaned, report = analyse_coverage(values, keys, datetimes, start=start, end=end, coverage=0.7, max_gap='60h', max_implausible=0.05)
+    assert report.index.tolist() == keys
+    assert not (cleaned[:, :, 0] > 70).any()
+
+    # Counts of each logger, one after the other, on the time steps of the common period (the first one contains its start)
+    in_period = (datetimes + pd.Timedelta('1h') > start) & (datetimes <= end)
+    time_steps = {}
+    for i, key in enumerate(keys):
+        readings = pd.DataFrame(values[i], index=datetimes, columns=MEASUREMENT_VARIABLES)[in_period]
+        implausible = (readings[MEASUREMENT_VARIABLES[0]] > 70) | (readings[MEASUREMENT_VARIABLES[0]] < -10)
+        valid = readings.notnull().all(axis=1) & ~implausible
+        runs = [len(list(group)) for is_valid, group in itertools.groupby(valid.values) if not is_valid]
+        time_steps[key] = valid.sum()
+        assert report.loc[key, 'Time steps'] == valid.sum()
+        assert np.isclose(report.loc[key, 'Coverage'], valid.sum() / in_period.sum())
+        assert report.loc[key, 'Longest gap'] == max(runs, default=0) * pd.Timedelta('1h')
+        assert np.isclose(report.loc[key, 'Implausible readings'], implausible.sum() / readings.notnull().any(axis=1).sum())
+    relative_coverage = pd.Series(time_steps) / max(time_steps.values())
+    assert np.allclose(report['Relative coverage'], relative_coverage[keys].values)
+
+    # Every failing logger is ejected, with all its reasons
+    assert report['Reason'].tolist() == ['', 'coverage, longest gap', '', 'coverage, implausible readings', '']
+    assert report['Ejected'].tolist() == [False, True, False, True, False]
+
+def test_join_weather_matches_merge_asof_per_logger():
+    measurements, report = process_measurements(make_readings(KEYS), freq='1h', coverage=0)
+    # Measurements halfway between two weather records (ties) and at irregular times
+    measurements['Datetime'] = measurements['Datetime'] + pd.to_timedelta(np.where(np.arange(len(measurements)) % 3 == 0, 30, 7), unit='min')
+    rng = np.random.default_rng(3)
+    # Weather records of the station every hour, without a day of records, in random order, with a record without datetime
+    datetimes = pd.date_range(measurements['Datetime'].min().floor('1h') - pd.Timedelta('2h'), measurements['Datetime'].max() + pd.Timedelta('2h'), freq='1h')
+    datetimes = datetimes[(datetimes < '2016-09-12') | (datetimes >= '2016-09-13')]
+    weather = pd.DataFrame({'Datetime': datetimes.append(pd.DatetimeIndex([pd.NaT])), 'Outdoor Dry Bulb Temperature': rng.normal(20, 5, len(datetimes) + 1),
+                            'Outdoor Relative Humidity': rng.normal(50, 10, len(datetimes) + 1)}).sample(frac=1, random_state=3)
+    columns = ['Outdoor Dry Bulb Temperature', 'Outdoor Relative Humidity']
+
+    for tolerance in [None, '40min']:
+        joined = join_weather(measurements, weather, columns, tolerance=tolerance)
+        assert (joined[measurements.columns].values == measurements.values).all()
+        # Loop of the original scripts: one as-of join of each logger with the sorted weather data
+        sorted_weather = weather.dropna(subset=['Datetime']).sort_values('Datetime')
+        for key, measurements_key in measurements.groupby('key'):
+            expected = pd.merge_asof(measurements_key, sorted_weather, on='Datetime', direction='nearest',
+                                     tolerance=pd.Timedelta(tolerance) if tolerance is not None else None)
+            pd.testing.assert_frame_equal(joined[joined['key'] == key].reset_index(drop=True), expected[joined.columns].reset_index(drop=True))
+        # Without tolerance the whole day without records gets distant weather data, with the tolerance it gets NaN
+        missing_day = (joined['Datetime'] >= '2016-09-12 00:00') & (joined['Datetime'] < '2016-09-12 23:30')
+        assert joined.loc[missing_day, columns].isnull().all().all() == (tolerance is not None)
+        assert not joined.loc[~missing_day, columns].isnull().any().any()
+
+    # Weather data indexed by datetime
+    pd.testing.assert_frame_equal(join_weather(measurements, weather.set_index('Datetime'), columns), join_weather(measurements, weather, columns))
@@ -0,0 +1,148 @@
+# Results store (toolbox.results) and results cube (toolbox.cube) filled by toolbox.utils.import_simulation_data from synthetic
+# eplusout.csv files (see tests/test_eplusout.py): the store against the csv output of the same ingest, the filters of read_results,
+# the incremental ingest against a full ingest and the slices of the cube against read_results
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+
+from test_eplusout import write_synthetic_eplusout
+from toolbox.utils import import_simulation_data
+from toolbox.results import read_results, load_ingest_index
+from toolbox.cube import read_cube
+from toolbox.timekeys import SIMULATION_YEAR
+
+SCENARIO = 'present-day'
+KEYS = [0, 1, 2, 5]
+RESULTS_COLUMNS = ['Indoor Mean Air Temperature', 'Indoor Air Relative Humidity']
+WEATHER_COLUMNS = ['Outdoor Dry Bulb Temperature', 'Outdoor Relative Humidity']
+
+
+# Definition of the function to set up the simulation outputs of a scenario
+'''
+Description: This function writes the hourly synthetic eplusout.csv of some buildings in the outputs directory of a scenario
+             and returns synthetic hourly weather data of the simulation year.
+Inputs:
+    - campaign_directory: path to the directory of the campaign
+    - keys: list of the keys of the buildings, their seed of the synthetic values
+Outputs:
+    - directory_path: path to the outputs directory of the scenario (with a trailing separator)
+    - weather: pd.DataFrame of hourly weather data indexed by datetime
+'''
+def setup_outputs(campaign_directory, keys):
+    directory_path = os.path.join(str(campaign_directory), SCENARIO, 'outputs') + '/'
+    for key in keys:
+        write_synthetic_eplusout(directory_path + str(key), step=1, seed=key)
+    datetimes = pd.date_range(str(SIMULATION_YEAR) + '-01-01', periods=8760, freq='60min')
+    weather = pd.DataFrame({
+        WEATHER_COLUMNS[0]: 15 + 10 * np.sin(np.arange(8760) / 24 * 2 * np.pi),
+        WEATHER_COLUMNS[1]: 60 + 20 * np.cos(np.arange(8760) / 24 * 2 * np.pi),
+    }, index=datetimes)
+    return directory_path, weather
+
+# Definition of the fixture of a scenario ingested to the csv output and to the results store
+'''
+Description: This fixture ingests the outputs of the buildings KEYS once for the module, to a csv file and to a results store with its cube.
+Inputs:
+    - tmp_path_factory: pytest factory of temporary directories
+Outputs:
+    - ingest: dictionary with the outputs directory, the weather data, the csv path, the store path and the returned dataframe
+'''
+@pytest.fixture(scope='module')
+def ingest(tmp_path_factory):
+    campaign_directory = tmp_path_factory.mktemp('campaign')
+    directory_path, weather = setup_outputs(campaign_directory, KEYS)
+    csv_path = os.path.join(str(campaign_directory), 'simulation_data.csv')
+    store_path = os.path.join(str(campaign_directory), 'store')
+    data = import_simulation_data(directory_path, weather, csv_path, workers=1, store_path=store_path, cube=True)
+    return {'directory_path': directory_path, 'weather': weather, 'csv_path': csv_path, 'store_path': store_path, 'data': data}
+
+def test_store_matches_csv_ingest(ingest):
+    stored = read_results(ingest['store_path'], SCENARIO)
+    assert list(stored.columns) == ['Datetime', 'Hour', 'key'] + RESULTS_COLUMNS + WEATHER_COLUMNS
+    assert stored['key'].unique().tolist() == KEYS
+    assert len(stored) == 8760 * len(KEYS)
+
+    # Same rows as the csv output and the returned dataframe, the results and the weather in float32
+    expected = pd.read_csv(ingest['csv_path'], parse_dates=['Datetime']).sort_values(['key', 'Hour'], kind='stable').reset_index(drop=True)
+    returned = ingest['data'].reset_index().sort_values(['key', 'Hour'], kind='stable').reset_index(drop=True)
+    for reference in [expected, returned]:
+        assert (stored['Datetime'].values == pd.to_datetime(reference['Datetime']).values).all()
+        assert (stored['Hour'].values == reference['Hour'].values).all()
+        assert (stored['key'].values == reference['key'].astype(np.int64).values).all()
+        for column in RESULTS_COLUMNS + WEATHER_COLUMNS:
+            assert stored[column].dtype == np.float32
+            assert np.array_equal(stored[column].values, reference[column].values.astype(np.float32), equal_nan=True), column
+
+    # The 01:00 time step of January 1st starts the year, the 24:00 time step of December 31st is the first hour of the next year
+    assert stored['Hour'].min() == 1 and stored['Hour'].max() == 8760
+    assert stored.loc[stored['Hour'] == 8760, WEATHER_COLUMNS].isnull().all().all()
+
+def test_read_results_filters(ingest):
+    full = read_results(ingest['store_path'], SCENARIO)
+
+    data = read_results(ingest['store_path'], SCENARIO, columns=[WEATHER_COLUMNS[1], RESULTS_COLUMNS[0]])
+    assert list(data.columns) == ['Datetime', 'Hour', 'key', RESULTS_COLUMNS[0], WEATHER_COLUMNS[1]]
+    pd.testing.assert_frame_equal(data, full[data.columns])
+
+    # Time range included at both ends, the start rounded up to the next hour
+    start, end = pd.Timestamp('2023-03-31 22:30'), pd.Timestamp('2023-04-02 00:00')
+    data = read_results(ingest['store_path'], SCENARIO, start=start, end=end)
+    assert data['Datetime'].min() == pd.Timestamp('2023-03-31 23:00') and data['Datetime'].max() == end
+    pd.testing.assert_frame_equal(data, full[(full['Datetime'] >= start) & (full['Datetime'] <= end)].reset_index(drop=True))
+
+    data = read_results(ingest['store_path'], SCENARIO, columns=[RESULTS_COLUMNS[1]], start=start, end=end, keys=[5, 1])
+    expected = full[(full['Datetime'] >= start) & (full['Datetime'] <= end) & full['key'].isin([1, 5])][data.columns].reset_index(drop=True)
+    pd.testing.assert_frame_equal(data, expected)
+    assert data['key'].unique().tolist() == [1, 5]
+
+    with pytest.raises(ValueError):
+        read_results(ingest['store_path'], SCENARIO, columns=['Indoor CO2 Concentration'])
+
+def test_incremental_ingest_matches_full_ingest(tmp_path):
+    directory_path, weather = setup_outputs(tmp_path, KEYS)
+    store_path = os.path.join(str(tmp_path), 'store')
+    import_simulation_data(directory_path, weather, None, workers=1, return_data=False, store_path=store_path, incremental=True, cube=True)
+
+    # One building simulated again, one deleted, one added, and one folder without results (failed simulation)
+    write_synthetic_eplusout(directory_path + '1', step=1, seed=10)
+    shutil.rmtree(directory_path + '2')
+    write_synthetic_eplusout(directory_path + '7', step=1, seed=7)
+    os.makedirs(directory_path + '9')
+    data = import_simulation_data(directory_path, weather, None, workers=1, store_path=store_path, incremental=True, cube=True)
+    assert sorted(data['key'].unique()) == ['1', '7']
+    assert sorted(load_ingest_index(store_path, SCENARIO).keys()) == ['0', '1', '5', '7']
+
+    full_store_path = os.path.join(str(tmp_path), 'full_store')
+    import_simulation_data(directory_path, weather, None, workers=1, return_data=False, store_path=full_store_path, cube=True)
+    pd.testing.assert_frame_equal(read_results(store_path, SCENARIO), read_results(full_store_path, SCENARIO))
+
+    # The cube updated in place matches the cube rebuilt from the full ingest
+    values, keys, datetimes, variables = read_cube(store_path, SCENARIO)
+    full_values, full_keys, full_datetimes, full_variables = read_cube(full_store_path, SCENARIO)
+    assert keys == full_keys == [0, 1, 5, 7]
+    assert np.array_equal(values, full_values, equal_nan=True)
+
+def test_read_cube_matches_read_results(ingest):
+    values, keys, datetimes, variables = read_cube(ingest['store_path'], SCENARIO)
+    assert values.shape == (len(KEYS), 8760, len(RESULTS_COLUMNS))
+    assert keys == KEYS and variables == RESULTS_COLUMNS
+    assert (datetimes == pd.date_range('2023-01-01', periods=8760, freq='60min')).all()
+
+    # Slice of some buildings (not in the order of the cube), one variable and a time range, against the same selection of read_results
+    start, end = pd.Timestamp('2023-02-01'), pd.Timestamp('2023-02-28 23:00')
+    values, keys, datetimes, variables = read_cube(ingest['store_path'], SCENARIO, keys=[5, 0], variables=[RESULTS_COLUMNS[1]], start=start, end=end)
+    assert values.shape == (2, 28 * 24, 1) and keys == [5, 0] and variables == [RESULTS_COLUMNS[1]]
+    assert datetimes[0] == start and datetimes[-1] == end
+    data = read_results(ingest['store_path'], SCENARIO, columns=[RESULTS_COLUMNS[1]], start=start, end=end, keys=[0, 5])
+    for i, key in enumerate(keys):
+        expected = data[data['key'] == key].set_index('Datetime')[RESULTS_COLUMNS[1]].reindex(datetimes)
+        assert np.array_equal(values[i, :, 0], expected.values)
+
+    # The hour 0 has no time step (the first one ends at 01:00) and the next year is not in the cube
+    values = read_cube(ingest['store_path'], SCENARIO, end='2023-01-01 01:00')[0]
+    assert np.isnan(values[:, 0]).all() and not np.isnan(values[:, 1]).any()
+
+    with pytest.raises(ValueError):
+        read_cube(ingest['store_path'], SCENARIO, keys=[0, 3])
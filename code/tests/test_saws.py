@@ -0,0 +1,144 @@
+# Regression test of the vectorised SAWS weather parser (toolbox.utils.import_saws_data) on the sample files of
+# database/johannesburg/weather and database/giyani/weather, against the output of the original cell-by-cell parser,
+# and of the weather data of each station loaded and cleaned by toolbox.weather
+import os
+import sys
+import glob
+import json
+import hashlib
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from toolbox.utils import import_saws_data
+from toolbox.weather import load_saws_weather, clean_saws_weather
+
+DATABASE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'database')
+WEATHER_DIRECTORIES = ['johannesburg/weather', 'giyani/weather']
+# Digests of the output of the cell-by-cell parser on every sample file (written by running this file as a script)
+EXPECTED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'saws_expected.json')
+# Period kept by the processing script of each station (final_scripts/01 and 02), number of hours and sha256 of the exported csv file
+# (the same as database/cleaned/<station>_weather.csv, written by the original scripts)
+CLEANED_WEATHER = {
+    'johannesburg': ('2014-01-15 00:00:00', '2014-07-24 23:00:00', 4584, '7e321aac0e045921571aefc53b9d60eed81f0cb706b373f2fa292bb036444328'),
+    'giyani': ('2016-09-04 00:00:00', '2017-09-14 23:00:00', 8891, '871b5585ea430bf12029111b47b06a50ba1ec10e68d00cf47ccf35e934ce0c1f'),
+}
+
+
+# Definition of the original cell-by-cell parser
+'''
+Description: This function is the original parser of import_saws_data, kept as the reference of the vectorised parser:
+             each cell of the date x time table is converted and inserted in the time series one by one.
+Inputs:
+    - filename: path to the SAWS weather file
+Outputs:
+    - ts: pd.Series indexed by datetime
+'''
+def import_saws_data_cell_by_cell(filename):
+    df = pd.read_csv(filename, sep=',')
+    ts = pd.Series(dtype=object)
+    m, n = df.shape
+    for i in range(0, m):
+        for j in range(1, n):
+            try:
+                date = df.iloc[i, 0]
+                time = str.replace(df.columns[j], '.', ':')
+                # Convert date DD/MM/YYYY to datetime
+                date = pd.to_datetime(date, format='%d/%m/%Y')
+                if time == '00:00':
+                    # Add one day to date
+                    date = date + pd.DateOffset(days=1)
+                datetime = pd.to_datetime(str(date.date())+ ' ' + time)
+                ts[datetime] = df.iloc[i, j]
+            except:
+                pass
+    return ts
+
+# Definition of the function to get the digest of a parsed weather file
+'''
+Description: This function summarises a parsed weather file independently of the dtypes (the vectorised parser reads the integer cells as floats):
+             number of entries, first and last datetimes, number of non-numeric cells, sum of the numbers and sha256 of the (datetime, value) pairs
+             in the order of the series, the numbers written as floats and the other cells as read.
+Inputs:
+    - ts: pd.Series indexed by datetime
+Outputs:
+    - digest: dictionary
+'''
+def get_digest(ts):
+    numbers = pd.to_numeric(ts, errors='coerce').astype(float)
+    strings = numbers.isnull() & ts.notnull()
+    cells = [repr(number) if not is_string else str(value) for value, number, is_string in zip(ts.values, numbers.values, strings.values)]
+    pairs = '\n'.join(str(datetime) + ',' + cell for datetime, cell in zip(ts.index, cells))
+    return {
+        'entries': len(ts),
+        'first': str(ts.index[0]) if len(ts) else None,
+        'last': str(ts.index[-1]) if len(ts) else None,
+        'strings': int(strings.sum()),
+        'sum': round(float(numbers.sum()), 6),
+        'sha256': hashlib.sha256(pairs.encode()).hexdigest(),
+    }
+
+# Definition of the function to list the sample weather files
+'''
+Description: This function lists the sample SAWS weather files, relative to the database directory.
+Inputs:
+    - None
+Outputs:
+    - files: sorted list of paths
+'''
+def get_weather_files():
+    files = []
+    for directory in WEATHER_DIRECTORIES:
+        files += [os.path.relpath(path, DATABASE_DIRECTORY).replace(os.sep, '/') for path in glob.glob(os.path.join(DATABASE_DIRECTORY, directory, '*.csv'))]
+    return sorted(files)
+
+pytestmark = pytest.mark.skipif(not get_weather_files(), reason='the sample weather files are not in the database directory')
+
+def test_import_saws_data_matches_frozen_output():
+    with open(EXPECTED_PATH) as file:
+        expected = json.load(file)
+    files = get_weather_files()
+    assert files == sorted(expected.keys())
+    for file in files:
+        assert get_digest(import_saws_data(os.path.join(DATABASE_DIRECTORY, file))) == expected[file], file
+
+@pytest.mark.parametrize('file', ['johannesburg/weather/April_windspeed.csv', 'giyani/weather/Feb_17_rain.csv'])
+def test_import_saws_data_matches_cell_by_cell_parser(file):
+    path = os.path.join(DATABASE_DIRECTORY, file)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = import_saws_data_cell_by_cell(path)
+    ts = import_saws_data(path)
+    assert ts.index.equals(pd.DatetimeIndex(expected.index))
+    assert np.allclose(pd.to_numeric(ts, errors='coerce').astype(float).values, pd.to_numeric(expected, errors='coerce').astype(float).values, equal_nan=True)
+    assert (ts.isnull().values == expected.isnull().values).all()
+
+@pytest.mark.parametrize('station', sorted(CLEANED_WEATHER.keys()))
+def test_load_and_clean_saws_weather_of_station(station):
+    start, end, hours, sha256 = CLEANED_WEATHER[station]
+    weather = load_saws_weather(os.path.join(DATABASE_DIRECTORY, station, 'weather'), workers=1)
+    assert weather.index.is_monotonic_increasing and not weather.index.has_duplicates
+
+    # Export of the processing script of the station
+    weather = clean_saws_weather(weather, start, end)
+    weather['Datetime'] = pd.to_datetime(weather.index)
+    assert len(weather) == hours
+    assert not weather.isnull().any().any()
+    assert weather['Wind Direction'].dtype == np.int64
+    text = weather.to_csv()
+    assert hashlib.sha256(text.encode()).hexdigest() == sha256
+    cleaned_path = os.path.join(DATABASE_DIRECTORY, 'cleaned', station + '_weather.csv')
+    if os.path.exists(cleaned_path):
+        with open(cleaned_path) as file:
+            assert text == file.read()
+
+
+if __name__ == '__main__':
+    # Write the digests of the cell-by-cell parser on every sample file (slow: about a second per file)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = {file: get_digest(import_saws_data_cell_by_cell(os.path.join(DATABASE_DIRECTORY, file))) for file in get_weather_files()}
+    with open(EXPECTED_PATH, 'w') as file:
+        json.dump(expected, file, indent=1, sort_keys=True)
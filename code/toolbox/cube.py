@@ -0,0 +1,241 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from toolbox.results import load_metadata, load_ingest_index, read_results
+from toolbox.timekeys import get_hours_in_year, get_hour_of_year, get_datetime, lookup_hours
+
+# Files of the results cube in the directory of each scenario of the results store
+CUBE_FILE = 'cube.float32'
+CUBE_INDEX_FILE = 'cube.json'
+
+
+# Definition of the function to get the paths of the files of a results cube
+'''
+Description: This function returns the paths of the data file and of the index file of the results cube of a scenario.
+Inputs:
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+Outputs:
+    - cube_path: path to the memory-mapped float32 data file
+    - index_path: path to the JSON index file
+'''
+def get_cube_paths(store_path, scenario):
+    scenario_path = os.path.join(store_path, 'scenario=' + scenario)
+    return os.path.join(scenario_path, CUBE_FILE), os.path.join(scenario_path, CUBE_INDEX_FILE)
+
+# Definition of the function to load the index of a results cube
+'''
+Description: This function loads the index of the results cube of a scenario. None is returned if the scenario has no cube.
+Inputs:
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+Outputs:
+    - index: dictionary with the keys (buildings, first axis), the variables (last axis), the year and the shape of the cube
+'''
+def load_cube_index(store_path, scenario):
+    index_path = get_cube_paths(store_path, scenario)[1]
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path) as file:
+        return json.load(file)
+
+# Definition of the function to fill a results cube with results
+'''
+Description: This function copies results read from the results store into the cube, by array indexing on the positions of the keys and the hours.
+             The hours outside the year (e.g. the 00:00 time step of January 1st of the next year) are not kept.
+Inputs:
+    - cube: np.memmap of shape (buildings, hours, variables)
+    - keys: sorted np.array of the keys of the cube
+    - variables: list of the variables of the cube
+    - data: pd.DataFrame with the columns Hour, key and the variables (see toolbox.results.read_results)
+Outputs:
+    - None
+'''
+def fill_cube(cube, keys, variables, data):
+    hours = data['Hour'].values
+    valid = (hours >= 0) & (hours < cube.shape[1])
+    positions = np.searchsorted(keys, data['key'].values[valid])
+    cube[positions, hours[valid], :] = data[variables].values[valid]
+
+# Definition of the function to build the results cube of a scenario
+'''
+Description: This function builds the dense float32 cube (buildings x hours of the year x variables) of the results of a scenario, in a memory-mapped
+             file next to the results store, with a JSON index of its keys and variables. Missing values are NaN. The buildings are sorted by key.
+             If the cube already exists for the same buildings and variables, only the given keys are updated; otherwise the cube is rebuilt
+             month by month, so only one month of results is in memory at a time.
+Inputs:
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+    - keys: list of the keys of the buildings to update (default: None, rebuild the whole cube)
+Outputs:
+    - index: dictionary (see load_cube_index)
+'''
+def build_cube(store_path, scenario, keys=None):
+    metadata = load_metadata(store_path)
+    if scenario not in metadata['scenarios']:
+        raise ValueError("The scenario is not in the results store. Store = " + store_path + ". Scenario = " + scenario)
+    year = metadata['scenarios'][scenario]['year']
+    variables = [column for column in metadata['columns'] if column not in ['Hour', 'key']]
+    # Keys of the buildings of the store, typed as in the store (see toolbox.results.format_results)
+    store_keys = list(load_ingest_index(store_path, scenario).keys())
+    store_keys = sorted(int(key) for key in store_keys) if metadata['columns'].get('key') == 'int64' else sorted(store_keys)
+    shape = (len(store_keys), get_hours_in_year(year), len(variables))
+    cube_path, index_path = get_cube_paths(store_path, scenario)
+
+    index = load_cube_index(store_path, scenario)
+    if keys is not None and index is not None and index['keys'] == store_keys and index['variables'] == variables and index['year'] == year:
+        if len(keys) > 0:
+            cube = np.memmap(cube_path, dtype=np.float32, mode='r+', shape=shape)
+            data = read_results(store_path, scenario, columns=variables, keys=[int(key) for key in keys] if metadata['columns'].get('key') == 'int64' else keys)
+            cube[np.searchsorted(store_keys, data['key'].unique())] = np.nan
+            fill_cube(cube, np.array(store_keys), variables, data)
+            cube.flush()
+            del cube
+        return index
+
+    # Rebuild the cube in a temporary file, which then replaces the cube
+    cube = np.memmap(cube_path + '.tmp', dtype=np.float32, mode='w+', shape=shape)
+    cube[:] = np.nan
+    for month in sorted(metadata['scenarios'][scenario]['months'].keys()):
+        month_start = pd.Timestamp(month + '-01')
+        data = read_results(store_path, scenario, columns=variables, start=month_start, end=month_start + pd.offsets.MonthBegin(1) - pd.Timedelta(hours=1))
+        fill_cube(cube, np.array(store_keys), variables, data)
+    cube.flush()
+    del cube
+    os.replace(cube_path + '.tmp', cube_path)
+    index = {'keys': store_keys, 'variables': variables, 'year': year, 'shape': list(shape)}
+    with open(index_path + '.tmp', 'w') as file:
+        json.dump(index, file)
+    os.replace(index_path + '.tmp', index_path)
+    return index
+
+# Definition of the function to open the results cube of a scenario
+'''
+Description: This function opens the results cube of a scenario read-only, without reading it: the slices are read from the file when they are used.
+Inputs:
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+Outputs:
+    - cube: read-only np.memmap of shape (buildings, hours, variables)
+    - index: dictionary (see load_cube_index)
+'''
+def open_cube(store_path, scenario):
+    index = load_cube_index(store_path, scenario)
+    if index is None:
+        raise ValueError("The scenario has no results cube, see build_cube. Store = " + store_path + ". Scenario = " + scenario)
+    cube = np.memmap(get_cube_paths(store_path, scenario)[0], dtype=np.float32, mode='r', shape=tuple(index['shape']))
+    return cube, index
+
+# Definition of the function to convert positions to a selection of an axis
+'''
+Description: This function returns a slice for contiguous increasing positions, so that the selection is a view of the cube (no copy),
+             and the array of positions otherwise.
+Inputs:
+    - positions: np.array of positions
+Outputs:
+    - selection: slice or np.array
+'''
+def get_axis_selection(positions):
+    if len(positions) > 0 and np.array_equal(positions, np.arange(positions[0], positions[0] + len(positions))):
+        return slice(int(positions[0]), int(positions[0]) + len(positions))
+    return positions
+
+# Definition of the function to read a slice of the results cube of a scenario
+'''
+Description: This function returns a slice of the results cube of a scenario, e.g. the indoor temperature of some buildings in January.
+             The slice is a view of the memory-mapped file (no copy) when the keys and the variables are contiguous in the cube
+             (e.g. all the buildings, a single variable); it is copied otherwise.
+Inputs:
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+    - keys: list of the keys of the buildings (default: None, all the buildings)
+    - variables: list of the variables (default: None, all the variables)
+    - start: first datetime, included (default: None, from January 1st)
+    - end: last datetime, included (default: None, until the end of the year)
+Outputs:
+    - values: np.array of shape (buildings, hours, variables)
+    - keys: list of the keys of the buildings of the slice
+    - datetimes: pd.DatetimeIndex of the hours of the slice
+    - variables: list of the variables of the slice
+'''
+def read_cube(store_path, scenario, keys=None, variables=None, start=None, end=None):
+    cube, index = open_cube(store_path, scenario)
+    year = index['year']
+
+    # The keys of the cube are sorted (see build_cube): binary search of the positions of the keys
+    store_keys = np.array(index['keys'])
+    if keys is None:
+        key_positions = np.arange(len(store_keys))
+    else:
+        keys = np.asarray(keys)
+        key_positions = np.searchsorted(store_keys, keys)
+        found = key_positions < len(store_keys)
+        found[found] = store_keys[key_positions[found]] == keys[found]
+        if not found.all():
+            raise ValueError("Keys not in the results cube. Keys = " + str(list(keys[~found])))
+    if variables is None:
+        variables = index['variables']
+    missing_variables = [variable for variable in variables if variable not in index['variables']]
+    if missing_variables:
+        raise ValueError("Variables not in the results cube. Variables = " + str(missing_variables))
+    variable_positions = np.array([index['variables'].index(variable) for variable in variables], dtype=np.int64)
+
+    first_hour = 0 if start is None else max(int(get_hour_of_year([start], year)[0]) + int(get_datetime(get_hour_of_year([start], year), year)[0] < pd.Timestamp(start)), 0)
+    last_hour = cube.shape[1] - 1 if end is None else min(int(get_hour_of_year([end], year)[0]), cube.shape[1] - 1)
+    hours = slice(first_hour, max(last_hour + 1, first_hour))
+
+    # Index the axes one after the other, so that the slices stay views of the memory-mapped file
+    values = cube[get_axis_selection(key_positions)][:, hours][:, :, get_axis_selection(variable_positions)]
+    return values, [index['keys'][position] for position in key_positions], get_datetime(np.arange(hours.start, hours.stop), year), list(variables)
+
+# Definition of the function to read the weather data of a scenario for the hours of a slice
+'''
+Description: This function returns the weather data of a scenario for some hours, shared by all the buildings of the cube (broadcast it along
+             the first axis of a cube slice instead of duplicating it per building).
+Inputs:
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+    - columns: list of the weather columns
+    - datetimes: datetimes of the hours (see read_cube)
+Outputs:
+    - values: float32 np.array of shape (hours, columns)
+'''
+def read_cube_weather(store_path, scenario, columns, datetimes):
+    metadata = load_metadata(store_path)
+    scenario_metadata = metadata['scenarios'][scenario]
+    weather = pq.read_table(os.path.join(store_path, scenario_metadata['weather']['file']), columns=['Hour'] + list(columns)).to_pandas()
+    return lookup_hours(get_hour_of_year(datetimes, scenario_metadata['year']), weather['Hour'].values, weather[list(columns)].values)
+
+# Definition of the function to read features from the results cube of a scenario
+'''
+Description: This function returns features of all the buildings of a scenario as a dense array (buildings x hours x features), for clustering
+             and PCA: the results variables come from the cube and the weather columns are broadcast to all the buildings.
+             The periods are concatenated along the hours.
+Inputs:
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+    - features: list of results variables and weather columns, in the order of the last axis
+    - periods: list of periods [start, end] (default: None, the whole year)
+Outputs:
+    - values: float32 np.array of shape (buildings, hours, features)
+    - keys: list of the keys of the buildings
+'''
+def read_cube_features(store_path, scenario, features, periods=None):
+    index = load_cube_index(store_path, scenario)
+    if index is None:
+        raise ValueError("The scenario has no results cube, see build_cube. Store = " + store_path + ". Scenario = " + scenario)
+    variables = [feature for feature in features if feature in index['variables']]
+    weather_columns = [feature for feature in features if feature not in index['variables']]
+
+    period_values = []
+    for period in (periods if periods else [[None, None]]):
+        values, keys, datetimes, variables = read_cube(store_path, scenario, variables=variables, start=period[0], end=period[1])
+        features_values = np.empty(values.shape[:2] + (len(features),), dtype=np.float32)
+        features_values[:, :, [features.index(variable) for variable in variables]] = values
+        if weather_columns:
+            features_values[:, :, [features.index(column) for column in weather_columns]] = read_cube_weather(store_path, scenario, weather_columns, datetimes)[np.newaxis]
+        period_values.append(features_values)
+    return np.concatenate(period_values, axis=1), keys
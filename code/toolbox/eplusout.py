@@ -0,0 +1,189 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+
+from toolbox.timekeys import SIMULATION_YEAR, get_month_start_days
+
+# Type of the environment periods of the weather file run periods in eplusout.sql (1: design day, 2: design run period)
+WEATHER_RUN_PERIOD = 3
+
+
+# Definition of the function to convert EnergyPlus dates to minutes of the year
+'''
+Description: This function converts the month, day, hour and minute of the EnergyPlus time steps to integer minutes since January 1st 00:00.
+             EnergyPlus stamps each time step with its end, so the last one of a day (24:00) becomes 00:00 of the next day.
+Inputs:
+    - month, day, hour, minute: arrays of integers
+    - year: calendar year of the simulation (default: the simulation year, see toolbox.timekeys)
+Outputs:
+    - minutes: np.int32 array of minutes of the year
+'''
+def get_minute_of_year(month, day, hour, minute, year=SIMULATION_YEAR):
+    month = np.asarray(month, dtype=np.int32)
+    return ((get_month_start_days(year)[month] + np.asarray(day, dtype=np.int32) - 1) * 1440 + np.asarray(hour, dtype=np.int32) * 60 + np.asarray(minute, dtype=np.int32)).astype(np.int32)
+
+# Definition of the function to convert EnergyPlus Date/Time strings to minutes of the year
+'''
+Description: This function converts the Date/Time strings of eplusout.csv (e.g. ' 01/01  00:15:00') to minutes of the year, vectorised.
+Inputs:
+    - date_time: pd.Series or array of strings
+    - year: calendar year of the simulation (default: the simulation year)
+Outputs:
+    - minutes: np.int32 array of minutes of the year
+'''
+def parse_date_time(date_time, year=SIMULATION_YEAR):
+    parts = pd.Series(np.asarray(date_time), dtype=object).astype(str).str.extract(r'(\d+)/(\d+)\s+(\d+):(\d+)').astype(np.int32).values
+    return get_minute_of_year(parts[:, 0], parts[:, 1], parts[:, 2], parts[:, 3], year)
+
+# Definition of the function to find the columns of output variables in eplusout.csv
+'''
+Description: This function finds the columns of output variables in the header of eplusout.csv, whatever their units and reporting frequency.
+Inputs:
+    - columns: list of the columns of eplusout.csv
+    - variables: list of output variable names
+    - key_value: key of the variables (default: None, all keys)
+Outputs:
+    - selected_columns: list of columns, in the order of the variables
+'''
+def find_columns(columns, variables, key_value=None):
+    selected_columns = []
+    for variable in variables:
+        for column in columns:
+            if ':' not in column:
+                continue
+            key, name = column.split(':', 1)
+            if name.startswith(variable + ' [') and (key_value is None or key.upper() == key_value.upper()):
+                selected_columns.append(column)
+    if len(selected_columns) == 0:
+        raise ValueError("None of the variables is in the csv output. Variables = " + str(variables) + ". Key = " + str(key_value))
+    return selected_columns
+
+# Definition of the function to read output variables from the EnergyPlus csv output
+'''
+Description: This function reads output variables from the eplusout.csv file written by ReadVarsESO. Only the needed columns are read,
+             as float32. The timestamps are built from the row position: the first two rows give the start and the timestep, and the
+             last row is checked against them. Irregular files (e.g. several run periods) fall back to parsing every Date/Time string.
+Inputs:
+    - csv_path: path to the eplusout.csv file
+    - variables: list of output variable names (e.g. ['Zone Mean Air Temperature'])
+    - key_value: key of the variables (e.g. 'THERMAL ZONE', default: None, all keys)
+    - year: calendar year of the simulation (default: the simulation year)
+Outputs:
+    - data: pd.DataFrame with one float32 column per variable and key (in the order of the variables),
+            indexed by the minute of the year at the end of each time step (int32)
+'''
+def read_simulation_csv(csv_path, variables, key_value=None, year=SIMULATION_YEAR):
+    columns = find_columns(pd.read_csv(csv_path, nrows=0).columns, variables, key_value)
+    data = pd.read_csv(csv_path, usecols=['Date/Time'] + columns, dtype={column: np.float32 for column in columns})
+    date_time = data['Date/Time'].values
+
+    minutes = None
+    if len(date_time) >= 2:
+        first, second, last = parse_date_time(date_time[[0, 1, -1]], year)
+        timestep = second - first
+        if timestep > 0 and first + timestep * (len(date_time) - 1) == last:
+            minutes = first + timestep * np.arange(len(date_time), dtype=np.int32)
+    if minutes is None:
+        minutes = parse_date_time(date_time, year)
+
+    data = data[columns]
+    data.index = pd.Index(minutes.astype(np.int32), name='Minute')
+    return data
+
+# Definition of the function to read the output variables of a simulation
+'''
+Description: This function reads output variables from the output directory of a simulation: from eplusout.csv when it exists,
+             otherwise from eplusout.sql (simulations run with the SQLite output and without ReadVarsESO).
+Inputs:
+    - output_directory: path to the output directory of the simulation
+    - variables: list of output variable names
+    - key_value: key of the variables (default: None, all keys)
+    - year: calendar year of the simulation (default: the simulation year)
+Outputs:
+    - data: pd.DataFrame with one float32 column per variable and key, indexed by the minute of the year at the end of each time step
+'''
+def read_simulation_output(output_directory, variables, key_value=None, year=SIMULATION_YEAR):
+    csv_path = os.path.join(output_directory, 'eplusout.csv')
+    if os.path.exists(csv_path):
+        return read_simulation_csv(csv_path, variables, key_value, year)
+    return read_simulation_sql(os.path.join(output_directory, 'eplusout.sql'), variables, key_value, year)
+
+# Definition of the function to average output variables per hour
+'''
+Description: This function averages the time steps of each hour, vectorised. A time step belongs to the hour in which its end timestamp
+             falls (the time steps ending at 00:15, 00:30 and 00:45 make hour 0, the one ending at 01:00 starts hour 1),
+             as the hourly resampling of the timestamps did. Hours without any time step are NaN.
+Inputs:
+    - data: pd.DataFrame indexed by the minute of the year (see read_simulation_output)
+Outputs:
+    - hourly_data: pd.DataFrame of float32 hourly means indexed by the hour of the year (int32), from the first to the last hour of the data
+'''
+def get_hourly_means(data):
+    hours = np.asarray(data.index, dtype=np.int64) // 60
+    first_hour = hours.min()
+    positions = hours - first_hour
+    number_hours = positions.max() + 1
+
+    hourly_data = {}
+    for column in data.columns:
+        values = data[column].values.astype(np.float64)
+        valid = ~np.isnan(values)
+        sums = np.bincount(positions[valid], weights=values[valid], minlength=number_hours)
+        counts = np.bincount(positions[valid], minlength=number_hours)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            hourly_data[column] = (sums / counts).astype(np.float32)
+    return pd.DataFrame(hourly_data, index=pd.Index(np.arange(first_hour, first_hour + number_hours, dtype=np.int32), name='Hour'))
+
+# Definition of the function to read output variables from the EnergyPlus SQLite output
+'''
+Description: This function reads output variables from the eplusout.sql file written by EnergyPlus with Output:SQLite,
+             without the ReadVarsESO post-processing and without parsing any date string.
+             Only the time steps of the weather file run period are read (no design days, no warmup).
+Inputs:
+    - sql_path: path to the eplusout.sql file
+    - variables: list of output variable names (e.g. ['Zone Mean Air Temperature'])
+    - key_value: key of the variables (e.g. 'THERMAL ZONE', default: None, all keys)
+    - year: calendar year of the simulation (default: the simulation year)
+Outputs:
+    - data: pd.DataFrame with one float32 column per variable and key (in the order of the variables), named as in eplusout.csv
+            (e.g. 'THERMAL ZONE:Zone Mean Air Temperature [C](Hourly)'), indexed by the minute of the year at the end of each time step (int32)
+'''
+def read_simulation_sql(sql_path, variables, key_value=None, year=SIMULATION_YEAR):
+    connection = sqlite3.connect('file:' + sql_path + '?mode=ro', uri=True)
+    try:
+        query = 'SELECT ReportDataDictionaryIndex, KeyValue, Name, Units, ReportingFrequency FROM ReportDataDictionary WHERE Name IN ({})'.format(','.join('?' * len(variables)))
+        parameters = list(variables)
+        if key_value is not None:
+            query += ' AND UPPER(KeyValue) = ?'
+            parameters.append(key_value.upper())
+        dictionary = connection.execute(query, parameters).fetchall()
+        if len(dictionary) == 0:
+            raise ValueError("None of the variables is in the SQLite output. File = " + sql_path + ". Variables = " + str(variables))
+
+        columns = {}
+        for index, key, name, units, frequency in sorted(dictionary, key=lambda row: (list(variables).index(row[2]), row[1])):
+            # Same column names as eplusout.csv (the csv writes the keys in capitals and 'TimeStep' for the zone time step)
+            frequency = 'TimeStep' if frequency == 'Zone Timestep' else frequency
+            columns[index] = '{}:{} [{}]({})'.format(key.upper(), name, units, frequency)
+
+        query = ('SELECT ReportData.ReportDataDictionaryIndex, Time.Month, Time.Day, Time.Hour, Time.Minute, ReportData.Value '
+                 'FROM ReportData '
+                 'JOIN Time ON ReportData.TimeIndex = Time.TimeIndex '
+                 'JOIN EnvironmentPeriods ON Time.EnvironmentPeriodIndex = EnvironmentPeriods.EnvironmentPeriodIndex '
+                 'WHERE ReportData.ReportDataDictionaryIndex IN ({}) AND EnvironmentPeriods.EnvironmentType = ? AND (Time.WarmupFlag = 0 OR Time.WarmupFlag IS NULL) '
+                 'ORDER BY ReportData.ReportDataDictionaryIndex, Time.TimeIndex').format(','.join('?' * len(columns)))
+        rows = connection.execute(query, list(columns.keys()) + [WEATHER_RUN_PERIOD]).fetchall()
+    finally:
+        connection.close()
+
+    rows = np.array(rows, dtype=np.float64).reshape(-1, 6)
+    minutes = get_minute_of_year(rows[:, 1], rows[:, 2], rows[:, 3], rows[:, 4], year)
+    data = {}
+    for index, column in columns.items():
+        selection = rows[:, 0] == index
+        data[column] = pd.Series(rows[selection, 5].astype(np.float32), index=minutes[selection])
+    data = pd.DataFrame(data)
+    data.index = data.index.astype(np.int32)
+    data.index.name = 'Minute'
+    return data
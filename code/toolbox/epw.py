@@ -1,23 +1,123 @@
-from epw import epw
-from pyosmodel.utils import convert_hour_to_datetime
+import os
+import csv
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from common import SIMULATION_YEAR, hash_file
+from toolbox.timekeys import get_datetime
+
+# Columns of the data of an epw file, as named by the epw package (https://github.com/building-energy/epw)
+EPW_COLUMNS = ['Year', 'Month', 'Day', 'Hour', 'Minute', 'Data Source and Uncertainty Flags', 'Dry Bulb Temperature', 'Dew Point Temperature',
+               'Relative Humidity', 'Atmospheric Station Pressure', 'Extraterrestrial Horizontal Radiation', 'Extraterrestrial Direct Normal Radiation',
+               'Horizontal Infrared Radiation Intensity', 'Global Horizontal Radiation', 'Direct Normal Radiation', 'Diffuse Horizontal Radiation',
+               'Global Horizontal Illuminance', 'Direct Normal Illuminance', 'Diffuse Horizontal Illuminance', 'Zenith Luminance', 'Wind Direction',
+               'Wind Speed', 'Total Sky Cover', 'Opaque Sky Cover (used if Horizontal IR Intensity missing)', 'Visibility', 'Ceiling Height',
+               'Present Weather Observation', 'Present Weather Codes', 'Precipitable Water', 'Aerosol Optical Depth', 'Snow Depth',
+               'Days Since Last Snowfall', 'Albedo', 'Liquid Precipitation Depth', 'Liquid Precipitation Quantity']
+
+# Directory of the parsed epw files, created next to the epw files
+EPW_CACHE_DIRECTORY = '.epw_cache'
+# Version of the parsing, in the name of the cached files: the files cached by a previous version of parse_epw are parsed again
+EPW_CACHE_VERSION = 2
+
+
+# Definition of the function to read the headers of an epw file
+'''
+Description: This function reads the header lines of an epw file (LOCATION, DESIGN CONDITIONS, ..., DATA PERIODS), until the first data line.
+Inputs:
+    - path: path to the epw file
+Outputs:
+    - headers: dictionary {header name: list of the fields of the header}, the last one kept for a repeated header name
+    - number_lines: number of header lines, counted as read (repeated header names and blank lines included)
+'''
+def read_epw_headers(path):
+    headers = {}
+    number_lines = 0
+    with open(path, newline='') as file:
+        reader = csv.reader(file, delimiter=',', quotechar='"')
+        for row in reader:
+            if row and row[0].isdigit():
+                break
+            number_lines = reader.line_num
+            if row:
+                headers[row[0]] = row[1:]
+    return headers, number_lines
+
+# Definition of the function to parse an epw file
+'''
+Description: This function parses an epw file: the header lines, then all the data lines at once (one vectorised csv parse).
+Inputs:
+    - path: path to the epw file
+Outputs:
+    - data: pd.DataFrame with the columns of EPW_COLUMNS, one row per data line
+    - headers: dictionary (see read_epw_headers)
+'''
+def parse_epw(path):
+    headers, number_lines = read_epw_headers(path)
+    data = pd.read_csv(path, skiprows=number_lines, header=None, names=EPW_COLUMNS)
+    return data, headers
+
+# Definition of the function to read an epw file
+'''
+Description: This function reads an epw file. The parsed data and headers are cached in a parquet file and a json file named after the
+             sha256 hash of the content of the epw file (and the version of the parsing), so the next reads of the same file (from any script) only read the selected columns
+             of the parquet file. A modified epw file gets a new hash and is parsed again.
+             The data is indexed by datetime from its row position: row i is hour i of January 1st of the year.
+Inputs:
+    - path: path to the epw file
+    - columns: list of the columns to read (default: None, all the columns of EPW_COLUMNS)
+    - year: calendar year of the index (default: the simulation year)
+    - cache: if True, use the cache of parsed epw files (default: True)
+    - cache_dir: directory of the cache (default: None, directory .epw_cache next to the epw file)
+Outputs:
+    - data: pd.DataFrame with the selected columns, indexed by datetime
+    - headers: dictionary (see read_epw_headers)
+'''
+def read_epw(path, columns=None, year=SIMULATION_YEAR, cache=True, cache_dir=None):
+    if columns is None:
+        columns = EPW_COLUMNS
+    missing_columns = [column for column in columns if column not in EPW_COLUMNS]
+    if missing_columns:
+        raise ValueError("Columns not in the epw files. Columns = " + str(missing_columns))
+
+    if not cache:
+        data, headers = parse_epw(path)
+        data = data[columns]
+    else:
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), EPW_CACHE_DIRECTORY)
+        cache_path = os.path.join(cache_dir, hash_file(path) + '-v' + str(EPW_CACHE_VERSION))
+        if os.path.exists(cache_path + '.parquet') and os.path.exists(cache_path + '.json'):
+            data = pq.read_table(cache_path + '.parquet', columns=list(columns)).to_pandas()
+            with open(cache_path + '.json') as file:
+                headers = json.load(file)
+        else:
+            data, headers = parse_epw(path)
+            # Written to temporary files first, so an interrupted write never leaves a truncated cache behind
+            os.makedirs(cache_dir, exist_ok=True)
+            pq.write_table(pa.Table.from_pandas(data, preserve_index=False), cache_path + '.parquet.tmp')
+            with open(cache_path + '.json.tmp', 'w') as file:
+                json.dump(headers, file)
+            os.replace(cache_path + '.parquet.tmp', cache_path + '.parquet')
+            os.replace(cache_path + '.json.tmp', cache_path + '.json')
+            data = data[columns]
+
+    data.index = get_datetime(np.arange(len(data)), year).rename('datetime')
+    return data, headers
 
 
 # Define a function to import weather from epw file
 '''
 Description: This function imports weather from epw file
-Input: path of epw file
+Input: path of epw file, calendar year of the weather data (default: the simulation year)
 Output: weather data
 '''
-def import_epw(path):
-    a = epw()
-    a.read(path)
-    weather = a.dataframe
-    weather = weather[['Dry Bulb Temperature', 'Relative Humidity', 'Atmospheric Station Pressure', 'Wind Direction', 'Wind Speed', 'Precipitable Water']]
+def import_epw(path, year=SIMULATION_YEAR):
+    weather, headers = read_epw(path, ['Dry Bulb Temperature', 'Relative Humidity', 'Atmospheric Station Pressure', 'Wind Direction', 'Wind Speed', 'Precipitable Water'], year)
     # Rename columns
     weather.columns = ['Outdoor Dry Bulb Temperature', 'Outdoor Relative Humidity', 'Atmospheric Station Pressure', 'Wind Direction', 'Wind Speed', 'Precipitable Water']
-    weather['datetime'] = weather.index
-    for i in range(len(weather['datetime'])):
-      weather['datetime'][i] = convert_hour_to_datetime(int(weather['datetime'][i]), 2023)
-    weather = weather.set_index('datetime')
 
-    return weather
\ No newline at end of file
+    return weather
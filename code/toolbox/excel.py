@@ -0,0 +1,262 @@
+import os
+import json
+import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+
+from common import hash_file
+
+# Directory of the converted workbooks, created next to the workbooks
+EXCEL_CACHE_DIRECTORY = '.excel_cache'
+# Index of a converted workbook: sheet names and files of the sheets, in the order of the workbook
+EXCEL_CACHE_INDEX_FILE = 'sheets.json'
+# Version of the format of the converted sheets, in the name of the cache directory of a workbook
+EXCEL_CACHE_VERSION = 2
+# Kinds of the cells of the object columns of a sheet (see split_object_columns)
+CELL_KINDS = {'null': 0, 'bool': 1, 'integer': 2, 'float': 3, 'text': 4, 'datetime': 5, 'time': 6}
+
+
+# Definition of the function to get the cache directory of a workbook
+'''
+Description: This function returns the directory of the converted sheets of a workbook, named after the sha256 hash of the content of the
+             workbook and the version of the cache format: a modified workbook gets a new directory and is converted again.
+Inputs:
+    - path: path to the workbook
+    - cache_dir: directory of the cache (default: None, directory .excel_cache next to the workbook)
+Outputs:
+    - workbook_cache_path: path to the directory of the converted sheets
+'''
+def get_workbook_cache_path(path, cache_dir=None):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), EXCEL_CACHE_DIRECTORY)
+    return os.path.join(cache_dir, hash_file(path) + '-v' + str(EXCEL_CACHE_VERSION))
+
+# Definition of the function to get the kind of the cells of a column
+'''
+Description: This function returns the kind of each cell of an object column (see CELL_KINDS). The values of other types are stored as text.
+Inputs:
+    - values: np.array of objects
+Outputs:
+    - kinds: np.array of int8, one kind per cell
+'''
+def get_cell_kinds(values):
+    kinds = np.full(len(values), CELL_KINDS['text'], dtype=np.int8)
+    for i, value in enumerate(values):
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            kinds[i] = CELL_KINDS['null']
+        elif isinstance(value, (bool, np.bool_)):
+            kinds[i] = CELL_KINDS['bool']
+        elif isinstance(value, (int, np.integer)):
+            kinds[i] = CELL_KINDS['integer']
+        elif isinstance(value, (float, np.floating)):
+            kinds[i] = CELL_KINDS['float']
+        elif isinstance(value, datetime.datetime):
+            kinds[i] = CELL_KINDS['datetime']
+        elif isinstance(value, datetime.time):
+            kinds[i] = CELL_KINDS['time']
+    return kinds
+
+# Definition of the function to split the object columns of a sheet into typed columns
+'''
+Description: This function splits the object columns of a sheet (e.g. numbers and '-' or '> 85.0  ' strings in the same column), which
+             parquet cannot store, into typed columns: the column itself is replaced by the kind of its cells (see CELL_KINDS) and the values
+             of each kind are stored in a separate column of the values table, named after the position of the column and the kind.
+Inputs:
+    - data: pd.DataFrame of the sheet
+Outputs:
+    - data: pd.DataFrame with the kinds in place of the object columns
+    - values: pd.DataFrame of the typed values (one row per row of the sheet)
+    - mixed_columns: list of the positions of the object columns
+'''
+def split_object_columns(data):
+    data = data.copy()
+    values = {}
+    mixed_columns = [i for i in range(data.shape[1]) if data.iloc[:, i].dtype == object]
+    for i in mixed_columns:
+        column = data.iloc[:, i].values
+        kinds = get_cell_kinds(column)
+        for kind, code in CELL_KINDS.items():
+            cells = kinds == code
+            if kind == 'null' or not cells.any():
+                continue
+            if kind == 'bool':
+                typed_values = np.zeros(len(column), dtype=bool)
+            elif kind in ['integer', 'time']:
+                typed_values = np.zeros(len(column), dtype=np.int64)
+            elif kind == 'float':
+                typed_values = np.full(len(column), np.nan)
+            elif kind == 'datetime':
+                typed_values = np.full(len(column), np.datetime64('NaT'), dtype='datetime64[ns]')
+            else:
+                typed_values = np.full(len(column), None, dtype=object)
+            for j in np.flatnonzero(cells):
+                value = column[j]
+                if kind == 'time':
+                    # Microseconds since midnight
+                    value = ((value.hour * 60 + value.minute) * 60 + value.second) * 1000000 + value.microsecond
+                elif kind == 'datetime':
+                    value = np.datetime64(pd.Timestamp(value).to_datetime64(), 'ns')
+                elif kind == 'text':
+                    value = str(value)
+                typed_values[j] = value
+            values['{}-{}'.format(i, kind)] = typed_values
+        data.isetitem(i, kinds)
+    return data, pd.DataFrame(values, index=range(len(data))), mixed_columns
+
+# Definition of the function to join the typed columns of a sheet into object columns
+'''
+Description: This function rebuilds the object columns split by split_object_columns, with the python types of pd.read_excel
+             (int, float, str, bool, datetime.datetime, datetime.time and NaN for the empty cells).
+Inputs:
+    - data: pd.DataFrame with the kinds in place of the object columns
+    - values: dictionary {name of the column of the values table: np.array of the typed values}
+    - mixed_columns: list of the positions of the object columns
+Outputs:
+    - data: pd.DataFrame of the sheet (data is modified in place)
+'''
+def join_object_columns(data, values, mixed_columns):
+    for i in mixed_columns:
+        kinds = data.iloc[:, i].to_numpy()
+        column = np.full(len(kinds), np.nan, dtype=object)
+        for kind, code in CELL_KINDS.items():
+            name = '{}-{}'.format(i, kind)
+            if name not in values:
+                continue
+            cells = np.flatnonzero(kinds == code)
+            typed_values = values[name][cells]
+            if kind == 'time':
+                column[cells] = [datetime.time(int(value // 3600000000), int(value // 60000000 % 60), int(value // 1000000 % 60), int(value % 1000000)) for value in typed_values]
+            elif kind == 'datetime':
+                column[cells] = list(pd.DatetimeIndex(typed_values).to_pydatetime())
+            else:
+                column[cells] = typed_values.tolist()
+        data.isetitem(i, column)
+    return data
+
+# Definition of the function to convert a sheet of a workbook
+'''
+Description: This function reads one sheet of a workbook and writes it in the cache directory of the workbook, as a parquet file.
+             The object columns that parquet cannot store as read (e.g. a column mixing numbers and strings, such as '> 85.0  ' in a column
+             of readings) are split into typed columns stored in a second parquet file (see split_object_columns), so the cached sheet is
+             always the same as the sheet read by pd.read_excel, whatever the version of pandas reading the cache.
+Inputs:
+    - path: path to the workbook
+    - sheet_name: name of the sheet
+    - sheet_path: path of the files of the sheet, without extension
+Outputs:
+    - sheet_file: dictionary {'file': name of the parquet file, 'values_file': name of the parquet file of the typed values (None if the
+                  sheet has no object column), 'mixed_columns': positions of the object columns}
+'''
+def convert_sheet(path, sheet_name, sheet_path):
+    data = pd.read_excel(path, sheet_name=sheet_name)
+    sheet_file = {'file': os.path.basename(sheet_path) + '.parquet', 'values_file': None, 'mixed_columns': []}
+    try:
+        table = pa.Table.from_pandas(data)
+        # The sheet is written as is if it is read back unchanged (e.g. dtypes, column names)
+        if not table.to_pandas().equals(data):
+            table = None
+    except (pa.ArrowException, ValueError, TypeError):
+        table = None
+
+    if table is None:
+        kinds, values, mixed_columns = split_object_columns(data)
+        table = pa.Table.from_pandas(kinds)
+        sheet_file['values_file'] = os.path.basename(sheet_path) + '-values.parquet'
+        sheet_file['mixed_columns'] = mixed_columns
+        pq.write_table(pa.Table.from_pandas(values, preserve_index=False), sheet_path + '-values.parquet.tmp')
+        if not join_object_columns(table.to_pandas(), {name: values[name].values for name in values.columns}, mixed_columns).equals(data):
+            raise ValueError("The sheet cannot be stored as parquet. Workbook = " + path + ". Sheet = " + str(sheet_name))
+        os.replace(sheet_path + '-values.parquet.tmp', sheet_path + '-values.parquet')
+    pq.write_table(table, sheet_path + '.parquet.tmp')
+    os.replace(sheet_path + '.parquet.tmp', sheet_path + '.parquet')
+    return sheet_file
+
+# Definition of the function to convert a workbook
+'''
+Description: This function converts all the sheets of a workbook to the cache (see convert_sheet), the sheets in parallel.
+             The index of the sheets is written last, so an interrupted conversion is done again at the next read.
+Inputs:
+    - path: path to the workbook
+    - workbook_cache_path: path to the cache directory of the workbook (see get_workbook_cache_path)
+    - workers: number of processes (default: None, all the cores)
+Outputs:
+    - index: dictionary {'sheets': list of the sheet names, 'files': list of the files of the sheets (see convert_sheet)}
+'''
+def convert_workbook(path, workbook_cache_path, workers=None):
+    sheet_names = pd.ExcelFile(path).sheet_names
+    os.makedirs(workbook_cache_path, exist_ok=True)
+    sheet_paths = [os.path.join(workbook_cache_path, 'sheet-{:03d}'.format(i)) for i in range(len(sheet_names))]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        sheet_files = list(executor.map(convert_sheet, [path] * len(sheet_names), sheet_names, sheet_paths))
+
+    index = {'sheets': sheet_names, 'files': sheet_files}
+    index_path = os.path.join(workbook_cache_path, EXCEL_CACHE_INDEX_FILE)
+    with open(index_path + '.tmp', 'w') as file:
+        json.dump(index, file)
+    os.replace(index_path + '.tmp', index_path)
+    return index
+
+# Definition of the function to load the index of a converted workbook
+'''
+Description: This function loads the index of the converted sheets of a workbook, and converts the workbook if it is not in the cache.
+Inputs:
+    - path: path to the workbook
+    - workers: number of processes of the conversion (default: None, all the cores)
+    - cache_dir: directory of the cache (default: None, directory .excel_cache next to the workbook)
+Outputs:
+    - index: dictionary (see convert_workbook)
+    - workbook_cache_path: path to the cache directory of the workbook
+'''
+def load_workbook_index(path, workers=None, cache_dir=None):
+    workbook_cache_path = get_workbook_cache_path(path, cache_dir)
+    index_path = os.path.join(workbook_cache_path, EXCEL_CACHE_INDEX_FILE)
+    if not os.path.exists(index_path):
+        print('Converting {} to the cache...'.format(os.path.basename(path)))
+        return convert_workbook(path, workbook_cache_path, workers), workbook_cache_path
+    with open(index_path) as file:
+        return json.load(file), workbook_cache_path
+
+# Definition of the function to get the sheet names of a workbook
+'''
+Description: This function returns the sheet names of a workbook from the cache (same as pd.ExcelFile(path).sheet_names).
+Inputs:
+    - path: path to the workbook
+    - workers: number of processes of the conversion (default: None, all the cores)
+    - cache_dir: directory of the cache (default: None, directory .excel_cache next to the workbook)
+Outputs:
+    - sheet_names: list of the sheet names, in the order of the workbook
+'''
+def get_sheet_names(path, workers=None, cache_dir=None):
+    return load_workbook_index(path, workers, cache_dir)[0]['sheets']
+
+# Definition of the function to read a workbook
+'''
+Description: This function reads sheets of a workbook, like pd.read_excel, from the cache of the workbook: the workbook is only parsed
+             (sheets in parallel) the first time it is read, and the next reads of the same content (from any script) read the converted sheets.
+Inputs:
+    - path: path to the workbook
+    - sheet_name: name of a sheet, list of names, or None for all the sheets (default: None)
+    - workers: number of processes of the conversion (default: None, all the cores)
+    - cache_dir: directory of the cache (default: None, directory .excel_cache next to the workbook)
+Outputs:
+    - data: pd.DataFrame of the sheet, or dictionary {sheet name: pd.DataFrame} for a list of names or None, in the order of the workbook
+'''
+def read_workbook(path, sheet_name=None, workers=None, cache_dir=None):
+    index, workbook_cache_path = load_workbook_index(path, workers, cache_dir)
+    sheet_names = index['sheets'] if sheet_name is None else [sheet_name] if isinstance(sheet_name, str) else list(sheet_name)
+    missing_sheets = [name for name in sheet_names if name not in index['sheets']]
+    if missing_sheets:
+        raise ValueError("Sheets not in the workbook. Workbook = " + path + ". Sheets = " + str(missing_sheets))
+
+    data = {}
+    for name in sheet_names:
+        sheet_file = index['files'][index['sheets'].index(name)]
+        data[name] = pq.read_table(os.path.join(workbook_cache_path, sheet_file['file'])).to_pandas()
+        if sheet_file['values_file'] is not None:
+            table = pq.read_table(os.path.join(workbook_cache_path, sheet_file['values_file']))
+            values = {name: table.column(name).to_numpy() for name in table.column_names}
+            data[name] = join_object_columns(data[name], values, sheet_file['mixed_columns'])
+    return data[sheet_name] if isinstance(sheet_name, str) else data
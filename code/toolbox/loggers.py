@@ -0,0 +1,248 @@
+import os
+import re
+import json
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+# Schemas of the files of the measurement loggers (indoor air temperature and relative humidity), detected from the first line of each file:
+#   - header: names of the columns the header must contain, or None for the files without header
+#   - pattern: regular expression matching the first line of the files without header
+#   - datetime: columns of the datetime (e.g. date and time), parsed with the formats of format (one per column)
+#   - temperature, humidity: columns of the readings
+#   - encoding: encoding of the files
+# The separator (comma or tab) is detected from the first line. Other loggers are supported by adding their schema with register_logger_schema.
+LOGGER_SCHEMAS = [
+    # EasyLog USB loggers, Giyani summer campaign (e.g. 1010060321_Started_9-6-2016,_Finished_3-23-2017.csv)
+    {'name': 'easylog', 'header': ['Date', 'Time', 'Readings (°C)', 'Readings (%RH)'], 'pattern': None, 'datetime': ['Date', 'Time'],
+     'format': ['%m/%d/%Y', '%I:%M:%S %p'], 'temperature': 'Readings (°C)', 'humidity': 'Readings (%RH)', 'encoding': 'latin1'},
+    # Same export re-saved in UTF-8 with the ° replaced by the replacement character
+    {'name': 'easylog-utf8', 'header': ['Date', 'Time', 'Readings (\ufffdC)', 'Readings (%RH)'], 'pattern': None, 'datetime': ['Date', 'Time'],
+     'format': ['%m/%d/%Y', '%I:%M:%S %p'], 'temperature': 'Readings (\ufffdC)', 'humidity': 'Readings (%RH)', 'encoding': 'utf-8'},
+    {'name': 'easylog-short', 'header': ['Date', 'Time', 'Temp', 'RH'], 'pattern': None, 'datetime': ['Date', 'Time'],
+     'format': ['%m/%d/%Y', '%I:%M:%S %p'], 'temperature': 'Temp', 'humidity': 'RH', 'encoding': 'latin1'},
+    # iButton loggers, Giyani winter campaign (e.g. 0000000050847241.csv): datetime, temperature, °C, humidity, %RH
+    {'name': 'ibutton', 'header': None, 'pattern': r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}[,\t]', 'datetime': [0],
+     'format': ['%Y-%m-%d %H:%M:%S'], 'temperature': 1, 'humidity': 3, 'encoding': 'utf-8-sig'},
+]
+# Index of the logger files of a directory (size, modification time and schema of each file), next to the files
+LOGGER_INDEX_FILE = '.logger_index.json'
+
+
+# Definition of the function to register a logger schema
+'''
+Description: This function adds the schema of a new type of logger files (see LOGGER_SCHEMAS), or replaces the schema of the same name.
+             The schemas are tried in order, so a schema registered later only applies to the files not matched by the previous schemas.
+Inputs:
+    - schema: dictionary with the keys name, header, pattern, datetime, format, temperature, humidity and encoding
+Outputs:
+    - None
+'''
+def register_logger_schema(schema):
+    missing_keys = [key for key in ['name', 'header', 'pattern', 'datetime', 'format', 'temperature', 'humidity', 'encoding'] if key not in schema]
+    if missing_keys:
+        raise ValueError("Keys missing in the logger schema. Keys = " + str(missing_keys))
+    for i, registered_schema in enumerate(LOGGER_SCHEMAS):
+        if registered_schema['name'] == schema['name']:
+            LOGGER_SCHEMAS[i] = schema
+            return
+    LOGGER_SCHEMAS.append(schema)
+
+# Definition of the function to get a logger schema by name
+'''
+Description: This function returns the registered logger schema of a name.
+Inputs:
+    - name: name of the schema
+Outputs:
+    - schema: dictionary (see LOGGER_SCHEMAS)
+'''
+def get_logger_schema(name):
+    for schema in LOGGER_SCHEMAS:
+        if schema['name'] == name:
+            return schema
+    raise ValueError("Logger schema not registered. Schema = " + str(name))
+
+# Definition of the function to detect the schema of a logger file
+'''
+Description: This function detects the schema of a logger file from its first line: the first schema whose header columns are all in
+             the first line (files with header) or whose pattern matches the first line (files without header).
+Inputs:
+    - file_path: path to the logger file
+Outputs:
+    - schema: name of the schema, None if no schema matches
+    - separator: separator of the columns of the file
+'''
+def detect_logger_schema(file_path):
+    with open(file_path, 'rb') as file:
+        first_line = file.readline()
+    first_line = first_line.lstrip(b'\xef\xbb\xbf').rstrip(b'\r\n')
+    separator = '\t' if b'\t' in first_line else ','
+    for schema in LOGGER_SCHEMAS:
+        line = first_line.decode(schema['encoding'].replace('-sig', ''), errors='replace')
+        if schema['header'] is not None:
+            fields = [field.strip('"') for field in line.split(separator)]
+            if all(column in fields for column in schema['header']):
+                return schema['name'], separator
+        elif re.match(schema['pattern'], line):
+            return schema['name'], separator
+    return None, separator
+
+# Definition of the function to get the key of a logger file
+'''
+Description: This function returns the key of a logger from the name of its file: the name without extension, up to the first '_' or space
+             (e.g. 1010060321 for 1010060321_Started_9-6-2016,_Finished_3-23-2017.csv).
+Inputs:
+    - filename: name of the file
+Outputs:
+    - key: key of the logger
+'''
+def get_logger_key(filename):
+    return re.split(r'[_ ]', os.path.splitext(filename)[0])[0]
+
+# Definition of the function to index the logger files of a directory
+'''
+Description: This function returns the index of the logger files of a directory: size, modification time and schema of each file.
+             The index is cached in the directory (LOGGER_INDEX_FILE), so only the new or changed files are detected again
+             (all the files are detected again if the registered schemas or min_size changed). The files smaller than min_size
+             (empty exports) are indexed without schema.
+Inputs:
+    - directory_path: path to the directory of the logger files
+    - min_size: minimum size of the files in bytes (default: 5000)
+Outputs:
+    - index: dictionary {file: {'size', 'mtime', 'schema', 'separator'}}, sorted by file
+'''
+def index_logger_directory(directory_path, min_size=5000):
+    index_path = os.path.join(directory_path, LOGGER_INDEX_FILE)
+    settings = {'schemas': [schema['name'] for schema in LOGGER_SCHEMAS], 'min_size': min_size}
+    cached_index = {}
+    if os.path.exists(index_path):
+        with open(index_path) as file:
+            cached_index = json.load(file)
+    cached_files = cached_index['files'] if cached_index.get('settings') == settings else {}
+
+    files = {}
+    for file in sorted(os.listdir(directory_path)):
+        if file == LOGGER_INDEX_FILE or not os.path.isfile(os.path.join(directory_path, file)):
+            continue
+        stat = os.stat(os.path.join(directory_path, file))
+        entry = cached_files.get(file)
+        if entry is None or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime_ns:
+            schema, separator = detect_logger_schema(os.path.join(directory_path, file)) if stat.st_size >= min_size else (None, None)
+            entry = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'schema': schema, 'separator': separator}
+        files[file] = entry
+
+    index = {'settings': settings, 'files': files}
+    if index != cached_index:
+        with open(index_path + '.tmp', 'w') as file:
+            json.dump(index, file, indent=1)
+        os.replace(index_path + '.tmp', index_path)
+    return files
+
+# Definition of the function to convert readings to numbers
+'''
+Description: This function converts readings to floats, vectorised: the values which are not numbers (sentinels such as '> 85.0 ', blanks) are NaN.
+Inputs:
+    - values: pd.Series of readings
+Outputs:
+    - numbers: pd.Series of floats
+    - sentinels: list of the values which are not numbers
+'''
+def coerce_readings(values):
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float), []
+    numbers = pd.to_numeric(values, errors='coerce').astype(float)
+    sentinels = values[numbers.isnull() & values.notnull()].astype(str).unique().tolist()
+    return numbers, sentinels
+
+# Definition of the function to parse the datetimes of a logger file
+'''
+Description: This function parses the datetime columns of a logger file, vectorised: each column is parsed on its distinct values only
+             (a date repeats for all the readings of the day, a time for all the days), and the times of day are added to the dates.
+             The values which do not match the format are NaT.
+Inputs:
+    - columns: list of pd.Series of strings (e.g. dates and times)
+    - formats: list of the formats of the columns
+Outputs:
+    - datetimes: np.array of datetime64
+'''
+def parse_logger_datetimes(columns, formats):
+    datetimes = None
+    for column, format in zip(columns, formats):
+        codes, values = pd.factorize(column.str.strip())
+        parsed = pd.to_datetime(pd.Series(values, dtype=object), format=format, errors='coerce').values[codes]
+        parsed[codes < 0] = np.datetime64('NaT')
+        if datetimes is None:
+            datetimes = parsed
+        else:
+            datetimes = datetimes + (parsed - parsed.astype('datetime64[D]'))
+    return datetimes
+
+# Definition of the function to read a logger file
+'''
+Description: This function reads a logger file with its schema: one vectorised parse of the readings and of the datetimes.
+             The readings which are not numbers and the relative humidities outside [0, 100] are removed.
+Inputs:
+    - file_path: path to the logger file
+    - schema: schema of the file (see LOGGER_SCHEMAS)
+    - separator: separator of the columns of the file
+Outputs:
+    - data: pd.DataFrame with the columns Datetime, Indoor Mean Air Temperature, Indoor Air Relative Humidity and key
+    - sentinels: list of the readings which are not numbers
+'''
+def read_logger_file(file_path, schema, separator=','):
+    columns = list(schema['datetime']) + [schema['temperature'], schema['humidity']]
+    data = pd.read_csv(file_path, sep=separator, header=0 if schema['header'] is not None else None, usecols=columns,
+                       dtype={column: str for column in schema['datetime']}, encoding=schema['encoding'], skipinitialspace=True)
+
+    temperature, temperature_sentinels = coerce_readings(data[schema['temperature']])
+    humidity, humidity_sentinels = coerce_readings(data[schema['humidity']])
+    data = pd.DataFrame({'Datetime': parse_logger_datetimes([data[column] for column in schema['datetime']], schema['format']),
+                         'Indoor Mean Air Temperature': temperature.values,
+                         'Indoor Air Relative Humidity': humidity.values})
+    data = data.loc[(data['Indoor Air Relative Humidity'] >= 0) & (data['Indoor Air Relative Humidity'] <= 100)].dropna()
+    data['key'] = get_logger_key(os.path.basename(file_path))
+    return data, sorted(set(temperature_sentinels + humidity_sentinels))
+
+# Definition of the function to load the logger files of directories
+'''
+Description: This function loads all the logger files of directories (e.g. the files of a measurement campaign): the files are indexed
+             (see index_logger_directory), the files of a known schema are parsed in parallel and concatenated once. The files without
+             schema and the small files are reported and skipped. The readings which are not numbers are reported and removed.
+Inputs:
+    - directory_paths: path to a directory or list of paths to directories of logger files
+    - min_size: minimum size of the files in bytes (default: 5000)
+    - workers: number of processes (default: None, all the cores)
+Outputs:
+    - data: pd.DataFrame with the columns Datetime, Indoor Mean Air Temperature, Indoor Air Relative Humidity and key,
+            sorted by key and datetime, without duplicated key and datetime
+'''
+def load_loggers(directory_paths, min_size=5000, workers=None):
+    if isinstance(directory_paths, str):
+        directory_paths = [directory_paths]
+    start = time.time()
+
+    files = []
+    for directory_path in directory_paths:
+        index = index_logger_directory(directory_path, min_size)
+        small_files = [file for file in index if index[file]['size'] < min_size]
+        unknown_files = [file for file in index if index[file]['size'] >= min_size and index[file]['schema'] is None]
+        if small_files:
+            print('{} - {} files smaller than {} bytes skipped'.format(directory_path, len(small_files), min_size))
+        for file in unknown_files:
+            print('{} - {} has no known schema, skipped'.format(directory_path, file))
+        files += [(os.path.join(directory_path, file), index[file]) for file in index if index[file]['schema'] is not None]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(read_logger_file, [file_path for file_path, entry in files],
+                                    [get_logger_schema(entry['schema']) for file_path, entry in files],
+                                    [entry['separator'] for file_path, entry in files]))
+
+    sentinels = sorted(set(sentinel for data, file_sentinels in results for sentinel in file_sentinels))
+    if sentinels:
+        print('Non-numeric values removed: {}'.format(sentinels))
+    data = pd.concat([data for data, file_sentinels in results], ignore_index=True) if results else \
+        pd.DataFrame(columns=['Datetime', 'Indoor Mean Air Temperature', 'Indoor Air Relative Humidity', 'key'])
+    data = data.sort_values(['key', 'Datetime'], kind='stable').drop_duplicates(subset=['key', 'Datetime']).reset_index(drop=True)
+    print('{} files, {} loggers loaded in {} seconds'.format(len(files), data['key'].nunique(), round(time.time() - start, 2)))
+    return data
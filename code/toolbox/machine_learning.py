@@ -5,6 +5,8 @@ import json
 from sklearn.preprocessing import LabelEncoder
 from pythermalcomfort.models import at, heat_index
 from sklearn.preprocessing import StandardScaler
+from toolbox.results import read_results, get_results_year
+from toolbox.timekeys import get_hours_in_year, get_hour_of_day
 
 #%% Define functions
 # Function to get the features sets
@@ -38,32 +40,27 @@ Inputs: scenario (str): Scenario to choose the data
 Outputs: data (DataFrame): DataFrame with the data
 '''
 def get_data(scenario, features, target, scaler=False, periods=[]):
-    data_path = '../results/simulations/' + scenario + '_simulation_data.csv'
-    simulation_data = pd.read_csv(data_path)
+    # Read the simulation results from the results store (see toolbox.results), only the months of the periods of interest if any
+    # The periods are stored under the form of a list of two datetime objects [start, end]
+    store_path = '../results/simulations/store'
+    if periods != []:
+        simulation_data = pd.concat([read_results(store_path, scenario, start=period[0], end=period[1]) for period in periods])
+    else:
+        simulation_data = read_results(store_path, scenario)
     input_path = '../results/simulations/' + scenario + '_inputs.csv'
     input_data = pd.read_csv(input_path)
 
     # Merge data and inputs given key and index
     data = pd.merge(simulation_data, input_data, on=['key', 'key'])
     
-    # Filter data on Datetime and keep year 2023
-    data['Datetime'] = pd.to_datetime(data['Datetime'])
-    data = data[data['Datetime'].dt.year == 2023]
-    # Filter data on Datetime and keep the periods of interest stored in period under the form of a list of two datetime objects [start, end]
-    if periods != []:
-        filtered_data = pd.DataFrame()
-        for period in periods: # Assuming periods is your list of periods
-            start_date = pd.to_datetime(period[0])
-            end_date = pd.to_datetime(period[1])
-            period_data = data[(data['Datetime'] >= start_date) & (data['Datetime'] <= end_date)]
-            filtered_data = pd.concat([filtered_data, period_data])
-        data = filtered_data
+    # Keep the hours of the simulation year (the 00:00 time step of January 1st of the next year is dropped)
+    data = data[data['Hour'] < get_hours_in_year(get_results_year(store_path, scenario))]
     
     data['apparent_temperature'] = data.apply(lambda row: at(tdb=row['Indoor Mean Air Temperature'], rh=row['Indoor Air Relative Humidity'], v=0, q=0), axis=1)
     
     data['history_temperature'] = data.groupby('key')['Outdoor Dry Bulb Temperature'].rolling(6).mean().reset_index(0, drop=True)
     
-    data['day_period'] = data['Datetime'].dt.hour.apply(lambda x: 'morning' if x >= 6 and x < 12 else ('afternoon' if x >= 12 and x < 18 else ('evening' if x >= 18 and x < 22 else 'night')))
+    data['day_period'] = pd.Series(get_hour_of_day(data['Hour']), index=data.index).apply(lambda x: 'morning' if x >= 6 and x < 12 else ('afternoon' if x >= 12 and x < 18 else ('evening' if x >= 18 and x < 22 else 'night')))
     
     data['heat_stress_category'] = data['apparent_temperature'].apply(lambda x: 4 if x >= 54 else (3 if x >= 40 and x < 54 else (2 if x >= 32 and x < 40 else ( 1 if x >= 27 and x < 32 else 0))))
 
@@ -0,0 +1,274 @@
+import numpy as np
+import pandas as pd
+
+# Variables measured by the loggers
+MEASUREMENT_VARIABLES = ['Indoor Mean Air Temperature', 'Indoor Air Relative Humidity']
+
+# Variables of the weather data joined to the measurements (see join_weather)
+WEATHER_VARIABLES = ['Outdoor Dry Bulb Temperature', 'Outdoor Relative Humidity', 'Atmospheric Station Pressure', 'Wind Speed', 'Wind Direction', 'Precipitable Water']
+
+# Plausible range of the readings of each variable, the readings outside the range are missing values (see analyse_coverage)
+MEASUREMENT_BOUNDS = {'Indoor Mean Air Temperature': [-10, 70], 'Indoor Air Relative Humidity': [0, 100]}
+
+# Processing parameters of the measurement campaigns (site and season):
+#   - freq: time step of the resampled measurements (a divisor of one day, e.g. '1H', '2H')
+#   - start, end: period of the campaign, None for the common period of all the loggers (see get_common_period)
+#   - coverage: minimum number of time steps with readings of a logger in the period, as a fraction of the most complete logger
+#   - max_gap: maximum duration without readings of a logger (e.g. '2D'), None for no limit
+#   - max_implausible: maximum fraction of the readings of a logger outside MEASUREMENT_BOUNDS
+MEASUREMENT_CAMPAIGNS = {
+    'johannesburg': {'freq': '1H', 'start': None, 'end': None, 'coverage': 0.95, 'max_gap': None, 'max_implausible': 0.05},
+    'giyani-summer': {'freq': '1H', 'start': None, 'end': None, 'coverage': 0.95, 'max_gap': None, 'max_implausible': 0.05},
+    # Manual period for the winter, because 3 loggers are not in the common period
+    'giyani-winter': {'freq': '2H', 'start': '2017-07-03 00:00:00', 'end': '2017-09-12 12:00:00', 'coverage': 0.95, 'max_gap': None, 'max_implausible': 0.05},
+}
+
+
+# Definition of the function to get the common period of the loggers
+'''
+Description: This function returns the common period of measurements of all the loggers: from the latest first reading to the earliest last reading.
+Inputs:
+    - data: pd.DataFrame of the readings, with the columns Datetime and key
+Outputs:
+    - start: first datetime of the common period
+    - end: last datetime of the common period
+'''
+def get_common_period(data):
+    period = data.groupby('key')['Datetime'].agg(['min', 'max'])
+    return period['min'].max(), period['max'].min()
+
+# Definition of the function to resample the readings of all the loggers
+'''
+Description: This function resamples the readings of all the loggers at once to a regular time step (mean of the readings of each time step),
+             in a dense array of the loggers x time steps x variables, by array indexing instead of one resample per logger.
+             The time steps start at midnight, like the resample of each logger (freq must divide one day).
+Inputs:
+    - data: pd.DataFrame of the readings, with the columns Datetime, key and the variables
+    - freq: time step (e.g. '1H')
+    - variables: list of the variables (default: MEASUREMENT_VARIABLES)
+Outputs:
+    - values: np.array of shape (loggers, time steps, variables), NaN for the time steps without readings of a logger
+    - keys: list of the keys of the loggers (first axis), sorted
+    - datetimes: pd.DatetimeIndex of the time steps (second axis)
+'''
+def resample_loggers(data, freq, variables=MEASUREMENT_VARIABLES):
+    step = pd.Timedelta(freq).to_timedelta64()
+    datetimes = data['Datetime'].values
+    origin = datetimes.min().astype('datetime64[D]')
+    steps = ((datetimes - origin) // step).astype(np.int64)
+    key_positions, keys = pd.factorize(data['key'], sort=True)
+    number_keys, number_steps = len(keys), int(steps.max()) + 1
+
+    cells = key_positions * number_steps + steps
+    values = np.full((number_keys * number_steps, len(variables)), np.nan)
+    for i, variable in enumerate(variables):
+        readings = data[variable].values.astype(float)
+        valid = ~np.isnan(readings)
+        sums = np.bincount(cells[valid], weights=readings[valid], minlength=number_keys * number_steps)
+        counts = np.bincount(cells[valid], minlength=number_keys * number_steps)
+        values[counts > 0, i] = sums[counts > 0] / counts[counts > 0]
+    return values.reshape(number_keys, number_steps, len(variables)), list(keys), pd.DatetimeIndex(origin + np.arange(number_steps) * step, name='Datetime')
+
+# Definition of the function to analyse the coverage of the loggers
+'''
+Description: This function analyses the coverage of all the loggers at once, in one pass over the loggers x time steps array:
+                - implausible readings: time steps with a value outside MEASUREMENT_BOUNDS, which are set to missing values
+                - time steps with readings, as a fraction of the time steps of the period (coverage) and of the most complete logger
+                  (relative coverage)
+                - longest gap: longest duration without readings, including the start and the end of the period
+             The loggers with a relative coverage lower than coverage, a longest gap longer than max_gap or a fraction of implausible
+             readings higher than max_implausible are ejected.
+Inputs:
+    - values: np.array of shape (loggers, time steps, variables), see resample_loggers
+    - keys: list of the keys of the loggers
+    - datetimes: pd.DatetimeIndex of the time steps
+    - variables: list of the variables (last axis)
+    - start: first datetime of the period (default: None, from the first time step)
+    - end: last datetime of the period (default: None, until the last time step)
+    - coverage: minimum fraction of the time steps of the most complete logger (default: 0.95)
+    - max_gap: maximum duration without readings (e.g. '2D', default: None, no limit)
+    - max_implausible: maximum fraction of implausible readings (default: 0.05)
+Outputs:
+    - values: np.array of the same shape, with the implausible readings set to NaN
+    - report: pd.DataFrame indexed by key, with the columns Time steps, Coverage, Relative coverage, Longest gap, Implausible readings,
+              Ejected and Reason
+'''
+def analyse_coverage(values, keys, datetimes, variables=MEASUREMENT_VARIABLES, start=None, end=None, coverage=0.95, max_gap=None, max_implausible=0.05):
+    values = values.copy()
+    readings = ~np.isnan(values).all(axis=2)
+    implausible = np.zeros(readings.shape, dtype=bool)
+    for i, variable in enumerate(variables):
+        if variable in MEASUREMENT_BOUNDS:
+            with np.errstate(invalid='ignore'):
+                implausible |= (values[:, :, i] < MEASUREMENT_BOUNDS[variable][0]) | (values[:, :, i] > MEASUREMENT_BOUNDS[variable][1])
+    values[implausible] = np.nan
+    valid = ~np.isnan(values).any(axis=2)
+
+    # Time steps of the period only
+    step = datetimes[1] - datetimes[0] if len(datetimes) > 1 else pd.Timedelta(0)
+    in_period = np.ones(len(datetimes), dtype=bool)
+    if start is not None:
+        in_period &= datetimes + step > pd.Timestamp(start)
+    if end is not None:
+        in_period &= datetimes <= pd.Timestamp(end)
+    valid, readings, implausible = valid[:, in_period], readings[:, in_period], implausible[:, in_period]
+
+    # Longest run of time steps without readings: distance to the previous time step with readings
+    positions = np.arange(valid.shape[1])
+    previous_positions = np.maximum.accumulate(np.where(valid, positions, -1), axis=1)
+    gaps = np.where(valid, 0, positions - previous_positions).max(axis=1) if valid.shape[1] else np.zeros(len(keys), dtype=int)
+
+    time_steps = valid.sum(axis=1)
+    report = pd.DataFrame({'Time steps': time_steps,
+                           'Coverage': time_steps / max(valid.shape[1], 1),
+                           'Relative coverage': time_steps / max(time_steps.max(), 1) if len(keys) else time_steps,
+                           'Longest gap': gaps * step,
+                           'Implausible readings': implausible.sum(axis=1) / np.maximum(readings.sum(axis=1), 1)},
+                          index=pd.Index(keys, name='key'))
+    reasons = [report['Relative coverage'] < coverage, report['Implausible readings'] > max_implausible]
+    names = ['coverage', 'implausible readings']
+    if max_gap is not None:
+        reasons.append(report['Longest gap'] > pd.Timedelta(max_gap))
+        names.append('longest gap')
+    report['Reason'] = [', '.join(name for name, failed in zip(names, failures) if failed) for failures in zip(*reasons)]
+    report['Ejected'] = report['Reason'] != ''
+    return values, report
+
+# Definition of the function to interpolate the missing values of all the loggers
+'''
+Description: This function fills the missing values of a loggers x time steps x variables array by linear interpolation in time
+             (same as interpolate(method='time', limit_direction='both') for each logger and variable): all the loggers and variables
+             at once, from the previous and next valid time steps. The values before the first and after the last valid time step take
+             the first and last valid value.
+Inputs:
+    - values: np.array of shape (loggers, time steps, variables)
+    - datetimes: pd.DatetimeIndex of the time steps
+Outputs:
+    - values: np.array of the same shape, without NaN (except for the loggers without any value of a variable)
+'''
+def interpolate_loggers(values, datetimes):
+    # Series of each logger and variable along the last axis
+    series = np.moveaxis(values, 1, -1)
+    number_steps = series.shape[-1]
+    times = (datetimes.values - datetimes.values[0]).astype('timedelta64[s]').astype(float) if number_steps else np.zeros(0)
+    positions = np.arange(number_steps)
+    valid = ~np.isnan(series)
+
+    previous_positions = np.maximum.accumulate(np.where(valid, positions, -1), axis=-1)
+    next_positions = np.flip(np.minimum.accumulate(np.flip(np.where(valid, positions, number_steps), axis=-1), axis=-1), axis=-1)
+    previous_values = np.take_along_axis(series, np.clip(previous_positions, 0, number_steps - 1), axis=-1)
+    next_values = np.take_along_axis(series, np.clip(next_positions, 0, number_steps - 1), axis=-1)
+    previous_times = times[np.clip(previous_positions, 0, number_steps - 1)]
+    next_times = times[np.clip(next_positions, 0, number_steps - 1)]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weights = np.where(next_times > previous_times, (times - previous_times) / (next_times - previous_times), 0)
+    interpolated = previous_values + weights * (next_values - previous_values)
+    interpolated = np.where(previous_positions < 0, next_values, interpolated)
+    interpolated = np.where(next_positions >= number_steps, previous_values, interpolated)
+    interpolated = np.where(valid, series, interpolated)
+    return np.moveaxis(interpolated, -1, 1)
+
+# Definition of the function to process the measurements of a campaign
+'''
+Description: This function processes the readings of all the loggers of a measurement campaign at once:
+                - period: the readings outside the period (default: the common period of the loggers) are removed
+                - resampling: the readings are averaged per time step (see resample_loggers)
+                - coverage: the implausible readings are removed and the loggers with too few readings, too long gaps or too many
+                  implausible readings are ejected (see analyse_coverage)
+                - interpolation: the missing time steps are interpolated (see interpolate_loggers)
+Inputs:
+    - data: pd.DataFrame of the readings, with the columns Datetime, key and the variables (e.g. see toolbox.loggers.load_loggers)
+    - freq: time step (default: '1H')
+    - start: first datetime of the period (default: None, see get_common_period)
+    - end: last datetime of the period (default: None, see get_common_period)
+    - coverage: minimum fraction of the time steps with readings of the most complete logger (default: 0.95)
+    - max_gap: maximum duration without readings (e.g. '2D', default: None, no limit)
+    - max_implausible: maximum fraction of implausible readings (default: 0.05)
+    - variables: list of the variables (default: MEASUREMENT_VARIABLES)
+Outputs:
+    - measurements: pd.DataFrame with the columns Datetime, key and the variables, one row per logger and time step, sorted by key and datetime
+    - report: pd.DataFrame of the coverage of the loggers (see analyse_coverage)
+'''
+def process_measurements(data, freq='1H', start=None, end=None, coverage=0.95, max_gap=None, max_implausible=0.05, variables=MEASUREMENT_VARIABLES):
+    common_start, common_end = get_common_period(data)
+    start = common_start if start is None else pd.Timestamp(start)
+    end = common_end if end is None else pd.Timestamp(end)
+    print('Period of measurements : {} - {}'.format(start, end))
+    data = data[(data['Datetime'] >= start) & (data['Datetime'] <= end)]
+
+    values, keys, datetimes = resample_loggers(data, freq, variables)
+    values, report = analyse_coverage(values, keys, datetimes, variables, start, end, coverage, max_gap, max_implausible)
+    selected = ~report['Ejected'].values
+    keys = [key for key, kept in zip(keys, selected) if kept]
+    print('Number of keys: {}'.format(len(keys)))
+    print('Keys to eject: {}'.format(report.index[report['Ejected']].tolist()))
+
+    # Keep the time steps with readings of at least one logger, then interpolate the missing time steps of each logger
+    values = values[selected]
+    used_steps = ~np.all(np.isnan(values), axis=(0, 2))
+    values, datetimes = values[:, used_steps], datetimes[used_steps]
+    values = interpolate_loggers(values, datetimes)
+
+    measurements = pd.DataFrame(values.reshape(-1, len(variables)), columns=variables)
+    measurements.insert(0, 'Datetime', np.tile(datetimes.values, len(keys)))
+    measurements['key'] = np.repeat(keys, len(datetimes))
+    return measurements, report
+
+# Definition of the function to process the measurements of a registered campaign
+'''
+Description: This function processes the readings of a measurement campaign with its parameters (see MEASUREMENT_CAMPAIGNS).
+Inputs:
+    - data: pd.DataFrame of the readings, with the columns Datetime, key and the variables
+    - campaign: name of the campaign
+Outputs:
+    - measurements: pd.DataFrame (see process_measurements)
+    - report: pd.DataFrame (see process_measurements)
+'''
+def process_campaign(data, campaign):
+    if campaign not in MEASUREMENT_CAMPAIGNS:
+        raise ValueError("Measurement campaign not defined. Campaign = " + str(campaign))
+    return process_measurements(data, **MEASUREMENT_CAMPAIGNS[campaign])
+
+# Definition of the function to join the nearest weather data to the measurements
+'''
+Description: This function joins the weather data of the station nearest in time to the measurements of all the loggers at once (same as
+             pd.merge_asof(direction='nearest') for each logger, the previous weather data when both are as near): the weather data is
+             sorted once, the datetimes are converted to integer seconds and the distinct datetimes of the measurements are looked up
+             with np.searchsorted. The measurements without weather data within the tolerance get NaN instead of the weather data of a
+             distant time.
+Inputs:
+    - measurements: pd.DataFrame with the column Datetime (e.g. see process_measurements)
+    - weather: pd.DataFrame of the weather data, with the column Datetime or indexed by datetime
+    - columns: list of the weather columns to join (default: WEATHER_VARIABLES)
+    - tolerance: maximum time between the measurements and the weather data (e.g. '1H', default: None, no limit)
+Outputs:
+    - measurements: pd.DataFrame with the weather columns added
+'''
+def join_weather(measurements, weather, columns=WEATHER_VARIABLES, tolerance=None):
+    weather_datetimes = pd.to_datetime(weather['Datetime'] if 'Datetime' in weather.columns else weather.index.to_series()).values
+    weather = weather[~np.isnat(weather_datetimes)]
+    weather_datetimes = weather_datetimes[~np.isnat(weather_datetimes)]
+    order = np.argsort(weather_datetimes, kind='stable')
+    weather_seconds = weather_datetimes[order].astype('datetime64[s]').astype(np.int64)
+
+    # Nearest weather data of each distinct datetime of the measurements
+    codes, datetimes = pd.factorize(measurements['Datetime'])
+    seconds = np.asarray(datetimes.values, dtype='datetime64[ns]').astype('datetime64[s]').astype(np.int64)
+    previous_positions = np.searchsorted(weather_seconds, seconds, side='right') - 1
+    next_positions = np.searchsorted(weather_seconds, seconds, side='left')
+    previous_distances = np.where(previous_positions >= 0, seconds - weather_seconds[np.clip(previous_positions, 0, None)], np.iinfo(np.int64).max)
+    next_distances = np.where(next_positions < len(weather_seconds), weather_seconds[np.clip(next_positions, None, len(weather_seconds) - 1)] - seconds, np.iinfo(np.int64).max)
+    positions = np.where(previous_distances <= next_distances, previous_positions, next_positions)
+    distances = np.minimum(previous_distances, next_distances)
+    matched = distances <= (pd.Timedelta(tolerance).total_seconds() if tolerance is not None else np.iinfo(np.int64).max - 1)
+
+    rows = order[np.clip(positions, 0, max(len(order) - 1, 0))][codes] if len(order) else np.zeros(len(codes), dtype=np.int64)
+    matched = matched[codes]
+    measurements = measurements.copy()
+    for column in columns:
+        values = weather[column].values[rows] if len(order) else np.full(len(codes), np.nan)
+        if not matched.all():
+            values = np.where(matched, values, np.nan)
+        measurements[column] = values
+    return measurements
@@ -0,0 +1,343 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from toolbox.timekeys import SIMULATION_YEAR, get_hour_of_year, get_datetime, get_month, lookup_hours
+
+# Version of the layout of the results store, written in its metadata file
+# (version 2: the rows are keyed by the hour of the year instead of a datetime, see toolbox.timekeys)
+RESULTS_STORE_VERSION = 2
+
+# Name of the metadata file at the root of the results store
+METADATA_FILE = 'metadata.json'
+
+# Name of the ingest index file in the directory of each scenario (see toolbox.utils.import_simulation_data)
+INGEST_INDEX_FILE = 'ingest_index.json'
+
+
+# Definition of the function to load the metadata of a results store
+'''
+Description: This function loads the metadata of a results store: its columns and their types, and the parquet files of each scenario and month.
+             An empty metadata is returned if the store does not exist yet.
+Inputs:
+    - store_path: path to the directory of the results store
+Outputs:
+    - metadata: dictionary with the keys version, columns and scenarios
+                ({scenario: {'year': ..., 'next_part': ..., 'months': {month: {'files': [...], 'rows': ...}}, 'weather': {...}}})
+'''
+def load_metadata(store_path):
+    metadata_path = os.path.join(store_path, METADATA_FILE)
+    if not os.path.exists(metadata_path):
+        return {'version': RESULTS_STORE_VERSION, 'columns': {}, 'scenarios': {}}
+    with open(metadata_path) as file:
+        metadata = json.load(file)
+    if metadata['version'] != RESULTS_STORE_VERSION:
+        raise ValueError("Unsupported results store version, the simulation results must be ingested again. Store = " + store_path + ". Version = " + str(metadata['version']))
+    return metadata
+
+# Definition of the function to save the metadata of a results store
+'''
+Description: This function saves the metadata of a results store atomically (temporary file replacing the metadata file),
+             so an interrupted ingest never leaves a truncated metadata file behind.
+Inputs:
+    - metadata: dictionary (see load_metadata)
+    - store_path: path to the directory of the results store
+Outputs:
+    - None
+'''
+def save_metadata(metadata, store_path):
+    metadata_path = os.path.join(store_path, METADATA_FILE)
+    with open(metadata_path + '.tmp', 'w') as file:
+        json.dump(metadata, file, indent=4)
+    os.replace(metadata_path + '.tmp', metadata_path)
+
+# Definition of the function to remove a scenario from a results store
+'''
+Description: This function removes the files and the metadata of a scenario from a results store, before the scenario is ingested again.
+Inputs:
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+Outputs:
+    - None
+'''
+def clear_results(store_path, scenario):
+    metadata = load_metadata(store_path)
+    if scenario in metadata['scenarios']:
+        del metadata['scenarios'][scenario]
+        save_metadata(metadata, store_path)
+    scenario_path = os.path.join(store_path, 'scenario=' + scenario)
+    if os.path.exists(scenario_path):
+        shutil.rmtree(scenario_path)
+
+# Definition of the function to load the ingest index of a scenario
+'''
+Description: This function loads the ingest index of a scenario of a results store: for each output folder ingested, the size and modification time
+             of the results file read and the part of the store holding its results. An empty index is returned if the scenario has no index.
+Inputs:
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+Outputs:
+    - index: dictionary {folder: {'size': ..., 'mtime': ..., 'part': ...}}
+'''
+def load_ingest_index(store_path, scenario):
+    index_path = os.path.join(store_path, 'scenario=' + scenario, INGEST_INDEX_FILE)
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path) as file:
+        return json.load(file)
+
+# Definition of the function to save the ingest index of a scenario
+'''
+Description: This function saves the ingest index of a scenario atomically (see load_ingest_index).
+Inputs:
+    - index: dictionary (see load_ingest_index)
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+Outputs:
+    - None
+'''
+def save_ingest_index(index, store_path, scenario):
+    index_path = os.path.join(store_path, 'scenario=' + scenario, INGEST_INDEX_FILE)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    with open(index_path + '.tmp', 'w') as file:
+        json.dump(index, file)
+    os.replace(index_path + '.tmp', index_path)
+
+# Definition of the function to convert the results to the types of the store
+'''
+Description: This function converts a dataframe of results to the types of the store: Hour as int32 (hour of the year, the datetimes are not stored),
+             key as int64 when all the keys are integers (as the keys of the inputs) or as strings otherwise, and the other numerical columns as float32.
+Inputs:
+    - data: pd.DataFrame with an Hour column and a key column or level, as returned by toolbox.utils.import_simulation_data
+Outputs:
+    - data: pd.DataFrame with the columns Hour, key and the results, and a default index
+'''
+def format_results(data):
+    if 'key' in data.columns:
+        data = data.reset_index(drop=True)
+    else:
+        data = data.droplevel('Datetime').rename_axis('key').reset_index()
+    data = data.drop(columns=[column for column in ['Datetime'] if column in data.columns])
+    data['Hour'] = data['Hour'].astype(np.int32)
+    keys = data['key'].astype(str)
+    data['key'] = keys.astype(np.int64) if keys.str.fullmatch(r'-?\d+').all() else keys
+    for column in data.columns:
+        if column not in ['Hour', 'key'] and pd.api.types.is_float_dtype(data[column]):
+            data[column] = data[column].astype(np.float32)
+    return data[['Hour', 'key'] + [column for column in data.columns if column not in ['Hour', 'key']]]
+
+# Definition of the function to get the metadata of a scenario
+'''
+Description: This function returns the metadata of a scenario of a results store, created for the calendar year if the scenario is new.
+Inputs:
+    - metadata: dictionary (see load_metadata)
+    - scenario: name of the scenario
+    - year: calendar year of the simulations of the scenario
+Outputs:
+    - scenario_metadata: dictionary
+'''
+def get_scenario_metadata(metadata, scenario, year):
+    scenario_metadata = metadata['scenarios'].setdefault(scenario, {'year': year, 'next_part': 0, 'months': {}})
+    if scenario_metadata['year'] != year:
+        raise ValueError("The year of the results does not match the year of the scenario in the store. Scenario = " + scenario + ". Year = " + str(year) + ". Year of the store = " + str(scenario_metadata['year']))
+    return scenario_metadata
+
+# Definition of the function to get the calendar year of a scenario
+'''
+Description: This function returns the calendar year of the simulations of a scenario of a results store, from which its hours of the year count.
+Inputs:
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+Outputs:
+    - year: calendar year
+'''
+def get_results_year(store_path, scenario):
+    metadata = load_metadata(store_path)
+    if scenario not in metadata['scenarios']:
+        raise ValueError("The scenario is not in the results store. Store = " + store_path + ". Scenario = " + scenario + ". Scenarios = " + str(list(metadata['scenarios'].keys())))
+    return metadata['scenarios'][scenario]['year']
+
+# Definition of the function to write results to a results store
+'''
+Description: This function appends results to a results store. The store is partitioned by scenario and month: each call writes a new part,
+             made of one parquet file per month of the data in <store_path>/scenario=<scenario>/month=<YYYY-MM>/part-<part>.parquet,
+             and records it in the metadata file. The columns and their types must be the same for all the calls.
+Inputs:
+    - data: pd.DataFrame of results (see format_results)
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+    - year: calendar year of the simulations, from which the hours of the year count (default: the simulation year)
+Outputs:
+    - part: number of the part written
+'''
+def write_results(data, store_path, scenario, year=SIMULATION_YEAR):
+    data = format_results(data)
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    columns = {field.name: str(field.type) for field in table.schema}
+
+    metadata = load_metadata(store_path)
+    if metadata['columns'] and metadata['columns'] != columns:
+        raise ValueError("The columns of the results do not match the columns of the store. Store = " + store_path + ". Columns = " + str(columns))
+    metadata['columns'] = columns
+    scenario_metadata = get_scenario_metadata(metadata, scenario, year)
+    part = scenario_metadata['next_part']
+    scenario_metadata['next_part'] += 1
+
+    # Month of each row (the months after the end of the year, e.g. the 00:00 time step of January 1st, belong to the next year)
+    month_numbers = get_month(data['Hour'].values, year) - 1
+    months = np.array(['{:04d}-{:02d}'.format(year + month_number // 12, month_number % 12 + 1) for month_number in range(month_numbers.min(), month_numbers.max() + 1)])[month_numbers - month_numbers.min()]
+    for month in np.unique(months):
+        partition = scenario_metadata['months'].setdefault(month, {'files': [], 'rows': 0})
+        selection = np.flatnonzero(months == month)
+        file_path = 'scenario=' + scenario + '/month=' + month + '/part-{:05d}.parquet'.format(part)
+        os.makedirs(os.path.join(store_path, os.path.dirname(file_path)), exist_ok=True)
+        pq.write_table(table.take(pa.array(selection)), os.path.join(store_path, file_path), compression='snappy')
+        partition['files'].append(file_path)
+        partition['rows'] += len(selection)
+    save_metadata(metadata, store_path)
+    return part
+
+# Definition of the function to remove buildings from a results store
+'''
+Description: This function removes the results of some buildings from a scenario of a results store. Only the files of the given parts are opened:
+             the files holding some of the buildings are rewritten without them, or deleted if nothing is left.
+Inputs:
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+    - keys: list of the keys of the buildings to remove
+    - parts: list of the parts holding the buildings (default: None, all the parts, see load_ingest_index)
+Outputs:
+    - None
+'''
+def remove_results(store_path, scenario, keys, parts=None):
+    metadata = load_metadata(store_path)
+    if scenario not in metadata['scenarios'] or len(keys) == 0:
+        return
+    # The keys are stored as integers when all of them are integers (see format_results)
+    keys = [int(key) for key in keys] if metadata['columns'].get('key') == 'int64' else [str(key) for key in keys]
+    part_names = None if parts is None else ['part-{:05d}.parquet'.format(part) for part in parts]
+
+    for month, partition in metadata['scenarios'][scenario]['months'].items():
+        for file_path in list(partition['files']):
+            if part_names is not None and file_path.split('/')[-1] not in part_names:
+                continue
+            table = pq.read_table(os.path.join(store_path, file_path))
+            kept = np.flatnonzero(~np.isin(table.column('key').to_numpy(), keys))
+            if len(kept) == table.num_rows:
+                continue
+            if len(kept) == 0:
+                os.remove(os.path.join(store_path, file_path))
+                partition['files'].remove(file_path)
+            else:
+                pq.write_table(table.take(pa.array(kept)), os.path.join(store_path, file_path) + '.tmp', compression='snappy')
+                os.replace(os.path.join(store_path, file_path) + '.tmp', os.path.join(store_path, file_path))
+            partition['rows'] -= table.num_rows - len(kept)
+    save_metadata(metadata, store_path)
+
+# Definition of the function to write the weather data of a scenario to a results store
+'''
+Description: This function writes the weather data of a scenario once, in <store_path>/scenario=<scenario>/weather.parquet, keyed by the hour
+             of the year, instead of duplicating it in the rows of every building. It is joined to the results by read_results.
+Inputs:
+    - weather: pd.DataFrame of hourly weather data indexed by datetime (see toolbox.epw.import_epw)
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+    - year: calendar year of the simulations, from which the hours of the year count (default: the simulation year)
+Outputs:
+    - None
+'''
+def write_weather(weather, store_path, scenario, year=SIMULATION_YEAR):
+    weather = weather.astype(np.float32)
+    weather.insert(0, 'Hour', get_hour_of_year(weather.index, year))
+    table = pa.Table.from_pandas(weather, preserve_index=False)
+
+    file_path = 'scenario=' + scenario + '/weather.parquet'
+    os.makedirs(os.path.join(store_path, os.path.dirname(file_path)), exist_ok=True)
+    pq.write_table(table, os.path.join(store_path, file_path), compression='snappy')
+    metadata = load_metadata(store_path)
+    scenario_metadata = get_scenario_metadata(metadata, scenario, year)
+    scenario_metadata['weather'] = {'file': file_path, 'columns': {field.name: str(field.type) for field in table.schema if field.name != 'Hour'}}
+    save_metadata(metadata, store_path)
+
+# Definition of the function to join the weather data of a scenario to results
+'''
+Description: This function adds weather columns to results read from a results store. The weather table is small (one row per hour),
+             so it is read whole and spread to the rows of the results by their hour of the year (array indexing, no merge).
+             The hours outside the weather data (e.g. the 00:00 time step of the next year) get NaN.
+Inputs:
+    - data: pd.DataFrame with an Hour column
+    - store_path: path to the directory of the results store
+    - weather_metadata: weather metadata of the scenario (see write_weather)
+    - columns: list of the weather columns to add
+Outputs:
+    - data: pd.DataFrame with the weather columns
+'''
+def join_weather(data, store_path, weather_metadata, columns):
+    weather = pq.read_table(os.path.join(store_path, weather_metadata['file']), columns=['Hour'] + columns).to_pandas()
+    values = lookup_hours(data['Hour'].values, weather['Hour'].values, weather[columns].values)
+    for i, column in enumerate(columns):
+        data[column] = values[:, i]
+    return data
+
+# Definition of the function to read results from a results store
+'''
+Description: This function reads results from a results store. Only the files of the months overlapping the time range are opened,
+             and only the selected columns are read from them. The weather columns are joined from the weather table of the scenario.
+Inputs:
+    - store_path: path to the directory of the results store
+    - scenario: name of the scenario
+    - columns: list of the columns to read, results or weather columns (default: None, all the columns). The Datetime, Hour and key columns are always returned.
+    - start: first datetime to read, included (default: None, from the start)
+    - end: last datetime to read, included (default: None, until the end)
+    - keys: list of the keys of the buildings to read (default: None, all the buildings)
+Outputs:
+    - data: pd.DataFrame with the columns Datetime, Hour, key and the selected columns, sorted by key and Datetime
+'''
+def read_results(store_path, scenario, columns=None, start=None, end=None, keys=None):
+    metadata = load_metadata(store_path)
+    if scenario not in metadata['scenarios']:
+        raise ValueError("The scenario is not in the results store. Store = " + store_path + ". Scenario = " + scenario + ". Scenarios = " + str(list(metadata['scenarios'].keys())))
+    weather_metadata = metadata['scenarios'][scenario].get('weather', {'columns': {}})
+    if columns is None:
+        columns = list(metadata['columns'].keys()) + list(weather_metadata['columns'].keys())
+    missing_columns = [column for column in columns if column not in metadata['columns'] and column not in weather_metadata['columns'] and column != 'Datetime']
+    if missing_columns:
+        raise ValueError("Columns not in the results store. Columns = " + str(missing_columns))
+    weather_columns = [column for column in columns if column in weather_metadata['columns'] and column not in metadata['columns']]
+    columns = ['Hour', 'key'] + [column for column in columns if column not in ['Datetime', 'Hour', 'key'] and column in metadata['columns']]
+    year = metadata['scenarios'][scenario]['year']
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    # Time range as hours of the year (first hour at or after the start, last hour at or before the end)
+    first_hour = None if start is None else get_hour_of_year([start], year)[0] + int(get_datetime(get_hour_of_year([start], year), year)[0] < start)
+    last_hour = None if end is None else get_hour_of_year([end], year)[0]
+
+    tables = []
+    for month, partition in sorted(metadata['scenarios'][scenario]['months'].items()):
+        # Skip the months outside the time range
+        month_start = pd.Timestamp(month + '-01')
+        if (end is not None and month_start > end) or (start is not None and month_start + pd.offsets.MonthBegin(1) <= start):
+            continue
+        for file_path in partition['files']:
+            tables.append(pq.read_table(os.path.join(store_path, file_path), columns=columns))
+
+    if not tables:
+        return pd.DataFrame(columns=['Datetime'] + columns + weather_columns)
+    data = pa.concat_tables(tables).to_pandas()
+    selection = np.ones(len(data), dtype=bool)
+    if first_hour is not None:
+        selection &= data['Hour'].values >= first_hour
+    if last_hour is not None:
+        selection &= data['Hour'].values <= last_hour
+    if keys is not None:
+        selection &= data['key'].isin(keys).values
+    data = data[selection].sort_values(['key', 'Hour'], kind='stable').reset_index(drop=True)
+    if weather_columns:
+        data = join_weather(data, store_path, weather_metadata, weather_columns)
+    # Datetimes for the users of the data
+    data.insert(0, 'Datetime', get_datetime(data['Hour'].values, year))
+    return data
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from common import SIMULATION_YEAR
+
+# Integer time keys of the simulation results and weather data:
+#   - minute of the year: minutes since January 1st 00:00 of the simulation year, at the end of each time step (see toolbox.eplusout)
+#   - hour of the year: hours since January 1st 00:00 of the simulation year
+# The joins, filters and resamplings are done on these keys (array indexing), the datetimes are only built for the users of the data.
+
+
+# Definition of the function to get the cumulative number of days at the start of each month
+'''
+Description: This function returns the number of days of the year before the first day of each month.
+Inputs:
+    - year: calendar year (default: the simulation year)
+Outputs:
+    - month_start_days: np.array of 13 integers, indexed by the month (1 to 12, index 0 unused)
+'''
+def get_month_start_days(year=SIMULATION_YEAR):
+    days_in_month = [31, 29 if pd.Timestamp(year, 1, 1).is_leap_year else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+    return np.concatenate([[0, 0], np.cumsum(days_in_month)[:-1]])
+
+# Definition of the function to get the number of hours of a year
+'''
+Description: This function returns the number of hours of a year, i.e. the number of hourly keys of the year (8760 or 8784).
+Inputs:
+    - year: calendar year (default: the simulation year)
+Outputs:
+    - hours: number of hours
+'''
+def get_hours_in_year(year=SIMULATION_YEAR):
+    return 8784 if pd.Timestamp(year, 1, 1).is_leap_year else 8760
+
+# Definition of the function to convert datetimes to hours of the year
+'''
+Description: This function converts datetimes to hours of the year, vectorised. The datetimes of the next year give hours after the end of the year.
+Inputs:
+    - datetimes: pd.DatetimeIndex, pd.Series or array of datetimes (or strings)
+    - year: calendar year (default: the simulation year)
+Outputs:
+    - hours: np.int32 array of hours of the year (the minutes are truncated)
+'''
+def get_hour_of_year(datetimes, year=SIMULATION_YEAR):
+    datetimes = pd.to_datetime(pd.Series(np.asarray(datetimes))).values.astype('datetime64[m]')
+    return ((datetimes - np.datetime64(str(year) + '-01-01', 'm')).astype(np.int64) // 60).astype(np.int32)
+
+# Definition of the function to convert hours of the year to datetimes
+'''
+Description: This function converts hours of the year to datetimes, for the users of the data (figures, periods).
+Inputs:
+    - hours: array of hours of the year
+    - year: calendar year (default: the simulation year)
+Outputs:
+    - datetimes: pd.DatetimeIndex
+'''
+def get_datetime(hours, year=SIMULATION_YEAR):
+    return pd.DatetimeIndex(np.datetime64(str(year) + '-01-01T00', 'h') + np.asarray(hours, dtype=np.int64).astype('timedelta64[h]'))
+
+# Definition of the function to get the hour of the day of hours of the year
+'''
+Description: This function returns the hour of the day (0 to 23) of hours of the year.
+Inputs:
+    - hours: array of hours of the year
+Outputs:
+    - hour_of_day: np.int32 array
+'''
+def get_hour_of_day(hours):
+    return (np.asarray(hours, dtype=np.int32) % 24).astype(np.int32)
+
+# Definition of the function to get the month of hours of the year
+'''
+Description: This function returns the month (1 to 12) of hours of the year. The hours after the end of the year get the month 13.
+Inputs:
+    - hours: array of hours of the year
+    - year: calendar year (default: the simulation year)
+Outputs:
+    - months: np.int32 array
+'''
+def get_month(hours, year=SIMULATION_YEAR):
+    month_start_hours = np.append(get_month_start_days(year)[1:], get_hours_in_year(year) // 24) * 24
+    return np.searchsorted(month_start_hours, np.asarray(hours), side='right').astype(np.int32)
+
+# Definition of the function to look up values by hour of the year
+'''
+Description: This function looks up the values of an hourly table (e.g. the weather data) for hours of the year, by array indexing instead of
+             a merge on datetimes. The hours missing from the table get NaN.
+Inputs:
+    - hours: array of the hours of the year to look up
+    - table_hours: array of the hours of the year of the table (unique)
+    - table_values: array of the values of the table, one row per hour of table_hours (1D or 2D)
+Outputs:
+    - values: float32 array with one row per hour looked up
+'''
+def lookup_hours(hours, table_hours, table_values):
+    hours = np.asarray(hours, dtype=np.int64)
+    table_hours = np.asarray(table_hours, dtype=np.int64)
+    table_values = np.asarray(table_values, dtype=np.float32)
+    first_hour = min(table_hours.min(), 0) if len(table_hours) else 0
+    number_hours = table_hours.max() - first_hour + 1 if len(table_hours) else 0
+
+    # Dense table indexed by the hour, with a last row of NaN for the missing hours
+    dense_values = np.full((number_hours + 1,) + table_values.shape[1:], np.nan, dtype=np.float32)
+    dense_values[table_hours - first_hour] = table_values
+    positions = hours - first_hour
+    positions[(positions < 0) | (positions >= number_hours)] = number_hours
+    return dense_values[positions]
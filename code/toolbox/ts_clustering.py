@@ -11,6 +11,8 @@ from toolbox.figures import set_matplotlib_style, set_dtu_colors
 from scipy.cluster.hierarchy import inconsistent, maxinconsts
 import time
 import pickle
+import os
+from toolbox.cube import read_cube_features
 colors = set_dtu_colors()
 set_matplotlib_style()
 
@@ -71,25 +73,33 @@ def apply_pca_timeseries(df, features, n_components=2, time_series_data=[], pca_
     time_series_data.append(transformed_data)
     return time_series_data, pca_data
 
-def ts_clustering(df=None, data_path=None, n_clusters=2, plot=False, scenario = 'present-day', method='kmeans'):
-    if data_path != None:
-        # Read the data
-        df = pd.read_csv(data_path)
+def ts_clustering(df=None, data_path=None, n_clusters=2, plot=False, scenario = 'present-day', method='kmeans', periods=None):
+    features = ['Outdoor Dry Bulb Temperature', 'Outdoor Relative Humidity', 'Wind Speed', 'Wind Direction', 'Atmospheric Station Pressure', 'Indoor Mean Air Temperature', 'Indoor Air Relative Humidity', 'Precipitable Water']
+    time_series_data = []
+    pca_data = []
 
-    if type(df) != dict:  
-        df_dict = {}
-        for key in df['key'].unique():
-            df_dict[key] = df[df['key'] == key]
+    if data_path != None and os.path.isdir(data_path):
+        # Read the time series of all the buildings (in the periods, if any) from the results cube of the store (see toolbox.cube),
+        # as a dense array buildings x hours x features instead of grouping a long dataframe by key
+        features_data, keys = read_cube_features(data_path, scenario, features, periods)
+        for i in range(len(keys)):
+            time_series_data, pca_data = apply_pca_timeseries(df=pd.DataFrame(features_data[i], columns=features), features=features, n_components=2, time_series_data=time_series_data, pca_data=pca_data)
     else:
-        df_dict = df
+        if data_path != None:
+            # Read the data from a csv file
+            df = pd.read_csv(data_path)
+
+        if type(df) != dict:  
+            df_dict = {}
+            for key in df['key'].unique():
+                df_dict[key] = df[df['key'] == key]
+        else:
+            df_dict = df
+        keys = list(df_dict.keys())
+
+        for key in keys:
+            time_series_data, pca_data = apply_pca_timeseries(df=df_dict[key], features=features, n_components=2, time_series_data=time_series_data, pca_data=pca_data)
 
-    time_series_data = []
-    pca_data = []
-    
-    for key in df_dict.keys():
-        features = ['Outdoor Dry Bulb Temperature', 'Outdoor Relative Humidity', 'Wind Speed', 'Wind Direction', 'Atmospheric Station Pressure', 'Indoor Mean Air Temperature', 'Indoor Air Relative Humidity', 'Precipitable Water']
-        time_series_data, pca_data = apply_pca_timeseries(df=df_dict[key], features=features, n_components=2, time_series_data=time_series_data, pca_data=pca_data)
-        
 
     # Convert the list of time series data into a time series dataset
     X = to_time_series_dataset(time_series_data)
@@ -109,7 +119,7 @@ def ts_clustering(df=None, data_path=None, n_clusters=2, plot=False, scenario =
         cluster_labels = km.labels_
         # Get the cluster centers
         cluster_centers = km.cluster_centers_
-        cluster_labels_df = pd.DataFrame({'key': df_dict.keys(), 'cluster': cluster_labels})
+        cluster_labels_df = pd.DataFrame({'key': keys, 'cluster': cluster_labels})
         return cluster_labels_df, pca_data, cluster_centers
     if method == 'hierarchical':
         # Compute the linkage matrix
@@ -119,7 +129,7 @@ def ts_clustering(df=None, data_path=None, n_clusters=2, plot=False, scenario =
         # Save the model
         filename = '../results/ts_clustering/'+ scenario + '_hirarchical_model.sav'
         pickle.dump(Z, open(filename, 'wb'))
-        cluster_labels_df = pd.DataFrame({'key': df_dict.keys(), 'cluster': cluster_labels})
+        cluster_labels_df = pd.DataFrame({'key': keys, 'cluster': cluster_labels})
         return cluster_labels_df, pca_data
     if method == 'som':
         X_reshaped = X.reshape(X.shape[0], -1)
@@ -138,7 +148,7 @@ def ts_clustering(df=None, data_path=None, n_clusters=2, plot=False, scenario =
         cluster_labels = np.array(cluster_labels)
         win_map = som.win_map(X)
         plot_som_series_averaged_center(som_x, som_y, win_map)
-        cluster_labels_df = pd.DataFrame({'key': df_dict.keys(), 'cluster': cluster_labels})
+        cluster_labels_df = pd.DataFrame({'key': keys, 'cluster': cluster_labels})
         return cluster_labels_df, pca_data
     if method == 'som_dba':
         from minisom import MiniSom
@@ -156,7 +166,7 @@ def ts_clustering(df=None, data_path=None, n_clusters=2, plot=False, scenario =
         cluster_labels = np.array(cluster_labels)
         win_map = som.win_map(X)
         plot_som_series_dba_center(som_x, som_y, win_map)
-        cluster_labels_df = pd.DataFrame({'key': df_dict.keys(), 'cluster': cluster_labels})
+        cluster_labels_df = pd.DataFrame({'key': keys, 'cluster': cluster_labels})
         return cluster_labels_df, pca_data
 
     end = time.time()
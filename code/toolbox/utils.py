@@ -6,7 +6,12 @@ warnings.filterwarnings("ignore")
 from IPython.display import clear_output
 import os
 import time
-from datetime import timedelta
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from toolbox.eplusout import read_simulation_output, get_hourly_means
+from toolbox.cube import build_cube
+from toolbox.timekeys import SIMULATION_YEAR, get_hour_of_year, get_datetime, lookup_hours
+from toolbox.results import clear_results, write_results, write_weather, remove_results, load_ingest_index, save_ingest_index
 
 def nan_counter(list_of_series):
     nan_polluted_series_counter = 0
@@ -16,24 +21,29 @@ def nan_counter(list_of_series):
     print(nan_polluted_series_counter)
 
 # Create definition to import data from csv files in a table format with date as index and time as columns to a timeseries format
+# The table is reshaped at once: the dates (DD/MM/YYYY) and the times of the columns (HH.MM) are parsed once, the 00.00 column is moved
+# to the next day and the cells are flattened row by row, in the order of the table. The rows with an invalid date and the columns with
+# an invalid time are skipped. The cells are kept as read (e.g. the '     -' of the missing values are not converted)
 def import_saws_data(filename):
     df = pd.read_csv(filename, sep=',')
-    ts = pd.Series()
-    m, n = df.shape
-    for i in range(0, m):
-        for j in range(1, n):
-            try:
-                date = df.iloc[i, 0]
-                time = str.replace(df.columns[j], '.', ':')
-                # Convert date DD/MM/YYYY to datetime
-                date = pd.to_datetime(date, format='%d/%m/%Y')
-                if time == '00:00':
-                    # Add one day to date
-                    date = date + pd.DateOffset(days=1)
-                datetime = pd.to_datetime(str(date.date())+ ' ' + time)
-                ts[datetime] = df.iloc[i, j]
-            except: 
-                pass
+    dates = pd.to_datetime(df.iloc[:, 0], format='%d/%m/%Y', errors='coerce').values
+    times = pd.Series([str.replace(column, '.', ':') for column in df.columns[1:]], dtype=object)
+    offsets = pd.to_timedelta(times + ':00', errors='coerce').to_numpy(copy=True)
+    offsets[~times.str.fullmatch(r'\d{1,2}:\d{2}').values] = np.timedelta64('NaT')
+    # The 00:00 of a date is the end of the day, i.e. the 00:00 of the next day
+    offsets[(times == '00:00').values] += np.timedelta64(1, 'D')
+
+    valid_dates = ~np.isnat(dates)
+    valid_times = ~np.isnat(offsets)
+    values = df.iloc[:, 1:].values[valid_dates][:, valid_times]
+    if values.dtype.kind in 'iub':
+        values = values.astype(float)
+    index = pd.DatetimeIndex((dates[valid_dates][:, np.newaxis] + offsets[valid_times][np.newaxis, :]).ravel())
+    ts = pd.Series(values.ravel(), index=index)
+
+    # A datetime found several times keeps its first position and its last value
+    if index.has_duplicates:
+        ts = ts[~index.duplicated(keep='last')].reindex(index[~index.duplicated(keep='first')])
     return ts
 
 def calculate_U_value(list):
@@ -44,58 +54,149 @@ def calculate_U_value(list):
         resistance.append(thickness/conductivity)
     return 1/sum(resistance)
 
-def import_simulation_data(directory_path, weather, output_path):
-    scenario = directory_path.split('/')[2]
+# Weather data of the ingest worker processes (set once per process by set_worker_weather, instead of being sent with every folder)
+worker_weather = None
+
+def set_worker_weather(weather):
+    global worker_weather
+    worker_weather = weather
+
+# Read the results of one simulation output folder, averaged per hour and joined with the weather data on the hour of the year (see toolbox.timekeys)
+# The weather data is not joined if weather is None and no weather data was set for the worker (results store, see toolbox.results.write_weather)
+def process_simulation_folder(directory_path, key, weather=None, year=SIMULATION_YEAR):
+    if weather is None:
+        weather = worker_weather
+
+    # Read only the indoor air temperature and humidity (float32) from eplusout.csv or eplusout.sql, indexed by the minute of the year
+    # at the end of each time step, and average them per hour of the year (vectorised, see toolbox.eplusout)
+    data = get_hourly_means(read_simulation_output(directory_path + key, ['Zone Mean Air Temperature', 'Zone Air Relative Humidity'], 'THERMAL ZONE', year))
+    data.columns = ['Indoor Mean Air Temperature', 'Indoor Air Relative Humidity']
+    hours = data.index.values
+    data = data.reset_index()
+
+    if weather is not None:
+        weather_values = lookup_hours(hours, get_hour_of_year(weather.index, year), weather.values)
+        for i, column in enumerate(weather.columns):
+            data[column] = weather_values[:, i]
+
+    # Set the index to datetime
+    data.index = get_datetime(hours, year).rename('Datetime')
+    data['key'] = key
+    return data
 
-    folders = os.listdir(directory_path)
+# Signature of the results of a simulation output folder: size and modification time of the file read by process_simulation_folder
+# None if the folder has no results (e.g. failed or timed out simulation, see pyosmodel.campaign.run_campaign)
+def get_folder_signature(folder_path):
+    for file_name in ['eplusout.csv', 'eplusout.sql']:
+        file_path = os.path.join(folder_path, file_name)
+        if os.path.exists(file_path):
+            stat = os.stat(file_path)
+            return {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+    return None
 
-    simulation_data = {}
+# Import the results of all the simulations of a scenario and save them in a csv file (output_path) and/or in the results store (store_path, see toolbox.results)
+# The folders are processed in parallel (workers processes, default: all the cores) and the buildings are appended to the outputs
+# chunk by chunk, in the order of the folders, as soon as the buffered buildings take more than max_memory MB, so the memory used
+# does not grow with the number of buildings. The whole dataframe is only kept in memory and returned if return_data is True.
+# With incremental=True, the ingest index of the store (size and modification time of the results of each folder) is used to only
+# process the new or changed folders: their previous results and the results of the deleted folders are removed from the store,
+# and the csv file and the returned dataframe only contain the processed buildings.
+# The weather data is stored once per scenario in the results store, and only merged to the rows of the buildings for the csv file and the returned dataframe.
+# The rows are keyed by their hour of the year (Hour column), counted from January 1st of year (default: the simulation year, see toolbox.timekeys).
+# The folders without results (failed or timed out simulations) and the folders whose results cannot be read are skipped and reported,
+# and are left out of the ingest index, so they are ingested once their results exist. weather can be None for an ingest to the store only.
+# With cube=True, the dense results cube (buildings x hours x variables, see toolbox.cube) of the scenario is built or updated after the ingest.
+def import_simulation_data(directory_path, weather, output_path, workers=None, max_memory=1024, return_data=True, store_path=None, incremental=False, year=SIMULATION_YEAR, cube=False):
+    # Name of the scenario: directory of the outputs folder (e.g. simulations/present-day/outputs/)
+    scenario = os.path.basename(os.path.dirname(os.path.normpath(directory_path)))
+    if incremental and store_path is None:
+        raise ValueError("The incremental ingest needs a results store. Store path = " + str(store_path))
+
+    folders = sorted(os.listdir(directory_path))
+    signatures = {key: get_folder_signature(directory_path + key) for key in folders}
+    empty_folders = [key for key in folders if signatures[key] is None]
+    if empty_folders:
+        print('{} - {} folders without results skipped: {}'.format(scenario, len(empty_folders), ', '.join(empty_folders)))
+    signatures = {key: signature for key, signature in signatures.items() if signature is not None}
+    folders = [key for key in folders if key in signatures]
+    if workers is None:
+        workers = os.cpu_count()
+    max_memory = max_memory * 1024 ** 2
+
+    if store_path is not None:
+        if incremental:
+            index = load_ingest_index(store_path, scenario)
+            # Remove the previous results of the changed folders and the results of the deleted folders
+            outdated = [key for key in index if key not in signatures or {'size': index[key]['size'], 'mtime': index[key]['mtime']} != signatures[key]]
+            remove_results(store_path, scenario, outdated, sorted(set(index[key]['part'] for key in outdated)))
+            for key in outdated:
+                del index[key]
+            save_ingest_index(index, store_path, scenario)
+            print('{} - {} folders up to date, {} folders to ingest, {} folders removed'.format(scenario, len(index), len(folders) - len(index), len([key for key in outdated if key not in signatures])))
+            folders = [key for key in folders if key not in index]
+        else:
+            clear_results(store_path, scenario)
+            index = {}
+        if weather is not None:
+            write_weather(weather, store_path, scenario, year)
+    merge_weather = output_path is not None or return_data
+
+    simulation_data = []
+    failed_folders = {}
+    buffer = {}
+    buffer_memory = 0
+    header = True
     # Start the timer
     start = time.time()
-    for i, key in enumerate(folders):
-        clear_output(wait=True)
-        file = directory_path + key + '/eplusout.csv'
-        simulation_data[key] = pd.read_csv(file)
-
-        # Convert the date and time to datetime format
-        simulation_data[key]['Date/Time'] = simulation_data[key]['Date/Time'].astype(str)
-        simulation_data[key]['Date/Time'] = '2023/' + simulation_data[key]['Date/Time']
-        simulation_data[key]['Date/Time'] = simulation_data[key]['Date/Time'].str.replace('2023/ ', '2023/')
-        simulation_data[key]['Date/Time'] = simulation_data[key]['Date/Time'].str.replace('24:00:00', '00:00:00')
-        simulation_data[key]['Date/Time'] = pd.to_datetime(simulation_data[key]['Date/Time'], format='%Y/%m/%d  %H:%M:%S')
-        for i in range(len(simulation_data[key]['Date/Time'])):
-            if simulation_data[key]['Date/Time'][i].hour == 0 and simulation_data[key]['Date/Time'][i].minute == 0 and simulation_data[key]['Date/Time'][i].second == 0:
-                simulation_data[key]['Date/Time'][i] = simulation_data[key]['Date/Time'][i] + timedelta(days=1)
-    
-        # Resample the data to hourly
-        simulation_data[key] = simulation_data[key].set_index('Date/Time').resample('1H').mean().reset_index()
-        
-        # Keep the columns of interest and rename them
-        simulation_data[key] = simulation_data[key][[
-            'Date/Time', 
-            'THERMAL ZONE:Zone Mean Air Temperature [C](TimeStep)', 
-            'THERMAL ZONE:Zone Air Relative Humidity [%](TimeStep)']]
-        
-        simulation_data[key] = pd.merge(simulation_data[key], weather, how='left', left_on='Date/Time', right_on='datetime')
-
-        simulation_data[key] = simulation_data[key].rename(columns={
-            'Date/Time': 'Datetime',
-            'THERMAL ZONE:Zone Mean Air Temperature [C](TimeStep)': 'Indoor Mean Air Temperature',
-            'THERMAL ZONE:Zone Air Relative Humidity [%](TimeStep)': 'Indoor Air Relative Humidity'})
-        
-        # Set the index to datetime
-        simulation_data[key] = simulation_data[key].set_index('Datetime')
-        simulation_data[key]['key'] = key
-
-        if folders.index(key) % 10 == 0:
-            print('{} - Progress: {}/{} - {} seconds'.format(scenario, folders.index(key), len(folders), round(time.time() - start, 2)))
-
-    # Concatenate all the dataframes
-    df = pd.concat(simulation_data)
+    with ProcessPoolExecutor(max_workers=workers, initializer=set_worker_weather, initargs=(weather if merge_weather else None,)) as executor:
+        # Bounded window of folders being processed, so the finished buildings never pile up in the workers
+        futures = deque()
+        next_folder = 0
+        for i, key in enumerate(folders):
+            while next_folder < len(folders) and len(futures) < 2 * workers:
+                futures.append(executor.submit(process_simulation_folder, directory_path, folders[next_folder], None, year))
+                next_folder += 1
+            try:
+                buffer[key] = futures.popleft().result()
+                buffer_memory += buffer[key].memory_usage(deep=True).sum()
+            except Exception as error:
+                # e.g. truncated eplusout.csv of an interrupted simulation: the other folders are still ingested
+                failed_folders[key] = '{}: {}'.format(type(error).__name__, error)
+
+            # Append the buffered buildings to the csv file
+            if buffer and (buffer_memory > max_memory or i == len(folders) - 1):
+                chunk = pd.concat(buffer)
+                if output_path is not None:
+                    chunk.to_csv(output_path, mode='w' if header else 'a', header=header)
+                    header = False
+                if store_path is not None:
+                    part = write_results(chunk[[column for column in chunk.columns if weather is None or column not in weather.columns]], store_path, scenario, year)
+                    # Record the buildings written, so an interrupted ingest restarts after the last chunk written
+                    for chunk_key in buffer.keys():
+                        index[chunk_key] = dict(signatures[chunk_key], part=part)
+                    save_ingest_index(index, store_path, scenario)
+                if return_data:
+                    simulation_data.append(chunk)
+                buffer = {}
+                buffer_memory = 0
+
+            if i % 10 == 0:
+                clear_output(wait=True)
+                print('{} - Progress: {}/{} - {} seconds'.format(scenario, i, len(folders), round(time.time() - start, 2)))
+
+    if store_path is not None and cube:
+        # Only the processed buildings are updated in the cube of an incremental ingest (the cube is rebuilt if buildings were added or removed)
+        build_cube(store_path, scenario, [key for key in folders if key not in failed_folders] if incremental else None)
 
     clear_output(wait=True)
     print('Done in {} minutes'.format(round((time.time() - start)/60, 2)))
-    print('Saving the data...')
-    df.to_csv(output_path)
-    print('Data saved in {}!'.format(output_path))
-    return df
\ No newline at end of file
+    print('Data saved in {}!'.format(', '.join(path for path in [output_path, store_path] if path is not None)))
+    # Reported after the last clear_output, so they stay visible in the notebook
+    if empty_folders:
+        print('{} - {} folders without results skipped: {}'.format(scenario, len(empty_folders), ', '.join(empty_folders)))
+    if failed_folders:
+        print('{} - {} folders could not be ingested:'.format(scenario, len(failed_folders)))
+        for key, error in failed_folders.items():
+            print('    {}: {}'.format(key, error))
+    if return_data:
+        return pd.concat(simulation_data) if simulation_data else pd.DataFrame()
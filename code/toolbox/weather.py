@@ -0,0 +1,86 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from toolbox.utils import import_saws_data
+
+# Variables of the SAWS weather files, by suffix of the file name (e.g. Jan_17_temp.csv), in the order of the columns of the weather data
+SAWS_VARIABLES = [(('_temp.csv',), 'Outdoor Dry Bulb Temperature'),
+                  (('_hum.csv', '_humidity.csv'), 'Outdoor Relative Humidity'),
+                  (('_pressure.csv',), 'Atmospheric Station Pressure'),
+                  (('_rain.csv',), 'Precipitable Water'),
+                  (('_winddir.csv',), 'Wind Direction'),
+                  (('_windspeed.csv',), 'Wind Speed')]
+
+
+# Definition of the function to get the variable of a SAWS weather file
+'''
+Description: This function returns the weather variable of a SAWS weather file from the suffix of its name (see SAWS_VARIABLES).
+Inputs:
+    - filename: name of the file
+Outputs:
+    - variable: name of the column of the variable, None if the file is not a SAWS weather file
+'''
+def get_saws_variable(filename):
+    for suffixes, variable in SAWS_VARIABLES:
+        if filename.endswith(suffixes):
+            return variable
+    return None
+
+# Definition of the function to load the SAWS weather files of a directory
+'''
+Description: This function loads all the SAWS weather files (date x time tables, see toolbox.utils.import_saws_data) of a directory.
+             The files are parsed in parallel, the files of each variable are concatenated once and the variables are joined on the datetime.
+             The cells are kept as read (e.g. the '     -' of the missing values), see clean_saws_weather.
+Inputs:
+    - directory_path: path to the directory of the weather files
+    - workers: number of processes (default: None, all the cores)
+Outputs:
+    - weather: pd.DataFrame with one column per variable of SAWS_VARIABLES, indexed by datetime (sorted)
+'''
+def load_saws_weather(directory_path, workers=None):
+    files = sorted(os.listdir(directory_path))
+    for file in files:
+        if file.endswith('.csv') and get_saws_variable(file) is None:
+            print('{} is not a valid file'.format(file))
+    files = [file for file in files if get_saws_variable(file) is not None]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        series = list(executor.map(import_saws_data, [os.path.join(directory_path, file) for file in files]))
+
+    columns = []
+    for suffixes, variable in SAWS_VARIABLES:
+        variable_series = [ts for file, ts in zip(files, series) if get_saws_variable(file) == variable]
+        column = pd.concat(variable_series) if variable_series else pd.Series(dtype=object)
+        if column.index.has_duplicates:
+            raise ValueError("Datetimes found in several files of the variable. Directory = " + directory_path + ". Variable = " + variable)
+        columns.append(column.rename(variable))
+    return pd.concat(columns, axis=1).sort_index()
+
+# Definition of the function to clean SAWS weather data
+'''
+Description: This function cleans the SAWS weather data of a station, with the same rules for all the stations:
+                - the cells which are not numbers (e.g. '     -', '      -', '      ') are missing values
+                - missing precipitation: 0 (no rain recorded)
+                - missing wind direction: 0, as integer
+                - missing wind speed: 0 for the empty cells and the previous value for the '-' cells (sensor not reporting)
+                - missing pressure: previous value
+                - the hours still missing a temperature, a humidity or a pressure are removed
+Inputs:
+    - weather: pd.DataFrame of load_saws_weather
+    - start: first datetime of the period kept (default: None, from the start of the data)
+    - end: last datetime of the period kept (default: None, until the end of the data)
+Outputs:
+    - weather: pd.DataFrame of floats (except the wind direction), indexed by datetime
+'''
+def clean_saws_weather(weather, start=None, end=None):
+    weather = weather.loc[start:end]
+    blanks = weather.isnull()
+    weather = weather.apply(pd.to_numeric, errors='coerce').astype(float)
+
+    weather['Precipitable Water'] = weather['Precipitable Water'].fillna(0)
+    weather['Wind Direction'] = weather['Wind Direction'].fillna(0).astype(int)
+    weather['Wind Speed'] = weather['Wind Speed'].mask(blanks['Wind Speed'], 0).ffill()
+    weather['Atmospheric Station Pressure'] = weather['Atmospheric Station Pressure'].ffill()
+    return weather.dropna(subset=['Outdoor Dry Bulb Temperature', 'Outdoor Relative Humidity', 'Atmospheric Station Pressure'])